@@ -7,35 +7,96 @@ Usage:
                                  [--storage <method>]
                                  [--s3-bucket <name> --s3-key <name>]
                                  [-p <plugin-name>]...
-                                 [--clean]
+                                 [--clean | --apply]
+                                 [--prepull]
+                                 [--wait-ready <fraction>]
+                                 [--startup-report] [--startup-json <path>]
+                                 [--api-pool-size <size>]
+                                 [--api-qps <qps>] [--api-burst <requests>] [--api-retries <retries>]
+                                 [--worker-context <context>]...
+                                 [--trace-file <path>]
                                  [--logging <level>]
     zelt from-har <har-files>... --local
                                  [-p <plugin-name>]...
                                  [--logging <level>]
     zelt from-har --config <file>
                   [--local]
-                  [--clean]
+                  [--clean | --apply]
+                  [--prepull]
+                  [--wait-ready <fraction>]
+                  [--startup-report] [--startup-json <path>]
+                  [--trace-file <path>]
                   [--logging <level>]
     zelt from-locustfile <locustfile> -m <manifests>
                                       [-w <pods>]
                                       [--storage <method>]
                                       [--s3-bucket <name> --s3-key <name>]
-                                      [--clean]
+                                      [--clean | --apply]
+                                      [--prepull]
+                                      [--wait-ready <fraction>]
+                                      [--startup-report] [--startup-json <path>]
+                                      [--api-pool-size <size>]
+                                      [--api-qps <qps>] [--api-burst <requests>] [--api-retries <retries>]
+                                      [--worker-context <context>]...
+                                      [--trace-file <path>]
                                       [--logging <level>]
     zelt from-locustfile <locustfile> --local
                                       [--logging <level>]
     zelt from-locustfile --config <file>
                          [--local]
-                         [--clean]
+                         [--clean | --apply]
+                         [--prepull]
+                         [--wait-ready <fraction>]
+                         [--startup-report] [--startup-json <path>]
+                         [--trace-file <path>]
                          [--logging <level>]
     zelt rescale <required-pods> -m <manifests>
+                                 [--ramp <rate> | --ramp-schedule <file>]
+                                 [--wait-ready <fraction>]
+                                 [--startup-report] [--startup-json <path>]
+                                 [--api-pool-size <size>]
+                                 [--api-qps <qps>] [--api-burst <requests>] [--api-retries <retries>]
+                                 [--worker-context <context>]...
+                                 [--trace-file <path>]
                                  [--logging <level>]
     zelt rescale <required-pods> --config <file>
+                                 [--ramp <rate> | --ramp-schedule <file>]
+                                 [--wait-ready <fraction>]
+                                 [--startup-report] [--startup-json <path>]
+                                 [--trace-file <path>]
                                  [--logging <level>]
+    zelt autoscale -m <manifests> --max-workers <pods>
+                                  [--cpu-threshold <fraction>]
+                                  [--sustain <samples>]
+                                  [--interval <seconds>]
+                                  [--wait-ready <fraction>]
+                                  [--api-pool-size <size>]
+                                  [--api-qps <qps>] [--api-burst <requests>] [--api-retries <retries>]
+                                  [--logging <level>]
+    zelt update-locustfile <locustfile> -m <manifests>
+                                        [--storage <method>]
+                                        [--s3-bucket <name> --s3-key <name>]
+                                        [--wait]
+                                        [--api-pool-size <size>]
+                                        [--api-qps <qps>] [--api-burst <requests>] [--api-retries <retries>]
+                                        [--worker-context <context>]...
+                                        [--trace-file <path>]
+                                        [--logging <level>]
+    zelt update-locustfile --config <file>
+                           [--wait]
+                           [--trace-file <path>]
+                           [--logging <level>]
     zelt delete -m <manifests> [--storage <method>]
                                [--s3-bucket <name> --s3-key <name>]
+                               [--fast [--wait]]
+                               [--api-pool-size <size>]
+                               [--api-qps <qps>] [--api-burst <requests>] [--api-retries <retries>]
+                               [--worker-context <context>]...
+                               [--trace-file <path>]
                                [--logging <level>]
     zelt delete --config <file>
+                [--fast [--wait]]
+                [--trace-file <path>]
                 [--logging <level>]
     zelt --help
     zelt --version
@@ -46,17 +107,50 @@ Options:
     -p, --transformer-plugins=<plugin-name>  Module name of Transformer plugin (repeatable).
     -m, --manifests=<manifests>              Path to manifest files.
     -w, --worker-pods=<pods>                 Number of worker pods to deploy [default: 1].
-    -s, --storage=<method>                   Remote locustfile storage method (S3 or ConfigMap)
-                                               [default: ConfigMap].
+    -s, --storage=<method>                   Remote locustfile storage method (S3, ConfigMap,
+                                               ConfigMap-gzip, ConfigMap-sharded, PVC or the name of a
+                                               storage plugin) [default: ConfigMap].
     --s3-bucket=<name>                       Name of S3 bucket for remote locustfile storage.
     --s3-key=<name>                          Name of S3 key for remote locustfile storage.
     -c, --clean                              Delete and redeploy remote resources.
+    -a, --apply                              Only create or update the remote resources that changed.
     -l, --local                              Run Locust locally.
+    --prepull                                Pull the images of the Locust pods on all worker nodes
+                                               before creating workers.
+    --fast                                   Only delete the namespace, which deletes everything in it,
+                                               and don't wait for it to be gone.
+    --wait                                   With --fast, wait until the namespace is gone. With
+                                               update-locustfile, wait until the workers are restarted.
+    --wait-ready=<fraction>                  Wait until this fraction (e.g. 0.9) of the worker pods
+                                               are ready.
+    --ramp=<rate>                            Rescale gradually at this rate, e.g. 10/min, waiting for
+                                               the pods of each step to be ready.
+    --ramp-schedule=<file>                   Rescale through the steps of this YAML schedule.
+    --max-workers=<pods>                     Maximum number of worker pods to autoscale up to.
+    --cpu-threshold=<fraction>               Median CPU utilisation of the workers, relative to their
+                                               CPU request, above which workers are added [default: 0.8].
+    --sustain=<samples>                      Number of consecutive samples above the CPU threshold
+                                               needed to add workers [default: 3].
+    --interval=<seconds>                     Seconds between CPU samples [default: 30].
+    --startup-report                         Log how long the worker pods took to be scheduled,
+                                               initialized, pulled and ready.
+    --startup-json=<path>                    Write the startup report in JSON to <path>.
+    --api-pool-size=<size>                   Number of connections kept open to the Kubernetes API
+                                               [default: 16].
+    --api-qps=<qps>                          Average number of Kubernetes API calls per second
+                                               [default: 20].
+    --api-burst=<requests>                   Number of Kubernetes API calls allowed at once, above the
+                                               average rate [default: 40].
+    --api-retries=<retries>                  Number of times Kubernetes API calls failing with a
+                                               transient error (429 or 5xx) are retried [default: 5].
+    --worker-context=<context>               Run the workers in this kubeconfig context instead of the
+                                               controller's (repeatable).
+    --trace-file=<path>                      Write a Chrome trace of the steps of the command to <path>
+                                               and log a summary of their durations.
     --logging=<level>                        Set logging level (INFO, DEBUG, or ERROR) [default: INFO].
     --config=<file>                          Optional configuration file specifying options.
 """
 
-
 import logging
 import os
 import pkg_resources
@@ -64,9 +158,13 @@ import sys
 import yaml
 from docopt import docopt
 from pathlib import Path
-from typing import NamedTuple, Sequence
+from typing import NamedTuple, Optional, Sequence
 
 import zelt
+from zelt import tracing
+from zelt.kubernetes import throttle
+from zelt.kubernetes.autoscaler import AutoscalePolicy
+from zelt.kubernetes.throttle import DEFAULT_BURST, DEFAULT_QPS, DEFAULT_RETRIES
 from zelt.zelt import StorageMethod
 
 
@@ -75,6 +173,8 @@ class Config(NamedTuple):
     from_har: bool
     from_locustfile: bool
     rescale: bool
+    autoscale: bool
+    update_locustfile: bool
     delete: bool
     har_files: Sequence[os.PathLike]
     locustfile: os.PathLike
@@ -86,7 +186,26 @@ class Config(NamedTuple):
     s3_bucket: str
     s3_key: str
     clean: bool
+    apply: bool
     local: bool
+    api_pool_size: int
+    api_qps: str
+    api_burst: str
+    api_retries: str
+    fast: bool
+    wait: bool
+    wait_ready: str
+    worker_contexts: Sequence[str]
+    prepull: bool
+    startup_report: bool
+    startup_json: os.PathLike
+    ramp: str
+    ramp_schedule: os.PathLike
+    max_workers: str
+    cpu_threshold: str
+    sustain: str
+    interval: str
+    trace_file: os.PathLike
     logging: str
 
 
@@ -103,6 +222,22 @@ def cli():
 
     logging.basicConfig(level=config.logging)
 
+    throttle.configure(
+        float(config.api_qps), int(config.api_burst), int(config.api_retries)
+    )
+
+    tracer = tracing.enable() if config.trace_file else None
+    try:
+        _run(config)
+    finally:
+        if tracer:
+            _report_trace(tracer, config.trace_file)
+
+
+def _run(config: Config) -> None:
+    """
+    Runs the command selected in *config*.
+    """
     if config.from_har:
         config = config._replace(
             locustfile=zelt.invoke_transformer(
@@ -117,10 +252,25 @@ def cli():
     if config.rescale:
         _rescale(config)
 
+    if config.autoscale:
+        _autoscale(config)
+
+    if config.update_locustfile:
+        _update_locustfile(config)
+
     if config.delete:
         _delete(config)
 
 
+def _report_trace(tracer: tracing.Tracer, path: os.PathLike) -> None:
+    """
+    Logs a summary of the spans recorded by *tracer* and writes them to *path*.
+    """
+    logging.info("Time spent per step:\n%s", tracer.summary())
+    tracer.write_chrome_trace(path)
+    logging.info("Trace written to %s.", path)
+
+
 def _version() -> str:
     return pkg_resources.get_distribution("zelt").version
 
@@ -139,6 +289,13 @@ def _deploy(config: Config) -> None:
             config.local,
             config.s3_bucket,
             config.s3_key,
+            int(config.api_pool_size),
+            config.apply,
+            _fraction(config.wait_ready),
+            config.worker_contexts,
+            config.prepull,
+            config.startup_report,
+            config.startup_json,
         )
     except Exception as e:
         logging.fatal("Error: %s", e)
@@ -150,7 +307,58 @@ def _rescale(config: Config) -> None:
     Rescales a worker deployment.
     """
     try:
-        zelt.rescale(config.manifests, int(config.required_pods))
+        zelt.rescale(
+            config.manifests,
+            int(config.required_pods),
+            int(config.api_pool_size),
+            _fraction(config.wait_ready),
+            config.worker_contexts,
+            config.ramp,
+            config.ramp_schedule,
+            config.startup_report,
+            config.startup_json,
+        )
+    except Exception as e:
+        logging.fatal("Error: %s", e)
+        exit(1)
+
+
+def _autoscale(config: Config) -> None:
+    """
+    Adds workers while they are saturated.
+    """
+    try:
+        zelt.autoscale(
+            config.manifests,
+            AutoscalePolicy(
+                max_workers=int(config.max_workers),
+                cpu_threshold=float(config.cpu_threshold),
+                sustain=int(config.sustain),
+            ),
+            float(config.interval),
+            int(config.api_pool_size),
+            _fraction(config.wait_ready),
+        )
+    except Exception as e:
+        logging.fatal("Error: %s", e)
+        exit(1)
+
+
+def _update_locustfile(config: Config) -> None:
+    """
+    Replaces the locustfile of a deployment and restarts Locust.
+    """
+    try:
+        zelt.update_locustfile(
+            config.locustfile,
+            config.manifests,
+            StorageMethod.from_storage_arg(config.storage),
+            config.s3_bucket,
+            config.s3_key,
+            int(config.api_pool_size),
+            wait=config.wait,
+            worker_contexts=config.worker_contexts,
+        )
     except Exception as e:
         logging.fatal("Error: %s", e)
         exit(1)
@@ -166,6 +374,10 @@ def _delete(config: Config) -> None:
             StorageMethod.from_storage_arg(config.storage),
             config.s3_bucket,
             config.s3_key,
+            int(config.api_pool_size),
+            fast=config.fast,
+            wait=not config.fast or config.wait,
+            worker_contexts=config.worker_contexts,
         )
     except Exception as e:
         logging.fatal("Error: %s", e)
@@ -185,6 +397,8 @@ def _load_config(config: dict) -> Config:
         from_har=config["from-har"],
         from_locustfile=config["from-locustfile"],
         rescale=config["rescale"],
+        autoscale=config["autoscale"],
+        update_locustfile=config["update-locustfile"],
         delete=config["delete"],
         har_files=config.get("har-files", []),
         locustfile=config["locustfile"],
@@ -196,11 +410,37 @@ def _load_config(config: dict) -> Config:
         s3_bucket=config["s3-bucket"],
         s3_key=config["s3-key"],
         clean=config["clean"],
+        apply=config["apply"],
         local=config["local"],
+        api_pool_size=config["api-pool-size"],
+        api_qps=config.get("api-qps", DEFAULT_QPS),
+        api_burst=config.get("api-burst", DEFAULT_BURST),
+        api_retries=config.get("api-retries", DEFAULT_RETRIES),
+        fast=config["fast"],
+        wait=config["wait"],
+        wait_ready=config.get("wait-ready"),
+        worker_contexts=config.get("worker-context") or [],
+        prepull=config.get("prepull", False),
+        startup_report=config.get("startup-report", False),
+        startup_json=config.get("startup-json"),
+        ramp=config.get("ramp"),
+        ramp_schedule=config.get("ramp-schedule"),
+        max_workers=config.get("max-workers"),
+        cpu_threshold=config.get("cpu-threshold"),
+        sustain=config.get("sustain"),
+        interval=config.get("interval"),
+        trace_file=config.get("trace-file"),
         logging=config["logging"],
     )
 
 
+def _fraction(value) -> Optional[float]:
+    """
+    Converts an optional fraction option into a float.
+    """
+    return None if value is None else float(value)
+
+
 def _normalise_config(config: dict) -> dict:
     """
     Removes special characters from config keys.
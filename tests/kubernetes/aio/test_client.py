@@ -0,0 +1,196 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+pytest.importorskip("kubernetes_asyncio")
+
+from kubernetes_asyncio.client import (
+    V1ContainerStatus,
+    V1ListMeta,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodList,
+    V1PodStatus,
+)
+from kubernetes_asyncio.client.rest import ApiException
+
+from zelt.kubernetes.aio import client as kube
+from zelt.kubernetes.client import STATUS_CONFLICT, STATUS_NOT_FOUND
+from zelt.kubernetes.manifest import Manifest
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _deployment(name: str = "a_deployment") -> Manifest:
+    return Manifest(
+        body={
+            "kind": "Deployment",
+            "metadata": {
+                "name": name,
+                "namespace": "a_namespace",
+                "labels": {"role": "worker"},
+            },
+        }
+    )
+
+
+def _pod(ready: bool, version: str = "1") -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name="pod", namespace="ns", resource_version=version),
+        status=V1PodStatus(
+            container_statuses=[
+                V1ContainerStatus(
+                    name="c", image="i", image_id="", ready=ready, restart_count=0
+                )
+            ]
+        ),
+    )
+
+
+class _Watch:
+    """
+    Stands for kubernetes_asyncio.watch.Watch, streaming *events*.
+    """
+
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        pass
+
+    def stream(self, *_, **__):
+        return self._events()
+
+    async def _events(self):
+        for event in self.events:
+            yield event
+
+
+class TestReadConfig:
+    def test_it_rejects_non_positive_pool_sizes(self):
+        with pytest.raises(ValueError, match="positive pool size"):
+            _run(kube.read_config(0))
+
+
+class TestDeleteNamespace:
+    @patch(
+        "zelt.kubernetes.aio.client.await_no_resources_found", new_callable=AsyncMock
+    )
+    @patch(
+        "zelt.kubernetes.aio.client.CoreV1Api.delete_namespace", new_callable=AsyncMock
+    )
+    def test_it_waits_for_deletion(self, delete, waiting):
+        _run(kube.delete_namespace("a_namespace", MagicMock()))
+        delete.assert_awaited_once()
+        waiting.assert_awaited_once()
+
+    @patch(
+        "zelt.kubernetes.aio.client.await_no_resources_found", new_callable=AsyncMock
+    )
+    @patch(
+        "zelt.kubernetes.aio.client.CoreV1Api.delete_namespace", new_callable=AsyncMock
+    )
+    def test_it_does_not_wait_when_told_not_to(self, delete, waiting):
+        _run(kube.delete_namespace("a_namespace", MagicMock(), wait=False))
+        delete.assert_awaited_once()
+        waiting.assert_not_awaited()
+
+    @patch(
+        "zelt.kubernetes.aio.client.await_no_resources_found", new_callable=AsyncMock
+    )
+    @patch(
+        "zelt.kubernetes.aio.client.CoreV1Api.delete_namespace", new_callable=AsyncMock
+    )
+    def test_it_skips_deletion_when_namespace_not_found(self, delete, waiting):
+        delete.side_effect = ApiException(status=STATUS_NOT_FOUND)
+        assert _run(kube.delete_namespace("a_namespace", MagicMock())) is None
+        waiting.assert_not_awaited()
+
+
+class TestRescaleDeployments:
+    @patch(
+        "zelt.kubernetes.aio.client.AppsV1Api.patch_namespaced_deployment_scale",
+        new_callable=AsyncMock,
+    )
+    def test_it_patches_the_scale_of_each_deployment(self, patch_scale):
+        _run(
+            kube.rescale_deployments(
+                [(_deployment("a"), 2), (_deployment("b"), 3)], MagicMock()
+            )
+        )
+        assert sorted(
+            (c[1]["name"], c[1]["body"]["spec"]["replicas"])
+            for c in patch_scale.call_args_list
+        ) == [("a", 2), ("b", 3)]
+
+    @patch("zelt.kubernetes.aio.client.KUBE_API_WAIT", 0)
+    @patch(
+        "zelt.kubernetes.aio.client.AppsV1Api.patch_namespaced_deployment_scale",
+        new_callable=AsyncMock,
+    )
+    def test_it_retries_on_conflict(self, patch_scale):
+        patch_scale.side_effect = [ApiException(status=STATUS_CONFLICT), MagicMock()]
+        _run(kube.rescale_deployment(_deployment(), 2, MagicMock()))
+        assert patch_scale.await_count == 2
+
+    def test_it_rejects_negative_replicas(self):
+        with pytest.raises(ValueError, match="positive number"):
+            _run(kube.rescale_deployment(_deployment(), -1, MagicMock()))
+
+
+class TestAwaitNoResourcesFound:
+    def test_it_polls_when_resources_cannot_be_watched(self):
+        read_things = AsyncMock(return_value=MagicMock(items=[]))
+        read_things.__name__ = "read_things"
+
+        _run(kube.await_no_resources_found(read_things, namespace="ns"))
+
+        read_things.assert_awaited_once_with(namespace="ns")
+
+
+class TestWaitUntilPodReady:
+    @patch("zelt.kubernetes.aio.watcher.watch.Watch")
+    @patch(
+        "zelt.kubernetes.aio.client.CoreV1Api.list_namespaced_pod",
+        new_callable=AsyncMock,
+    )
+    def test_it_watches_pods_until_one_is_ready(self, list_pods, watch):
+        list_pods.__name__ = "list_namespaced_pod"
+        list_pods.return_value = V1PodList(
+            items=[_pod(False)], metadata=V1ListMeta(resource_version="1")
+        )
+        watch.return_value = _Watch([{"type": "MODIFIED", "object": _pod(True, "2")}])
+
+        _run(kube.wait_until_pod_ready(_deployment(), MagicMock()))
+
+        assert list_pods.await_args[1] == {
+            "namespace": "a_namespace",
+            "label_selector": "role=worker",
+        }
+
+    @patch("zelt.kubernetes.aio.watcher.watch.Watch")
+    @patch(
+        "zelt.kubernetes.aio.client.CoreV1Api.list_namespaced_pod",
+        new_callable=AsyncMock,
+    )
+    def test_it_lists_again_when_resource_version_expired(self, list_pods, watch):
+        list_pods.__name__ = "list_namespaced_pod"
+        list_pods.side_effect = [
+            V1PodList(items=[_pod(False)], metadata=V1ListMeta(resource_version="1")),
+            V1PodList(items=[_pod(True)], metadata=V1ListMeta(resource_version="5")),
+        ]
+        watch.return_value = _Watch([{"type": "ERROR", "raw_object": {"code": 410}}])
+
+        _run(kube.wait_until_pod_ready(_deployment(), MagicMock()))
+
+        assert list_pods.await_count == 2
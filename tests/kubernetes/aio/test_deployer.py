@@ -0,0 +1,114 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+pytest.importorskip("kubernetes_asyncio")
+
+from kubernetes_asyncio.client.rest import ApiException
+
+from zelt.kubernetes.aio import deployer
+from zelt.kubernetes.manifest_set import ManifestSet, from_directory
+
+MANIFESTS = Path(__file__).parents[3] / "examples" / "manifests" / "distributed"
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture()
+def manifests() -> ManifestSet:
+    return from_directory(MANIFESTS)
+
+
+@pytest.fixture()
+def kube():
+    with patch("zelt.kubernetes.aio.deployer.kube") as kube:
+        for name in (
+            "create_namespace",
+            "create_deployment",
+            "wait_until_pod_ready",
+            "create_service",
+            "create_ingress",
+            "try_creating_custom_objects",
+            "delete_namespace",
+            "delete_ingress",
+            "delete_service",
+            "delete_deployments",
+            "rescale_deployments",
+        ):
+            setattr(kube, name, AsyncMock())
+        kube.ApiException = ApiException
+        kube.WaitTimeoutError = TimeoutError
+        yield kube
+
+
+class TestCreateResources:
+    def test_it_creates_all_resources_and_uploads_the_locustfile(
+        self, kube, manifests: ManifestSet
+    ):
+        storage = MagicMock()
+
+        _run(
+            deployer.create_resources(manifests, storage, "locustfile.py", MagicMock())
+        )
+
+        kube.create_namespace.assert_awaited_once()
+        storage.upload.assert_called_once_with("locustfile.py")
+        assert kube.create_deployment.await_count == 2
+        kube.wait_until_pod_ready.assert_awaited_once()
+        kube.create_service.assert_awaited_once()
+        kube.create_ingress.assert_awaited_once()
+
+    def test_it_creates_nothing_else_when_the_namespace_fails(
+        self, kube, manifests: ManifestSet
+    ):
+        kube.create_namespace.side_effect = ApiException(reason="Forbidden")
+        storage = MagicMock()
+
+        _run(
+            deployer.create_resources(manifests, storage, "locustfile.py", MagicMock())
+        )
+
+        storage.upload.assert_not_called()
+        kube.create_deployment.assert_not_awaited()
+
+    def test_it_closes_the_session_it_creates(self, kube, manifests: ManifestSet):
+        session = MagicMock(close=AsyncMock())
+        kube.read_config = AsyncMock(return_value=session)
+
+        _run(deployer.create_resources(manifests, MagicMock(), "locustfile.py"))
+
+        session.close.assert_awaited_once()
+
+
+class TestDeleteResources:
+    def test_it_deletes_resources_then_the_namespace(
+        self, kube, manifests: ManifestSet
+    ):
+        storage = MagicMock()
+
+        _run(deployer.delete_resources(manifests, storage, MagicMock()))
+
+        storage.delete.assert_called_once()
+        kube.delete_ingress.assert_awaited_once()
+        kube.delete_service.assert_awaited_once()
+        kube.delete_deployments.assert_awaited_once()
+        kube.delete_namespace.assert_awaited_once()
+
+    def test_it_only_deletes_the_namespace_when_fast(
+        self, kube, manifests: ManifestSet
+    ):
+        storage = MagicMock(deleted_with_namespace=True)
+
+        _run(deployer.delete_resources(manifests, storage, MagicMock(), fast=True))
+
+        storage.delete.assert_not_called()
+        kube.delete_deployments.assert_not_awaited()
+        assert kube.delete_namespace.await_args[1] == {"wait": True}
@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+pytest.importorskip("kubernetes_asyncio")
+
+from kubernetes_asyncio.client import Configuration
+from kubernetes_asyncio.client.rest import ApiException
+
+from zelt.kubernetes import throttle
+from zelt.kubernetes.aio import throttle as aio_throttle
+from zelt.kubernetes.aio.session import Session
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _error(status: int) -> ApiException:
+    err = ApiException(status=status, reason="Oops")
+    err.headers = {}
+    return err
+
+
+@pytest.fixture
+def retries():
+    throttle.configure(retries=2)
+    yield
+    throttle.configure()
+
+
+@patch("zelt.kubernetes.aio.throttle.asyncio.sleep", new_callable=AsyncMock)
+class TestCall:
+    def test_it_retries_transient_failures(self, _sleep, retries):
+        request = AsyncMock(side_effect=[_error(503), _error(429), "ok"])
+        assert _run(aio_throttle.call("GET", request)) == "ok"
+        assert request.await_count == 3
+
+    def test_it_gives_up_after_the_maximum_of_retries(self, _sleep, retries):
+        request = AsyncMock(side_effect=_error(503))
+        with pytest.raises(ApiException):
+            _run(aio_throttle.call("GET", request))
+        assert request.await_count == 3
+
+    def test_it_does_not_retry_other_failures(self, _sleep, retries):
+        request = AsyncMock(side_effect=_error(409))
+        with pytest.raises(ApiException):
+            _run(aio_throttle.call("POST", request))
+        request.assert_awaited_once()
+
+    def test_it_shares_the_bucket_of_synchronous_calls(self, sleep, retries):
+        throttle.current().bucket.reserve = lambda: 1.5
+        _run(aio_throttle.call("GET", AsyncMock(return_value="ok")))
+        sleep.assert_awaited_once_with(1.5)
+
+
+class TestSession:
+    @patch("kubernetes_asyncio.client.ApiClient.request", new_callable=AsyncMock)
+    def test_it_sends_requests_through_the_throttle(self, request, retries):
+        request.side_effect = [_error(429), "ok"]
+
+        async def send():
+            session = Session(Configuration())
+            try:
+                with patch(
+                    "zelt.kubernetes.aio.throttle.asyncio.sleep", new_callable=AsyncMock
+                ):
+                    return await session.request("GET", "http://x")
+            finally:
+                await session.close()
+
+        assert _run(send()) == "ok"
+        assert request.await_count == 2
+
+    def test_it_rejects_non_positive_pool_sizes(self):
+        with pytest.raises(ValueError, match="positive pool size"):
+            Session(Configuration(), pool_size=0)
@@ -0,0 +1,165 @@
+import base64
+import gzip
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from zelt.kubernetes import bundle, digest
+from zelt.kubernetes.storage import configmap
+from zelt.kubernetes.storage.configmap import ConfigmapStorage
+
+
+@pytest.fixture()
+def locustfile(tmp_path: Path) -> Path:
+    locustfile = Path(tmp_path, "locustfile.py")
+    locustfile.write_text("print('hello')")
+    return locustfile
+
+
+@pytest.fixture()
+def bundle_directory(tmp_path: Path) -> Path:
+    directory = Path(tmp_path, "bundle")
+    directory.mkdir()
+    Path(directory, "locustfile.py").write_text("print('hello')")
+    Path(directory, "users.csv").write_text("alice\n")
+    return directory
+
+
+@pytest.fixture()
+def storage() -> ConfigmapStorage:
+    return ConfigmapStorage(namespace="a-namespace", labels={"some": "labels"})
+
+
+def _metadata(annotations: dict) -> dict:
+    return {"kind": "PartialObjectMetadata", "metadata": {"annotations": annotations}}
+
+
+@patch("zelt.kubernetes.storage.configmap.CoreV1Api")
+class TestUpload:
+    def test_it_creates_a_configmap_with_the_digest(
+        self, core_api, storage, locustfile
+    ):
+        core_api().api_client.call_api.side_effect = ApiException(status=404)
+
+        storage.upload(locustfile)
+
+        body = core_api().create_namespaced_config_map.call_args[1]["body"]
+        assert body.metadata["annotations"] == {
+            digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(locustfile)
+        }
+
+    def test_it_skips_unchanged_locustfiles(self, core_api, storage, locustfile):
+        core_api().api_client.call_api.return_value = _metadata(
+            {digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(locustfile)}
+        )
+
+        storage.upload(locustfile)
+
+        core_api().create_namespaced_config_map.assert_not_called()
+        core_api().replace_namespaced_config_map.assert_not_called()
+
+    def test_it_replaces_changed_locustfiles(self, core_api, storage, locustfile):
+        core_api().api_client.call_api.return_value = _metadata({})
+
+        storage.upload(locustfile)
+
+        core_api().create_namespaced_config_map.assert_not_called()
+        core_api().replace_namespaced_config_map.assert_called_once()
+
+    def test_it_only_reads_metadata(self, core_api, storage, locustfile):
+        core_api().api_client.call_api.return_value = _metadata({})
+        storage.stored_digest()
+        headers = core_api().api_client.call_api.call_args[1]["header_params"]
+        assert "as=PartialObjectMetadata" in headers["Accept"]
+
+    def test_it_accepts_whole_configmaps_from_older_servers(
+        self, core_api, storage, locustfile
+    ):
+        headers = None
+
+        def call_api(*_, header_params, **__):
+            nonlocal headers
+            headers = header_params
+            # Servers without PartialObjectMetadata fall back to plain JSON.
+            return {
+                "kind": "ConfigMap",
+                "metadata": {
+                    "name": configmap.CONFIGMAP_NAME,
+                    "annotations": {
+                        digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(
+                            locustfile
+                        )
+                    },
+                },
+                "data": {configmap.CONFIGMAP_KEY: locustfile.read_text()},
+            }
+
+        core_api().api_client.call_api.side_effect = call_api
+
+        storage.upload(locustfile)
+
+        assert headers["Accept"].split(",")[-1] == "application/json"
+        core_api().replace_namespaced_config_map.assert_not_called()
+
+    def test_it_gzips_the_locustfile_into_binary_data(
+        self, core_api, storage, locustfile
+    ):
+        core_api().api_client.call_api.side_effect = ApiException(status=404)
+        storage.compress = True
+
+        storage.upload(locustfile)
+
+        body = core_api().create_namespaced_config_map.call_args[1]["body"]
+        assert body.data is None
+        stored = body.binary_data[configmap.GZIP_CONFIGMAP_KEY]
+        assert gzip.decompress(base64.b64decode(stored)) == locustfile.read_bytes()
+
+    def test_it_uploads_again_when_switching_to_compression(
+        self, core_api, storage, locustfile
+    ):
+        core_api().api_client.call_api.return_value = _metadata(
+            {digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(locustfile)}
+        )
+        storage.compress = True
+
+        storage.upload(locustfile)
+
+        core_api().replace_namespaced_config_map.assert_called_once()
+
+    def test_it_stores_bundles_as_a_tarball(self, core_api, storage, bundle_directory):
+        core_api().api_client.call_api.side_effect = ApiException(status=404)
+
+        storage.upload(bundle_directory)
+
+        body = core_api().create_namespaced_config_map.call_args[1]["body"]
+        stored = body.binary_data[configmap.BUNDLE_CONFIGMAP_KEY]
+        assert base64.b64decode(stored) == bundle.pack(bundle_directory)
+        assert body.metadata["annotations"] == {
+            digest.LOCUSTFILE_DIGEST_ANNOTATION: bundle.bundle_digest(bundle_directory),
+            configmap.ENCODING_ANNOTATION: configmap.BUNDLE_ENCODING,
+        }
+
+    def test_it_skips_unchanged_bundles(self, core_api, storage, bundle_directory):
+        core_api().api_client.call_api.return_value = _metadata(
+            {
+                digest.LOCUSTFILE_DIGEST_ANNOTATION: bundle.bundle_digest(
+                    bundle_directory
+                ),
+                configmap.ENCODING_ANNOTATION: configmap.BUNDLE_ENCODING,
+            }
+        )
+
+        storage.upload(bundle_directory)
+
+        core_api().replace_namespaced_config_map.assert_not_called()
+
+
+class TestGzipBytes:
+    def test_it_is_deterministic(self):
+        compressed = configmap.gzip_bytes(b"print('hello')")
+        assert compressed == configmap.gzip_bytes(b"print('hello')")
+        assert gzip.decompress(compressed) == b"print('hello')"
+        # Bytes 4 to 8 of the gzip header hold the modification time.
+        assert compressed[4:8] == bytes(4)
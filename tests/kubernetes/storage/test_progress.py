@@ -0,0 +1,37 @@
+import logging
+
+from zelt import tracing
+from zelt.kubernetes.storage.progress import UploadProgress
+
+
+class TestUploadProgress:
+    def test_it_logs_every_percent_step(self, caplog):
+        caplog.set_level(logging.INFO)
+        progress = UploadProgress("a-bucket/a-key", 100, percent=50, clock=lambda: 0)
+        for _ in range(100):
+            progress(1)
+        assert progress.transferred == 100
+        assert len(caplog.records) == 2
+
+    def test_it_logs_slow_uploads_every_interval(self, caplog):
+        caplog.set_level(logging.INFO)
+        now = [0.0]
+        progress = UploadProgress(
+            "a-bucket/a-key", 100, percent=100, interval=5, clock=lambda: now[0]
+        )
+        progress(1)
+        now[0] = 6.0
+        progress(1)
+        assert len(caplog.records) == 1
+
+    def test_it_records_the_transferred_bytes(self):
+        tracer = tracing.enable()
+        try:
+            with tracing.span("upload"):
+                progress = UploadProgress("a-bucket/a-key", 2**20)
+                progress(2**20)
+                progress.done()
+        finally:
+            tracing.disable()
+        assert tracer.spans[0].transferred == 2**20
+        assert "1.0 MiB transferred" in tracer.summary()
@@ -0,0 +1,189 @@
+import base64
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from kubernetes.client import (
+    V1Job,
+    V1JobStatus,
+    V1ObjectMeta,
+    V1PersistentVolumeClaim,
+    V1PersistentVolumeClaimVolumeSource,
+    V1Pod,
+    V1PodList,
+    V1PodSpec,
+    V1PodStatus,
+    V1Volume,
+)
+from kubernetes.client.rest import ApiException
+
+from zelt.kubernetes import bundle, digest
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.storage import pvc
+from zelt.kubernetes.storage.pvc import ClaimInUseError, LoaderFailedError, PvcStorage
+
+
+@pytest.fixture()
+def locustfile(tmp_path: Path) -> Path:
+    locustfile = Path(tmp_path, "locustfile.py")
+    locustfile.write_text("print('hello')")
+    return locustfile
+
+
+@pytest.fixture()
+def storage() -> PvcStorage:
+    return PvcStorage(namespace="a-namespace", labels={"some": "labels"})
+
+
+def _claim(annotations: dict) -> V1PersistentVolumeClaim:
+    return V1PersistentVolumeClaim(metadata=V1ObjectMeta(annotations=annotations))
+
+
+def _pod(phase: str) -> V1Pod:
+    return V1Pod(metadata=V1ObjectMeta(name="a-pod"), status=V1PodStatus(phase=phase))
+
+
+def _mounting_pod(name: str, labels: dict) -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, labels=labels),
+        spec=V1PodSpec(
+            containers=[],
+            volumes=[
+                V1Volume(
+                    name="data",
+                    persistent_volume_claim=V1PersistentVolumeClaimVolumeSource(
+                        claim_name=pvc.CLAIM_NAME
+                    ),
+                )
+            ],
+        ),
+        status=V1PodStatus(phase="Running"),
+    )
+
+
+def _job(**status) -> V1Job:
+    return V1Job(status=V1JobStatus(**status))
+
+
+@patch("zelt.kubernetes.storage.pvc.client.await_no_resources_found")
+@patch("zelt.kubernetes.storage.pvc.stream")
+@patch("zelt.kubernetes.watcher.wait_or_poll_for")
+@patch("zelt.kubernetes.storage.pvc.BatchV1Api")
+@patch("zelt.kubernetes.storage.pvc.CoreV1Api")
+class TestUpload:
+    def test_it_provisions_the_claim_and_streams_the_tarball(
+        self, core_api, batch_api, wait_for, stream, _, storage, locustfile
+    ):
+        core_api().read_namespaced_persistent_volume_claim.side_effect = ApiException(
+            status=404
+        )
+        wait_for.side_effect = [[_pod("Running")], [_job(succeeded=1)]]
+        storage.upload(locustfile)
+
+        body = core_api().create_namespaced_persistent_volume_claim.call_args[1]
+        assert body["body"]["spec"]["accessModes"] == list(pvc.ACCESS_MODES)
+        batch_api().create_namespaced_job.assert_called_once()
+        sent = "".join(c[0][0] for c in stream().write_stdin.call_args_list)
+        assert base64.b64decode(sent) == bundle.pack(locustfile)
+        stream().close.assert_called_once()
+        patch_body = core_api().patch_namespaced_persistent_volume_claim.call_args[1]
+        assert patch_body["body"]["metadata"]["annotations"] == {
+            digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(locustfile)
+        }
+
+    @patch("zelt.kubernetes.storage.pvc.ApiClient")
+    def test_it_attaches_with_a_dedicated_client(
+        self, api_client, core_api, batch_api, wait_for, stream, _, storage, locustfile
+    ):
+        storage.session = MagicMock()
+        core_api().read_namespaced_persistent_volume_claim.return_value = _claim(None)
+        wait_for.side_effect = [[_pod("Running")], [_job(succeeded=1)]]
+        storage.upload(locustfile)
+        api_client.assert_called_once_with(storage.session.configuration)
+        core_api.assert_any_call(api_client.return_value)
+
+    def test_it_refills_claims_with_changed_locustfiles(
+        self, core_api, batch_api, wait_for, stream, _, storage, locustfile
+    ):
+        core_api().read_namespaced_persistent_volume_claim.return_value = _claim(None)
+        wait_for.side_effect = [[_pod("Running")], [_job(succeeded=1)]]
+        storage.upload(locustfile)
+        core_api().create_namespaced_persistent_volume_claim.assert_not_called()
+        stream().write_stdin.assert_called()
+
+    def test_it_refuses_to_refill_claims_mounted_by_pods(
+        self, core_api, batch_api, wait_for, stream, _, storage, locustfile
+    ):
+        core_api().read_namespaced_persistent_volume_claim.return_value = _claim(None)
+        core_api().list_namespaced_pod.return_value = V1PodList(
+            items=[
+                _mounting_pod("zelt-worker", {"app": "zelt"}),
+                _mounting_pod("loader", {"job-name": pvc.LOADER_NAME}),
+            ]
+        )
+        with pytest.raises(ClaimInUseError, match="zelt-worker"):
+            storage.upload(locustfile)
+        batch_api().create_namespaced_job.assert_not_called()
+
+    def test_it_skips_unchanged_locustfiles(
+        self, core_api, batch_api, wait_for, stream, _, storage, locustfile
+    ):
+        core_api().read_namespaced_persistent_volume_claim.return_value = _claim(
+            {digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(locustfile)}
+        )
+        storage.upload(locustfile)
+        batch_api().create_namespaced_job.assert_not_called()
+
+    def test_it_fails_without_annotating_when_loading_fails(
+        self, core_api, batch_api, wait_for, stream, _, storage, locustfile
+    ):
+        core_api().read_namespaced_persistent_volume_claim.return_value = _claim(None)
+        wait_for.side_effect = [[_pod("Running")], [_job(failed=1)]]
+        with pytest.raises(LoaderFailedError):
+            storage.upload(locustfile)
+        core_api().patch_namespaced_persistent_volume_claim.assert_not_called()
+        batch_api().delete_namespaced_job.assert_called()
+
+
+class TestLoaderRunning:
+    def test_it_waits_for_a_running_pod(self):
+        assert not pvc._running([_pod("Pending")])
+        assert pvc._running([_pod("Running")])
+
+    def test_it_fails_when_the_pod_ended_early(self):
+        with pytest.raises(LoaderFailedError):
+            pvc._running([_pod("Failed")])
+
+
+@patch("zelt.kubernetes.storage.pvc.client.await_no_resources_found")
+@patch("zelt.kubernetes.storage.pvc.BatchV1Api", MagicMock())
+@patch("zelt.kubernetes.storage.pvc.CoreV1Api")
+class TestDelete:
+    def test_it_deletes_the_claim(self, core_api, _, storage):
+        storage.delete()
+        core_api().delete_namespaced_persistent_volume_claim.assert_called_once()
+
+
+class TestIsUsedBy:
+    def test_it_looks_for_the_claim_in_volumes(self, storage):
+        deployment = Manifest(
+            body={
+                "spec": {
+                    "template": {
+                        "spec": {
+                            "volumes": [
+                                {
+                                    "name": "data",
+                                    "persistentVolumeClaim": {
+                                        "claimName": pvc.CLAIM_NAME,
+                                        "readOnly": True,
+                                    },
+                                }
+                            ]
+                        }
+                    }
+                }
+            }
+        )
+        assert storage.is_used_by(deployment)
+        assert not storage.is_used_by(Manifest(body={}))
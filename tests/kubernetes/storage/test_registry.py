@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from zelt.kubernetes.storage import registry
+from zelt.kubernetes.storage.configmap import ConfigmapStorage
+from zelt.kubernetes.storage.protocol import StorageOptions
+
+
+@pytest.fixture()
+def plugin():
+    entry_point = MagicMock()
+    with patch.object(registry, "_entry_points", {"my-storage": entry_point}):
+        yield entry_point
+
+
+class TestCanonicalName:
+    @pytest.mark.parametrize("name", ("cm", "CM", "configmap", "ConfigMap"))
+    def test_it_resolves_aliases_ignoring_case(self, name):
+        assert registry.canonical_name(name) == "configmap"
+
+    def test_it_resolves_plugins(self, plugin):
+        assert registry.canonical_name("My-Storage") == "my-storage"
+
+    def test_it_rejects_unknown_names(self, plugin):
+        with pytest.raises(ValueError, match="unknown storage backend"):
+            registry.canonical_name("bob")
+
+    def test_it_does_not_scan_entry_points_for_builtin_backends(self):
+        with patch.object(registry, "entry_points") as entry_points:
+            registry.canonical_name("s3")
+        entry_points.assert_not_called()
+
+
+class TestLoad:
+    def test_it_imports_only_the_selected_builtin_module(self):
+        with patch("importlib.import_module") as import_module:
+            registry.load("cm-sharded")
+        import_module.assert_called_once_with("zelt.kubernetes.storage.sharded")
+
+    def test_it_builds_builtin_backends(self):
+        build = registry.load("configmap")
+        storage = build(StorageOptions(manifests=MagicMock()))
+        assert isinstance(storage, ConfigmapStorage)
+
+    def test_it_loads_plugins_from_their_entry_point(self, plugin):
+        assert registry.load("my-storage") is plugin.load()
+
+
+class TestNames:
+    def test_it_lists_builtin_backends_then_plugins(self, plugin):
+        assert registry.names() == list(registry.BUILTIN_BACKENDS) + ["my-storage"]
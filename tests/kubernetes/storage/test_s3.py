@@ -0,0 +1,69 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from zelt.kubernetes import bundle, digest
+from zelt.kubernetes.storage.s3 import DIGEST_METADATA, S3Storage
+
+
+@pytest.fixture()
+def locustfile(tmp_path: Path) -> Path:
+    locustfile = Path(tmp_path, "locustfile.py")
+    locustfile.write_text("print('hello')")
+    return locustfile
+
+
+@pytest.fixture()
+def storage() -> S3Storage:
+    storage = S3Storage(bucket="a-bucket", key="a-key")
+    storage._object = MagicMock()
+    return storage
+
+
+class TestUpload:
+    def test_it_uploads_new_objects_with_the_digest(self, storage, locustfile):
+        storage.object.load.side_effect = ClientError(
+            {"Error": {"Code": "404"}}, "HeadObject"
+        )
+
+        storage.upload(locustfile)
+
+        extra_args = storage.object.upload_file.call_args[1]["ExtraArgs"]
+        assert extra_args == {
+            "Metadata": {DIGEST_METADATA: digest.file_digest(locustfile)}
+        }
+
+    def test_it_skips_unchanged_locustfiles(self, storage, locustfile):
+        storage.object.metadata = {DIGEST_METADATA: digest.file_digest(locustfile)}
+        storage.upload(locustfile)
+        storage.object.upload_file.assert_not_called()
+
+    def test_it_uploads_changed_locustfiles(self, storage, locustfile):
+        storage.object.metadata = {DIGEST_METADATA: "another digest"}
+        storage.upload(locustfile)
+        storage.object.upload_file.assert_called_once()
+
+    def test_it_raises_other_errors(self, storage, locustfile):
+        storage.object.load.side_effect = ClientError(
+            {"Error": {"Code": "403"}}, "HeadObject"
+        )
+        with pytest.raises(ClientError):
+            storage.upload(locustfile)
+
+    def test_it_uploads_bundles_as_a_tarball(self, storage, tmp_path):
+        Path(tmp_path, "locustfile.py").write_text("print('hello')")
+        storage.object.metadata = {}
+
+        storage.upload(tmp_path)
+
+        storage.object.upload_file.assert_not_called()
+        fileobj = storage.object.upload_fileobj.call_args[0][0]
+        assert fileobj.read() == bundle.pack(tmp_path)
+
+    def test_it_uploads_with_the_tuned_transfer_config(self, storage, locustfile):
+        storage.object.metadata = {}
+        storage.upload(locustfile)
+        config = storage.object.upload_file.call_args[1]["Config"]
+        assert config.max_concurrency == storage.transfer_config.max_concurrency
@@ -0,0 +1,212 @@
+import base64
+import gzip
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from kubernetes.client import V1ConfigMap
+from kubernetes.client.rest import ApiException
+
+from zelt.kubernetes import digest
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.storage import sharded
+from zelt.kubernetes.storage.sharded import ShardedConfigmapStorage
+
+
+@pytest.fixture()
+def locustfile(tmp_path: Path) -> Path:
+    locustfile = Path(tmp_path, "locustfile.py")
+    # Random bytes don't compress, so that the locustfile spans many chunks.
+    locustfile.write_bytes(os.urandom(1000))
+    return locustfile
+
+
+@pytest.fixture()
+def storage() -> ShardedConfigmapStorage:
+    return ShardedConfigmapStorage(
+        namespace="a-namespace", labels={"some": "labels"}, chunk_size=300
+    )
+
+
+def _index(chunk_digests: str, locustfile_digest: str) -> V1ConfigMap:
+    return V1ConfigMap(
+        data={
+            sharded.CHUNKS_KEY: chunk_digests,
+            sharded.LOCUSTFILE_DIGEST_KEY: locustfile_digest,
+        }
+    )
+
+
+def _chunk_metadata(*digests: str) -> dict:
+    return {
+        "items": [
+            {
+                "metadata": {
+                    "name": sharded.chunk_name(i),
+                    "annotations": {sharded.CHUNK_DIGEST_ANNOTATION: d},
+                }
+            }
+            for i, d in enumerate(digests)
+        ]
+    }
+
+
+def _deployment(*config_maps: str) -> Manifest:
+    sources = [{"configMap": {"name": name}} for name in config_maps]
+    return Manifest(
+        body={
+            "kind": "Deployment",
+            "metadata": {"name": "a-deployment"},
+            "spec": {
+                "template": {"spec": {"volumes": [{"projected": {"sources": sources}}]}}
+            },
+        }
+    )
+
+
+@patch("zelt.kubernetes.storage.sharded.CoreV1Api")
+class TestUpload:
+    def test_it_uploads_chunks_before_the_index(self, core_api, storage, locustfile):
+        core_api().read_namespaced_config_map.side_effect = ApiException(status=404)
+        core_api().api_client.call_api.return_value = _chunk_metadata()
+
+        storage.upload(locustfile)
+
+        bodies = [
+            c[1]["body"] for c in core_api().create_namespaced_config_map.call_args_list
+        ]
+        names = [b.metadata["name"] for b in bodies]
+        assert names[-1] == "zelt-locustfile"
+        assert sorted(names[:-1]) == [sharded.chunk_name(i) for i in range(4)]
+
+        chunks = sorted(
+            (k, base64.b64decode(v))
+            for b in bodies[:-1]
+            for k, v in b.binary_data.items()
+        )
+        content = gzip.decompress(b"".join(c for _, c in chunks))
+        assert content == locustfile.read_bytes()
+
+        index = bodies[-1].data
+        assert sharded.parse_chunk_digests(index[sharded.CHUNKS_KEY]) == {
+            int(k[len(sharded.CHUNK_KEY_PREFIX) :]): hashlib.sha256(c).hexdigest()
+            for k, c in chunks
+        }
+        assert index[sharded.LOCUSTFILE_DIGEST_KEY] == digest.file_digest(locustfile)
+
+    def test_it_uploads_no_more_chunks_at_once_than_the_session_pool_size(
+        self, core_api, storage, locustfile
+    ):
+        core_api().read_namespaced_config_map.side_effect = ApiException(status=404)
+        core_api().api_client.call_api.return_value = _chunk_metadata()
+        storage.session = MagicMock(pool_size=2)
+
+        with patch(
+            "zelt.kubernetes.storage.sharded.ThreadPoolExecutor",
+            wraps=ThreadPoolExecutor,
+        ) as executor:
+            storage.upload(locustfile)
+
+        executor.assert_called_once_with(max_workers=2)
+        assert core_api().create_namespaced_config_map.call_count == 5
+
+    def test_it_deletes_stale_chunks(self, core_api, storage, locustfile):
+        core_api().read_namespaced_config_map.side_effect = ApiException(status=404)
+        core_api().api_client.call_api.return_value = _chunk_metadata(*"abcdef")
+
+        storage.upload(locustfile)
+
+        deleted = [
+            c[1]["name"] for c in core_api().delete_namespaced_config_map.call_args_list
+        ]
+        assert deleted == [sharded.chunk_name(4), sharded.chunk_name(5)]
+
+    def test_it_skips_complete_unchanged_locustfiles(
+        self, core_api, storage, locustfile
+    ):
+        core_api().read_namespaced_config_map.return_value = _index(
+            f"aaa  {sharded.chunk_key(0)}\nbbb  {sharded.chunk_key(1)}\n",
+            digest.file_digest(locustfile),
+        )
+        core_api().api_client.call_api.return_value = _chunk_metadata("aaa", "bbb")
+
+        storage.upload(locustfile)
+
+        core_api().create_namespaced_config_map.assert_not_called()
+
+    def test_it_detects_partial_uploads(self, core_api, storage, locustfile):
+        core_api().read_namespaced_config_map.return_value = _index(
+            f"aaa  {sharded.chunk_key(0)}\nbbb  {sharded.chunk_key(1)}\n",
+            digest.file_digest(locustfile),
+        )
+        core_api().api_client.call_api.return_value = _chunk_metadata("aaa", "ccc")
+
+        assert storage.stored_digest() == ""
+
+    def test_it_accepts_whole_configmaps_from_older_servers(
+        self, core_api, storage, locustfile
+    ):
+        core_api().read_namespaced_config_map.return_value = _index(
+            f"aaa  {sharded.chunk_key(0)}\n", digest.file_digest(locustfile)
+        )
+        chunks = _chunk_metadata("aaa")
+        chunks["kind"] = "ConfigMapList"
+        chunks["items"][0]["binaryData"] = {sharded.chunk_key(0): ""}
+        core_api().api_client.call_api.return_value = chunks
+
+        assert storage.stored_digest() == digest.file_digest(locustfile)
+        headers = core_api().api_client.call_api.call_args[1]["header_params"]
+        assert headers["Accept"].endswith(",application/json")
+
+    def test_it_rejects_more_chunks_than_deployments_project(
+        self, core_api, storage, locustfile
+    ):
+        storage.deployments = [
+            _deployment("zelt-locustfile", *(sharded.chunk_name(i) for i in range(2)))
+        ]
+        with pytest.raises(ValueError, match="zelt-locustfile-2, zelt-locustfile-3"):
+            storage.upload(locustfile)
+        core_api().create_namespaced_config_map.assert_not_called()
+
+    def test_it_ignores_deployments_without_the_index(
+        self, core_api, storage, locustfile
+    ):
+        core_api().read_namespaced_config_map.side_effect = ApiException(status=404)
+        core_api().api_client.call_api.return_value = _chunk_metadata()
+        storage.deployments = [_deployment("something-else")]
+
+        storage.upload(locustfile)
+
+        assert core_api().create_namespaced_config_map.call_count == 5
+
+    def test_it_rejects_bundles(self, core_api, storage, tmp_path):
+        with pytest.raises(ValueError, match="not supported"):
+            storage.upload(tmp_path)
+
+
+class TestIsUsedBy:
+    def test_it_looks_for_the_index_in_projected_volumes(self, storage):
+        deployment = Manifest(
+            body={
+                "spec": {
+                    "template": {
+                        "spec": {
+                            "volumes": [
+                                {
+                                    "projected": {
+                                        "sources": [
+                                            {"configMap": {"name": "zelt-locustfile"}}
+                                        ]
+                                    }
+                                }
+                            ]
+                        }
+                    }
+                }
+            }
+        )
+        assert storage.is_used_by(deployment)
+        assert not storage.is_used_by(Manifest(body={}))
@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from zelt.kubernetes.autoscaler import Autoscaler, AutoscalePolicy
+from zelt.kubernetes.fleet import FleetStatus
+
+
+def _autoscaler(**policy) -> Autoscaler:
+    return Autoscaler(MagicMock(), AutoscalePolicy(**{"max_workers": 10, **policy}))
+
+
+class TestAutoscalePolicy:
+    @pytest.mark.parametrize(
+        "policy",
+        [
+            {"max_workers": 0},
+            {"max_workers": 1, "cpu_threshold": 0},
+            {"max_workers": 1, "sustain": 0},
+        ],
+    )
+    def test_it_rejects_out_of_range_values(self, policy):
+        with pytest.raises(ValueError, match="positive"):
+            AutoscalePolicy(**policy).check()
+
+
+class TestDecide:
+    def test_it_keeps_workers_below_the_threshold(self):
+        assert _autoscaler(sustain=1).decide(4, 0.5) == 4
+
+    def test_it_keeps_workers_without_measurement(self):
+        assert _autoscaler(sustain=1).decide(4, None) == 4
+
+    def test_it_waits_for_sustained_saturation(self):
+        autoscaler = _autoscaler(sustain=3)
+        assert [autoscaler.decide(4, 0.9) for _ in range(3)] == [4, 4, 5]
+
+    def test_it_starts_over_when_saturation_stops(self):
+        autoscaler = _autoscaler(sustain=2)
+        assert autoscaler.decide(4, 0.9) == 4
+        assert autoscaler.decide(4, 0.7) == 4
+        assert autoscaler.decide(4, 0.9) == 4
+
+    def test_it_adds_enough_workers_to_reach_the_threshold(self):
+        assert _autoscaler(sustain=1, cpu_threshold=0.5).decide(4, 1.0) == 8
+
+    def test_it_does_not_exceed_the_maximum(self):
+        assert _autoscaler(sustain=1, max_workers=6).decide(4, 2.0) == 6
+        assert _autoscaler(sustain=1, max_workers=4).decide(4, 2.0) == 4
+
+
+class TestSample:
+    @patch("zelt.kubernetes.autoscaler.deployer.rescale_worker_deployment")
+    @patch("zelt.kubernetes.autoscaler.metrics.median_utilisation")
+    @patch("zelt.kubernetes.autoscaler.fleet.read_status")
+    def test_it_rescales_through_the_deployer_when_saturated(
+        self, read_status, median_utilisation, rescale
+    ):
+        read_status.return_value = FleetStatus(ready=4, total=4)
+        median_utilisation.return_value = 1.2
+        rescale.return_value = 6
+        autoscaler = _autoscaler(sustain=1, cpu_threshold=0.8)
+
+        assert autoscaler.sample() == 6
+        assert rescale.call_args[0][1] == 6
+
+    @patch("zelt.kubernetes.autoscaler.deployer.rescale_worker_deployment")
+    @patch("zelt.kubernetes.autoscaler.metrics.median_utilisation")
+    @patch("zelt.kubernetes.autoscaler.fleet.read_status")
+    def test_it_keeps_the_current_size_when_rescaling_fails(
+        self, read_status, median_utilisation, rescale
+    ):
+        read_status.return_value = FleetStatus(ready=4, total=4)
+        median_utilisation.return_value = 1.2
+        rescale.return_value = None
+
+        assert _autoscaler(sustain=1, cpu_threshold=0.8).sample() == 4
+
+    @patch("zelt.kubernetes.autoscaler.deployer.rescale_worker_deployment")
+    @patch("zelt.kubernetes.autoscaler.metrics.median_utilisation")
+    @patch("zelt.kubernetes.autoscaler.fleet.read_status")
+    def test_it_does_nothing_when_not_saturated(
+        self, read_status, median_utilisation, rescale
+    ):
+        read_status.return_value = FleetStatus(ready=4, total=4)
+        median_utilisation.return_value = 0.3
+
+        assert _autoscaler(sustain=1).sample() == 4
+        rescale.assert_not_called()
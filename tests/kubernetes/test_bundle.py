@@ -0,0 +1,92 @@
+import gzip
+import io
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from zelt.kubernetes import bundle
+
+
+@pytest.fixture()
+def directory(tmp_path: Path) -> Path:
+    Path(tmp_path, "locustfile.py").write_text("from helpers import task")
+    Path(tmp_path, "helpers.py").write_text("task = None")
+    Path(tmp_path, "data").mkdir()
+    Path(tmp_path, "data", "users.csv").write_text("alice\nbob\n")
+    return tmp_path
+
+
+class TestCheck:
+    def test_it_accepts_bundles_with_a_locustfile(self, directory):
+        bundle.check(directory)
+
+    def test_it_rejects_bundles_without_locustfile(self, tmp_path):
+        with pytest.raises(ValueError, match="Missing locustfile.py"):
+            bundle.check(tmp_path)
+
+
+class TestFileDigests:
+    def test_it_lists_nested_files_in_order(self, directory):
+        assert list(bundle.file_digests(directory)) == [
+            "data/users.csv",
+            "helpers.py",
+            "locustfile.py",
+        ]
+
+    def test_it_leaves_out_hidden_and_compiled_files(self, directory):
+        Path(directory, ".env").write_text("SECRET=1")
+        Path(directory, ".git").mkdir()
+        Path(directory, ".git", "HEAD").write_text("ref")
+        Path(directory, "__pycache__").mkdir()
+        Path(directory, "__pycache__", "helpers.cpython-37.pyc").write_bytes(b"")
+        Path(directory, "helpers.pyc").write_bytes(b"")
+        assert len(bundle.file_digests(directory)) == 3
+
+
+class TestManifest:
+    def test_it_can_be_parsed_back(self, directory):
+        digests = bundle.file_digests(directory)
+        assert bundle.parse_manifest(bundle.manifest(digests)) == digests
+
+
+class TestBundleDigest:
+    def test_it_changes_with_any_file(self, directory):
+        before = bundle.bundle_digest(directory)
+        Path(directory, "data", "users.csv").write_text("carol\n")
+        assert bundle.bundle_digest(directory) != before
+
+    def test_it_changes_with_file_names(self, directory):
+        before = bundle.bundle_digest(directory)
+        Path(directory, "helpers.py").rename(Path(directory, "utils.py"))
+        assert bundle.bundle_digest(directory) != before
+
+
+class TestPack:
+    def test_it_is_deterministic(self, directory):
+        first = bundle.pack(directory)
+        Path(directory, "helpers.py").touch()
+        assert bundle.pack(directory) == first
+
+    def test_it_holds_the_files_and_their_manifest(self, directory):
+        content = gzip.decompress(bundle.pack(directory))
+        with tarfile.open(fileobj=io.BytesIO(content)) as tar:
+            names = tar.getnames()
+            users = tar.extractfile("data/users.csv").read()
+        assert names[0] == bundle.MANIFEST_NAME
+        assert sorted(names[1:]) == sorted(bundle.file_digests(directory))
+        assert users == b"alice\nbob\n"
+
+    def test_it_packs_single_locustfiles_as_bundles(self, tmp_path):
+        locustfile = Path(tmp_path, "a_locustfile.py")
+        locustfile.write_text("print('hello')")
+        content = gzip.decompress(bundle.pack(locustfile))
+        with tarfile.open(fileobj=io.BytesIO(content)) as tar:
+            assert tar.getnames() == [bundle.MANIFEST_NAME, bundle.LOCUSTFILE_NAME]
+
+
+class TestSize:
+    def test_it_sums_the_files_of_bundles(self, directory):
+        assert bundle.size(directory) == len("from helpers import task") + len(
+            "task = None"
+        ) + len("alice\nbob\n")
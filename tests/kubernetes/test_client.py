@@ -2,12 +2,24 @@ from typing import List
 from unittest.mock import MagicMock, patch
 
 import pytest
-from kubernetes.client import V1Namespace
+from kubernetes.client import (
+    V1Deployment,
+    V1ListMeta,
+    V1Namespace,
+    V1NamespaceList,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodStatus,
+    V1Service,
+    V1ServiceSpec,
+)
 from kubernetes.client.rest import ApiException
 from tenacity import wait_none, RetryError, stop_after_attempt
 
+from zelt import tracing
 from zelt.kubernetes.client import (
     DEFAULT_DELETE_OPTIONS,
+    STATUS_CONFLICT,
     STATUS_NOT_FOUND,
     create_namespace,
     create_deployment,
@@ -20,10 +32,22 @@ from zelt.kubernetes.client import (
     delete_ingress,
     delete_deployments,
     await_no_resources_found,
+    _poll_no_resources_found,
+    _poll_until_pod_ready,
+    wait_until_pod_ready,
     rescale_deployment,
+    rescale_deployments,
+    _patch_deployment_scale,
     try_creating_custom_objects,
+    read_resource,
+    apply_manifest,
+    _replace_resource,
+    error_reason,
 )
+from zelt.kubernetes.discovery import CrdCache
 from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.session import Session
+from zelt.kubernetes.watcher import WaitTimeoutError, WatchUnavailableError
 
 
 class TestReadConfig:
@@ -32,6 +56,18 @@ class TestReadConfig:
         read_config()
         config.assert_called_once()
 
+    @patch("kubernetes.config.load_kube_config")
+    def test_it_returns_a_session_with_the_given_pool_size(self, config):
+        session = read_config(pool_size=3)
+        assert isinstance(session, Session)
+        assert session.configuration is config.call_args[1]["client_configuration"]
+        assert session.rest_client.pool_manager.connection_pool_kw["maxsize"] == 3
+
+    @patch("kubernetes.config.load_kube_config")
+    def test_it_loads_the_given_context(self, config):
+        read_config(context="other-cluster")
+        assert config.call_args[1]["context"] == "other-cluster"
+
     @patch("kubernetes.config.load_kube_config")
     def test_it_throws_error_when_file_not_found(self, config, caplog):
         config.side_effect = FileNotFoundError()
@@ -59,12 +95,20 @@ class TestCreateNamespace:
 
 
 class TestDeleteNamespace:
-    @patch("zelt.kubernetes.client.CoreV1Api.read_namespace", return_value=None)
+    @patch("zelt.kubernetes.client.await_no_resources_found")
     @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
-    def test_it_calls_kubernetes_api(self, delete, *_):
+    def test_it_calls_kubernetes_api(self, delete, waiting):
         namespace_name = "a_namespace"
         delete_namespace(namespace_name)
         delete.assert_called_once_with(name=namespace_name, body=DEFAULT_DELETE_OPTIONS)
+        waiting.assert_called_once()
+
+    @patch("zelt.kubernetes.client.await_no_resources_found")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
+    def test_it_does_not_wait_when_told_not_to(self, delete, waiting):
+        delete_namespace("a_namespace", wait=False)
+        delete.assert_called_once()
+        waiting.assert_not_called()
 
     @patch("zelt.kubernetes.client.await_no_resources_found")
     @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
@@ -88,17 +132,112 @@ class TestDeleteNamespace:
         delete.assert_called_once()
         waiting.assert_not_called()
 
+    @patch("zelt.kubernetes.client.KUBE_API_DELETE_TIMEOUT", 0)
     @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
-    @patch(
-        "zelt.kubernetes.client.CoreV1Api.read_namespace", return_value=V1Namespace()
-    )
-    def test_it_raises_exception_when_timeout_reached(self, *_):
-        await_no_resources_found.retry.wait = wait_none()
-        await_no_resources_found.retry.stop = stop_after_attempt(1)
+    @patch("zelt.kubernetes.client.CoreV1Api.list_namespace")
+    def test_it_raises_exception_when_timeout_reached(self, list_namespace, _):
+        list_namespace.__name__ = "list_namespace"
+        list_namespace.return_value = V1NamespaceList(
+            items=[V1Namespace(metadata=V1ObjectMeta(name="a_namespace"))],
+            metadata=V1ListMeta(),
+        )
 
-        with pytest.raises(RetryError):
+        with pytest.raises(WaitTimeoutError):
             delete_namespace("a_namespace")
 
+        list_namespace.assert_called_once_with(
+            field_selector="metadata.name=a_namespace"
+        )
+
+
+class TestAwaitNoResourcesFound:
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_watches_resources(self, wait_for):
+        list_resources = MagicMock()
+        await_no_resources_found(list_resources, namespace="a_namespace")
+        wait_for.assert_called_once()
+        list_resources.assert_not_called()
+
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_polls_when_watching_is_unavailable(self, wait_for):
+        wait_for.side_effect = WatchUnavailableError()
+        list_resources = MagicMock(return_value=MagicMock(items=[]))
+
+        await_no_resources_found(list_resources, namespace="a_namespace")
+
+        list_resources.assert_called_once_with(namespace="a_namespace")
+
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_raises_exception_when_polling_timeout_reached(self, wait_for):
+        wait_for.side_effect = WatchUnavailableError()
+        _poll_no_resources_found.retry.wait = wait_none()
+        _poll_no_resources_found.retry.stop = stop_after_attempt(1)
+
+        with pytest.raises(RetryError):
+            await_no_resources_found(MagicMock(return_value=[V1Namespace()]))
+
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_returns_when_resources_are_not_found(self, wait_for):
+        wait_for.side_effect = ApiException(status=STATUS_NOT_FOUND)
+        await_no_resources_found(MagicMock())
+
+
+class TestWaitUntilPodReady:
+    @pytest.fixture()
+    def manifest(self) -> Manifest:
+        return Manifest(
+            body={
+                "kind": "deployment",
+                "metadata": {
+                    "name": "a_deployment",
+                    "namespace": "a_namespace",
+                    "labels": {"role": "controller"},
+                },
+            }
+        )
+
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_watches_pods_of_the_deployment(self, wait_for, manifest):
+        wait_for.side_effect = lambda list_pods, condition, timeout, **kwargs: (
+            condition([MagicMock(**{"status.container_statuses": [MagicMock()]})])
+        )
+
+        wait_until_pod_ready(manifest)
+
+        assert wait_for.call_args[1] == {
+            "namespace": "a_namespace",
+            "label_selector": "role=controller",
+        }
+
+    @patch("zelt.kubernetes.client._list_pod")
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_polls_when_watching_is_unavailable(self, wait_for, list_pod, manifest):
+        wait_for.side_effect = WatchUnavailableError()
+        list_pod.return_value = [_pod(ready=[True, True])]
+        wait_until_pod_ready(manifest)
+        list_pod.assert_called_once_with("a_namespace", "role=controller", None)
+
+    @patch("zelt.kubernetes.client._list_pod")
+    @patch("zelt.kubernetes.client.watcher.wait_for")
+    def test_it_considers_all_containers_of_all_pods(
+        self, wait_for, list_pod, manifest
+    ):
+        wait_for.side_effect = WatchUnavailableError()
+        _poll_until_pod_ready.retry.wait = wait_none()
+        _poll_until_pod_ready.retry.stop = stop_after_attempt(1)
+        list_pod.return_value = [_pod(ready=[True, False]), _pod(ready=[])]
+
+        with pytest.raises(RetryError):
+            wait_until_pod_ready(manifest)
+
+
+def _pod(ready: List[bool]) -> V1Pod:
+    return V1Pod(
+        status=V1PodStatus(
+            container_statuses=[MagicMock(ready=r) for r in ready] or None
+        )
+    )
+
 
 class TestCreateDeployment:
     @patch("kubernetes.config.load_kube_config")
@@ -140,12 +279,52 @@ class TestRescaleDeployment:
             rescale_deployment(MagicMock(), -2)
 
     @patch("zelt.kubernetes.client.AppsV1Api.read_namespaced_deployment")
-    @patch("zelt.kubernetes.client.AppsV1Api.replace_namespaced_deployment")
-    def test_it_redeploys_when_given_a_positive_number_of_replicas(self, replace, read):
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_patches_the_scale_when_given_a_positive_number_of_replicas(
+        self, patch_scale, read
+    ):
         manifest = MagicMock()
         rescale_deployment(manifest, 2)
-        read.assert_called_once()
-        replace.assert_called_once()
+        patch_scale.assert_called_once_with(
+            name=manifest.name,
+            namespace=manifest.namespace,
+            body={"spec": {"replicas": 2}},
+        )
+        read.assert_not_called()
+
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_retries_on_conflict(self, patch_scale):
+        _patch_deployment_scale.retry.wait = wait_none()
+        patch_scale.side_effect = [ApiException(status=STATUS_CONFLICT), MagicMock()]
+        rescale_deployment(MagicMock(), 2)
+        assert patch_scale.call_count == 2
+
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_raises_exception(self, patch_scale):
+        patch_scale.side_effect = ApiException(status=500)
+        with pytest.raises(ApiException):
+            rescale_deployment(MagicMock(), 2)
+        patch_scale.assert_called_once()
+
+
+class TestRescaleDeployments:
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_rescales_all_given_deployments(self, patch_scale):
+        a, b = MagicMock(), MagicMock()
+        results = rescale_deployments([(a, 1), (b, 3)])
+        assert len(results) == 2
+        patch_scale.assert_any_call(
+            name=a.name, namespace=a.namespace, body={"spec": {"replicas": 1}}
+        )
+        patch_scale.assert_any_call(
+            name=b.name, namespace=b.namespace, body={"spec": {"replicas": 3}}
+        )
+
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_raises_exception(self, patch_scale):
+        patch_scale.side_effect = ApiException(status=500)
+        with pytest.raises(ApiException):
+            rescale_deployments([(MagicMock(), 1)])
 
 
 class TestDeleteDeployments:
@@ -364,6 +543,112 @@ class TestDeleteIngress:
         waiting.assert_not_called()
 
 
+class TestReadResource:
+    @patch("zelt.kubernetes.client.AppsV1Api.read_namespaced_deployment")
+    def test_it_returns_the_serialized_resource(self, read):
+        read.return_value = V1Deployment(
+            metadata=V1ObjectMeta(name="a_deployment", annotations={"a": "b"})
+        )
+        manifest = Manifest(
+            body={
+                "kind": "Deployment",
+                "metadata": {"name": "a_deployment", "namespace": "a_namespace"},
+            }
+        )
+
+        found = read_resource(manifest)
+
+        read.assert_called_once_with(name="a_deployment", namespace="a_namespace")
+        assert found == {
+            "metadata": {"name": "a_deployment", "annotations": {"a": "b"}}
+        }
+
+    @patch("zelt.kubernetes.client.CoreV1Api.read_namespace")
+    def test_it_returns_none_when_not_found(self, read):
+        read.side_effect = ApiException(status=STATUS_NOT_FOUND)
+        manifest = Manifest(body={"kind": "Namespace", "metadata": {"name": "a"}})
+        assert read_resource(manifest) is None
+
+    def test_it_rejects_unsupported_kinds(self):
+        manifest = Manifest(body={"kind": "Surprise", "metadata": {"name": "a"}})
+        with pytest.raises(ValueError, match="unsupported"):
+            read_resource(manifest)
+
+
+class TestErrorReason:
+    def test_it_prefers_the_reason_of_api_errors(self):
+        assert error_reason(ApiException(status=500, reason="Oops")) == "Oops"
+        assert error_reason(RuntimeError("too slow")) == "too slow"
+
+
+class TestApplyManifest:
+    @pytest.fixture()
+    def manifest(self) -> Manifest:
+        return Manifest(
+            body={
+                "kind": "Service",
+                "metadata": {"name": "a_service", "namespace": "a_namespace"},
+            }
+        )
+
+    @pytest.fixture()
+    def read(self):
+        with patch(
+            "zelt.kubernetes.client.CoreV1Api.read_namespaced_service"
+        ) as read_service:
+            read_service.return_value = V1Service(
+                metadata=V1ObjectMeta(name="a_service", resource_version="42"),
+                spec=V1ServiceSpec(cluster_ip="10.0.0.1"),
+            )
+            yield read_service
+
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.CoreV1Api.replace_namespaced_service")
+    def test_it_replaces_existing_resources(self, replace, create, read, manifest):
+        apply_manifest(manifest)
+        replace.assert_called_once_with(
+            name="a_service",
+            namespace="a_namespace",
+            body={
+                "kind": "Service",
+                "metadata": {
+                    "name": "a_service",
+                    "namespace": "a_namespace",
+                    "resourceVersion": "42",
+                },
+                "spec": {"clusterIP": "10.0.0.1"},
+            },
+        )
+        assert "resourceVersion" not in manifest.body["metadata"]
+        create.assert_not_called()
+
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.CoreV1Api.replace_namespaced_service")
+    def test_it_creates_missing_resources(self, replace, create, read, manifest):
+        read.side_effect = ApiException(status=STATUS_NOT_FOUND)
+        apply_manifest(manifest)
+        replace.assert_not_called()
+        create.assert_called_once_with(namespace="a_namespace", body=manifest.body)
+
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.CoreV1Api.replace_namespaced_service")
+    def test_it_reads_again_after_a_conflict(self, replace, create, read, manifest):
+        _replace_resource.retry.wait = wait_none()
+        replace.side_effect = [ApiException(status=STATUS_CONFLICT), None]
+        apply_manifest(manifest)
+        assert read.call_count == 2
+        assert replace.call_count == 2
+        create.assert_not_called()
+
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.CoreV1Api.replace_namespaced_service")
+    def test_it_raises_exception(self, replace, create, read, manifest):
+        replace.side_effect = ApiException(status=500)
+        with pytest.raises(ApiException):
+            apply_manifest(manifest)
+        create.assert_not_called()
+
+
 class TestCreateCustomResources:
     @pytest.fixture()
     def manifests(self) -> List[Manifest]:
@@ -465,6 +750,31 @@ class TestCreateCustomResources:
             plural="examplecustomresources",
         )
 
+    @patch("kubernetes.config.load_kube_config")
+    @patch("zelt.kubernetes.client.CustomObjectsApi")
+    @patch(
+        "zelt.kubernetes.client.ApiextensionsV1beta1Api.list_custom_resource_definition"
+    )
+    def test_it_traces_the_creations_of_each_thread(
+        self, list_crds, custom_objects_api, config, manifests, crds
+    ):
+        list_crds.return_value = MagicMock(items=crds)
+        custom_objects_api().create_namespaced_custom_object.side_effect = (
+            lambda **_: tracing.count_api_call()
+        )
+        tracer = tracing.enable()
+        try:
+            try_creating_custom_objects(manifests[:2])
+        finally:
+            tracing.disable()
+
+        creations = [
+            s
+            for s in tracer.spans
+            if s.name == "client._create_custom_object_with_plural"
+        ]
+        assert [s.api_calls for s in creations] == [1, 1]
+
     @patch("kubernetes.config.load_kube_config")
     @patch("zelt.kubernetes.client.CustomObjectsApi")
     @patch(
@@ -509,6 +819,44 @@ class TestCreateCustomResources:
             for r in caplog.records
         ), "an error should be logged"
 
+    @patch("zelt.kubernetes.client.CustomObjectsApi")
+    @patch(
+        "zelt.kubernetes.client.ApiextensionsV1beta1Api.list_custom_resource_definition"
+    )
+    def test_it_fetches_crds_only_once_per_cluster_with_a_cache(
+        self, list_crds, custom_objects_api, manifests, crds
+    ):
+        list_crds.return_value = MagicMock(items=crds)
+        session = MagicMock(crd_cache=CrdCache())
+
+        try_creating_custom_objects(manifests[:2], session)
+        try_creating_custom_objects(manifests[:2], session)
+
+        list_crds.assert_called_once()
+        assert custom_objects_api().create_namespaced_custom_object.call_count == 4
+
+    @patch("zelt.kubernetes.client.CustomObjectsApi")
+    @patch(
+        "zelt.kubernetes.client.ApiextensionsV1beta1Api.list_custom_resource_definition"
+    )
+    def test_it_fetches_crds_again_when_a_kind_is_not_cached(
+        self, list_crds, custom_objects_api, manifests, crds
+    ):
+        list_crds.side_effect = [MagicMock(items=[crds[0]]), MagicMock(items=crds)]
+        session = MagicMock(crd_cache=CrdCache())
+
+        try_creating_custom_objects(manifests[:1], session)
+        try_creating_custom_objects(manifests[:2], session)
+
+        assert list_crds.call_count == 2
+        custom_objects_api().create_namespaced_custom_object.assert_called_with(
+            namespace=manifests[1].namespace,
+            body=manifests[1].body,
+            group="example.com",
+            version="v2",
+            plural="examplecustomresources",
+        )
+
     @patch("kubernetes.config.load_kube_config")
     @patch("zelt.kubernetes.client.CustomObjectsApi")
     @patch(
@@ -0,0 +1,78 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from zelt.kubernetes import clusters
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.manifest_set import ManifestSet
+
+
+@pytest.fixture()
+def manifest_set() -> ManifestSet:
+    worker = Manifest(
+        body={
+            "kind": "Deployment",
+            "metadata": {"name": "worker", "labels": {"role": "worker"}},
+            "spec": {"replicas": 1},
+        }
+    )
+    return ManifestSet(
+        namespace=MagicMock(),
+        service=MagicMock(),
+        ingress=MagicMock(),
+        controller=MagicMock(),
+        workers=[worker],
+        others=[],
+    )
+
+
+class TestWorkerClusters:
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_reads_the_config_of_each_context(self, read_config, manifest_set):
+        workers = clusters.worker_clusters(manifest_set, ["a", "b"], pool_size=3)
+        assert [c.context for c in workers] == ["a", "b"]
+        assert [c[1] for c in read_config.call_args_list] == [
+            {"context": "a"},
+            {"context": "b"},
+        ]
+
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_gives_each_cluster_its_own_worker_manifests(
+        self, _read_config, manifest_set
+    ):
+        a, b = clusters.worker_clusters(manifest_set, ["a", "b"])
+        a.manifests.workers[0].body["spec"]["replicas"] = 5
+        assert b.manifests.workers[0].body["spec"]["replicas"] == 1
+        assert manifest_set.workers[0].body["spec"]["replicas"] == 1
+
+    def test_it_fails_given_duplicate_contexts(self, manifest_set):
+        with pytest.raises(ValueError, match="distinct"):
+            clusters.worker_clusters(manifest_set, ["a", "a"])
+
+    def test_it_fails_without_workers_to_fan_out(self, manifest_set):
+        with pytest.raises(ValueError, match="worker"):
+            clusters.worker_clusters(manifest_set._replace(workers=[]), ["a"])
+
+
+class TestDistribute:
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_splits_workers_evenly(self, _read_config, manifest_set):
+        workers = clusters.worker_clusters(manifest_set, ["a", "b", "c"])
+        shares = [n for _, n in clusters.distribute(10, workers)]
+        assert shares == [4, 3, 3]
+
+
+class TestRunInEach:
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_runs_in_all_clusters_before_raising(self, _read_config, manifest_set):
+        workers = clusters.worker_clusters(manifest_set, ["a", "b"])
+        visited = []
+
+        def operation(cluster):
+            visited.append(cluster.context)
+            if cluster.context == "a":
+                raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            clusters.run_in_each(workers, operation)
+        assert sorted(visited) == ["a", "b"]
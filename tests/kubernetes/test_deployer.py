@@ -1,12 +1,15 @@
+import copy
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 import pytest
 
-from zelt.kubernetes import deployer
-from zelt.kubernetes.manifest import Manifest
-from zelt.kubernetes.manifest_set import ManifestSet
+import zelt.kubernetes.client as kube
+from zelt.kubernetes import deployer, digest, pools, ramp
+from zelt.kubernetes.manifest import DeploymentRole, Manifest
+from zelt.kubernetes.manifest_set import ManifestSet, from_directory
 from zelt.kubernetes.storage.configmap import ConfigmapStorage
 
 
@@ -36,7 +39,7 @@ def manifest_set(tmp_path: Path) -> ManifestSet:
         service=Manifest.from_file(manifest_file),
         ingress=Manifest.from_file(manifest_file),
         controller=Manifest.from_file(manifest_file),
-        worker=Manifest.from_file(manifest_file),
+        workers=[Manifest.from_file(manifest_file)],
         others=[],
     )
 
@@ -51,7 +54,10 @@ def locustfile(tmp_path: Path) -> Path:
 
 @pytest.fixture()
 def configmap_storage() -> ConfigmapStorage:
-    return ConfigmapStorage(namespace="a-namespace", labels={"some": "labels"})
+    storage = ConfigmapStorage(namespace="a-namespace", labels={"some": "labels"})
+    # No ConfigMap exists yet.
+    storage.stored_digest = MagicMock(return_value=None)
+    return storage
 
 
 class TestCreateResources:
@@ -131,7 +137,7 @@ class TestCreateResources:
         config,
         manifest_set: ManifestSet,
     ):
-        manifest_set = manifest_set._replace(worker=None)
+        manifest_set = manifest_set._replace(workers=[])
         deployer.create_resources(
             ms=manifest_set, storage=MagicMock(), locustfile=MagicMock()
         )
@@ -141,6 +147,295 @@ class TestCreateResources:
         assert create_deployment.call_count == 1
 
 
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespace")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.NetworkingV1beta1Api.create_namespaced_ingress")
+    @patch("zelt.kubernetes.client.AppsV1Api.create_namespaced_deployment")
+    @patch("zelt.kubernetes.client.wait_until_pod_ready")
+    def test_it_does_not_wait_for_the_controller_before_creating_other_resources(
+        self,
+        wait,
+        create_deployment,
+        create_ingress,
+        create_service,
+        create_namespace,
+        config,
+        manifest_set: ManifestSet,
+    ):
+        created = threading.Event()
+        create_service.side_effect = lambda **_: created.set()
+        wait.side_effect = lambda *_, **__: created.wait(timeout=5) or pytest.fail()
+
+        deployer.create_resources(
+            ms=manifest_set, storage=MagicMock(), locustfile=MagicMock()
+        )
+
+        assert create_deployment.call_count == 2
+
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespace")
+    @patch("zelt.kubernetes.client.AppsV1Api.create_namespaced_deployment")
+    def test_it_does_not_create_resources_when_namespace_creation_fails(
+        self, create_deployment, create_namespace, config, manifest_set: ManifestSet
+    ):
+        create_namespace.side_effect = kube.ApiException()
+        storage = MagicMock()
+
+        deployer.create_resources(ms=manifest_set, storage=storage, locustfile="f")
+
+        storage.upload.assert_not_called()
+        create_deployment.assert_not_called()
+
+
+class TestCreateResourcesOrder:
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespace")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.NetworkingV1beta1Api.create_namespaced_ingress")
+    @patch("zelt.kubernetes.client.AppsV1Api.create_namespaced_deployment")
+    @patch("zelt.kubernetes.client.wait_until_pod_ready")
+    def test_it_creates_deployments_after_uploading_the_locustfile(
+        self,
+        wait,
+        create_deployment,
+        create_ingress,
+        create_service,
+        create_namespace,
+        config,
+        locustfile: Path,
+        manifest_set: ManifestSet,
+    ):
+        events = []
+        storage = MagicMock()
+        storage.upload.side_effect = lambda *_: events.append("locustfile")
+        create_deployment.side_effect = lambda **_: events.append("deployment")
+
+        deployer.create_resources(
+            ms=manifest_set, storage=storage, locustfile=locustfile
+        )
+
+        assert events == ["locustfile", "deployment", "deployment"]
+
+
+class TestCreateResourcesWithPrepull:
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespace")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_service")
+    @patch("zelt.kubernetes.client.NetworkingV1beta1Api.create_namespaced_ingress")
+    @patch("zelt.kubernetes.client.AppsV1Api.create_namespaced_deployment")
+    @patch("zelt.kubernetes.client.wait_until_pod_ready")
+    @patch("zelt.kubernetes.deployer.prepull_images")
+    def test_it_creates_workers_after_pulling_their_images(
+        self,
+        prepull_images,
+        wait,
+        create_deployment,
+        create_ingress,
+        create_service,
+        create_namespace,
+        config,
+        manifest_set: ManifestSet,
+    ):
+        events = []
+        prepull_images.side_effect = lambda *_, **__: events.append("prepull")
+        create_deployment.side_effect = lambda **kw: events.append(
+            kw["body"]["metadata"]["labels"]["role"]
+        )
+        manifest_set = manifest_set._replace(
+            workers=[copy.deepcopy(manifest_set.controller)]
+        )
+        manifest_set.workers[0].body["metadata"]["labels"]["role"] = "worker"
+
+        deployer.create_resources(
+            ms=manifest_set, storage=MagicMock(), locustfile=MagicMock(), prepull=True
+        )
+
+        prepull_images.assert_called_once()
+        assert events.index("prepull") < events.index("worker")
+
+
+class TestCreateWorkerResources:
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespace")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespaced_config_map")
+    @patch("zelt.kubernetes.client.AppsV1Api.create_namespaced_deployment")
+    def test_it_creates_the_namespace_locustfile_and_workers_only(
+        self,
+        create_deployment,
+        create_configmap,
+        create_namespace,
+        config,
+        configmap_storage: ConfigmapStorage,
+        locustfile: Path,
+        manifest_set: ManifestSet,
+    ):
+        deployer.create_worker_resources(
+            ms=manifest_set, storage=configmap_storage, locustfile=locustfile
+        )
+        create_namespace.assert_called_once()
+        create_configmap.assert_called_once()
+        assert create_deployment.call_count == len(manifest_set.workers)
+
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.create_namespace")
+    @patch("zelt.kubernetes.client.AppsV1Api.create_namespaced_deployment")
+    def test_it_does_not_upload_storage_living_outside_the_namespace(
+        self,
+        create_deployment,
+        create_namespace,
+        config,
+        locustfile: Path,
+        manifest_set: ManifestSet,
+    ):
+        storage = MagicMock(deleted_with_namespace=False)
+        deployer.create_worker_resources(
+            ms=manifest_set, storage=storage, locustfile=locustfile
+        )
+        storage.upload.assert_not_called()
+        create_deployment.assert_called_once()
+
+
+class TestApplyResources:
+    @pytest.fixture()
+    def manifest_path(self) -> Path:
+        return Path(__file__).parents[2] / "examples" / "manifests" / "distributed"
+
+    @pytest.fixture()
+    def example_set(self, manifest_path: Path) -> ManifestSet:
+        return from_directory(manifest_path)
+
+    @pytest.fixture()
+    def cluster(self) -> dict:
+        """Resources as stored in the cluster, keyed by name."""
+        return {}
+
+    @pytest.fixture()
+    def kube_api(self, cluster: dict):
+        def apply(manifest, session=None):
+            cluster[manifest.name] = copy.deepcopy(manifest.body)
+
+        with patch("zelt.kubernetes.client.read_resource") as read, patch(
+            "zelt.kubernetes.client.apply_manifest", side_effect=apply
+        ) as apply_manifest, patch("zelt.kubernetes.client.wait_until_pod_ready"):
+            read.side_effect = lambda m, session=None: cluster.get(m.name)
+            yield apply_manifest
+
+    def test_it_creates_everything_the_first_time(
+        self, kube_api, cluster, example_set, locustfile
+    ):
+        storage = MagicMock()
+
+        deployer.apply_resources(example_set, storage, locustfile, MagicMock())
+
+        storage.upload.assert_called_once_with(locustfile)
+        assert kube_api.call_count == 5
+        assert set(cluster) == {
+            "zelt",
+            "zelt-locust-controller",
+            "zelt-locust-worker",
+            "zelt-service",
+            "zelt-ingress",
+        }
+
+    def test_it_does_nothing_when_nothing_changed(
+        self, kube_api, example_set, locustfile, manifest_path
+    ):
+        storage = MagicMock()
+        deployer.apply_resources(example_set, storage, locustfile, MagicMock())
+        storage.reset_mock()
+        kube_api.reset_mock()
+
+        unchanged_set = from_directory(manifest_path)
+        deployer.apply_resources(unchanged_set, storage, locustfile, MagicMock())
+
+        storage.upload.assert_not_called()
+        kube_api.assert_not_called()
+
+    def test_it_only_updates_changed_resources(
+        self, kube_api, example_set, locustfile, manifest_path
+    ):
+        storage = MagicMock()
+        deployer.apply_resources(example_set, storage, locustfile, MagicMock())
+        storage.reset_mock()
+        kube_api.reset_mock()
+
+        changed_set = from_directory(manifest_path)
+        changed_set.service.body["spec"]["ports"].pop()
+        deployer.apply_resources(changed_set, storage, locustfile, MagicMock())
+
+        storage.upload.assert_not_called()
+        kube_api.assert_called_once()
+        assert kube_api.call_args[0][0].name == "zelt-service"
+
+    def test_it_only_restarts_deployments_using_a_changed_locustfile(
+        self, kube_api, cluster, example_set, locustfile, manifest_path
+    ):
+        storage = MagicMock()
+        storage.is_used_by.side_effect = lambda d: d.role is DeploymentRole.WORKER
+        deployer.apply_resources(example_set, storage, locustfile, MagicMock())
+        storage.reset_mock()
+        kube_api.reset_mock()
+
+        locustfile.write_text("# changed")
+        deployer.apply_resources(
+            from_directory(manifest_path), storage, locustfile, MagicMock()
+        )
+
+        storage.upload.assert_called_once_with(locustfile)
+        kube_api.assert_called_once()
+        assert kube_api.call_args[0][0].name == "zelt-locust-worker"
+
+
+class TestUpdateLocustfile:
+    @patch("zelt.kubernetes.deployer.fleet.wait_until_rolled_out")
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment")
+    def test_it_restarts_the_controller_before_the_workers(
+        self, patch_deployment, _config, rolled_out, manifest_set, locustfile
+    ):
+        events = []
+        patch_deployment.side_effect = lambda **kw: events.append("patch")
+        rolled_out.side_effect = lambda *_: events.append("rolled out") or 1.0
+        storage = MagicMock()
+
+        assert deployer.update_locustfile(manifest_set, storage, locustfile, wait=True)
+
+        storage.upload.assert_called_once_with(locustfile)
+        assert events == ["patch", "rolled out", "patch", "rolled out"]
+        template = patch_deployment.call_args[1]["body"]["spec"]["template"]
+        assert template["metadata"]["annotations"] == {
+            digest.LOCUSTFILE_DIGEST_ANNOTATION: digest.file_digest(locustfile)
+        }
+
+    @patch("zelt.kubernetes.deployer.fleet.wait_until_rolled_out")
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment")
+    def test_it_does_not_restart_workers_when_the_controller_fails(
+        self, patch_deployment, _config, rolled_out, manifest_set, locustfile
+    ):
+        rolled_out.side_effect = kube.WaitTimeoutError("too slow")
+
+        assert not deployer.update_locustfile(
+            manifest_set, MagicMock(), locustfile, wait=True
+        )
+        patch_deployment.assert_called_once()
+
+    @patch("zelt.kubernetes.deployer.fleet.wait_until_rolled_out")
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment")
+    def test_it_only_uploads_storage_of_the_workers_cluster(
+        self, patch_deployment, _config, rolled_out, manifest_set, locustfile
+    ):
+        storage = MagicMock(deleted_with_namespace=False)
+
+        deployer.update_worker_locustfile(manifest_set, storage, locustfile)
+
+        storage.upload.assert_not_called()
+        patch_deployment.assert_called_once()
+        rolled_out.assert_not_called()
+
+
 class TestDeleteResources:
     @patch("zelt.kubernetes.client.config")
     @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
@@ -168,24 +463,102 @@ class TestDeleteResources:
         delete_ingress.assert_called_once()
         delete_deployments.assert_called_once()
 
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespaced_service")
+    @patch("zelt.kubernetes.client.NetworkingV1beta1Api.delete_namespaced_ingress")
+    @patch("zelt.kubernetes.client.await_no_resources_found")
+    @patch("zelt.kubernetes.client.AppsV1Api.delete_collection_namespaced_deployment")
+    def test_it_deletes_storage_mounted_by_pods_after_the_deployments(
+        self,
+        delete_deployments,
+        wait,
+        delete_ingress,
+        delete_service,
+        delete_namespace,
+        config,
+        manifest_set: ManifestSet,
+    ):
+        def delete_claim():
+            # A claim mounted by pods stays Terminating until they are gone.
+            if not delete_deployments.called:
+                raise kube.WaitTimeoutError("claim still in use")
+
+        storage = MagicMock(deleted_with_namespace=True)
+        storage.delete.side_effect = delete_claim
+
+        deployer.delete_resources(ms=manifest_set, storage=storage)
+
+        storage.delete.assert_called_once()
+        delete_deployments.assert_called_once()
+        delete_namespace.assert_called_once()
+
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespaced_service")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespaced_config_map")
+    @patch("zelt.kubernetes.client.await_no_resources_found")
+    def test_it_only_deletes_the_namespace_in_fast_mode(
+        self,
+        wait,
+        delete_configmap,
+        delete_service,
+        delete_namespace,
+        config,
+        configmap_storage: ConfigmapStorage,
+        manifest_set: ManifestSet,
+    ):
+        deployer.delete_resources(
+            ms=manifest_set, storage=configmap_storage, fast=True, wait=False
+        )
+        delete_namespace.assert_called_once()
+        delete_service.assert_not_called()
+        delete_configmap.assert_not_called()
+        wait.assert_not_called()
+
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.CoreV1Api.delete_namespace")
+    @patch("zelt.kubernetes.client.await_no_resources_found")
+    def test_it_deletes_storage_outside_the_namespace_in_fast_mode(
+        self, wait, delete_namespace, config, manifest_set: ManifestSet
+    ):
+        storage = MagicMock(deleted_with_namespace=False)
+        deployer.delete_resources(ms=manifest_set, storage=storage, fast=True)
+        storage.delete.assert_called_once()
+        delete_namespace.assert_called_once()
+        wait.assert_called_once()
+
 
 class TestUpdateWorkerPods:
     def test_it_does_nothing_if_no_worker_manifest_exists(
         self, manifest_set: ManifestSet
     ):
-        manifest_set = manifest_set._replace(worker=None)
+        manifest_set = manifest_set._replace(workers=[])
         deployer.update_worker_pods(manifest_set, 2)
-        assert manifest_set.worker is None
+        assert manifest_set.workers == []
 
     def test_it_replaces_the_number_of_worker_replicas_in_place(
         self, manifest_set: ManifestSet
     ):
-        original_replicas = int(manifest_set.worker.body["spec"]["replicas"])
+        original_replicas = int(manifest_set.workers[0].body["spec"]["replicas"])
         expected_replicas = original_replicas + 1
 
         deployer.update_worker_pods(manifest_set, expected_replicas)
 
-        assert int(manifest_set.worker.body["spec"]["replicas"]) == expected_replicas
+        assert (
+            int(manifest_set.workers[0].body["spec"]["replicas"]) == expected_replicas
+        )
+
+    def test_it_distributes_replicas_between_pools_by_weight(
+        self, manifest_set: ManifestSet
+    ):
+        spot = copy.deepcopy(manifest_set.workers[0])
+        spot.body["metadata"]["annotations"] = {pools.POOL_WEIGHT_ANNOTATION: "3"}
+        manifest_set = manifest_set._replace(workers=[manifest_set.workers[0], spot])
+
+        deployer.update_worker_pods(manifest_set, 8)
+
+        assert [w.body["spec"]["replicas"] for w in manifest_set.workers] == [2, 6]
 
     def test_it_only_updates_worker_manifest_replicas(self, manifest_set):
         controller_replicas = int(manifest_set.controller.body["spec"]["replicas"])
@@ -198,19 +571,86 @@ class TestUpdateWorkerPods:
 
 
 class TestRescaleWorkerDeployment:
-    @patch("zelt.kubernetes.client.AppsV1Api.replace_namespaced_deployment")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
     def test_it_does_not_rescale_when_not_given_a_worker_manifest(
         self, rescale, manifest_set: ManifestSet
     ):
-        manifest_set = manifest_set._replace(worker=None)
+        manifest_set = manifest_set._replace(workers=[])
         deployer.rescale_worker_deployment(manifest_set, 0)
         rescale.assert_not_called()
 
     @patch("zelt.kubernetes.client.config")
-    @patch("zelt.kubernetes.client.AppsV1Api.read_namespaced_deployment")
-    @patch("zelt.kubernetes.client.AppsV1Api.replace_namespaced_deployment")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
     def test_it_rescales_when_given_a_worker_manifest(
-        self, rescale, _read, _config, manifest_set: ManifestSet
+        self, rescale, _config, manifest_set: ManifestSet
     ):
-        deployer.rescale_worker_deployment(manifest_set, 0)
+        assert deployer.rescale_worker_deployment(manifest_set, 0) == 0
+        rescale.assert_called_once()
+
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_returns_none_when_rescaling_fails(
+        self, rescale, _config, manifest_set: ManifestSet
+    ):
+        rescale.side_effect = kube.ApiException(status=403)
+        assert deployer.rescale_worker_deployment(manifest_set, 4) is None
+
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_rescales_every_worker_pool(
+        self, rescale, _config, manifest_set: ManifestSet
+    ):
+        workers = [copy.deepcopy(manifest_set.workers[0]) for _ in range(2)]
+        for pool, worker in zip(("spot", "compute"), workers):
+            worker.body["metadata"]["name"] = f"worker-{pool}"
+        manifest_set = manifest_set._replace(workers=workers)
+
+        deployer.rescale_worker_deployment(manifest_set, 5)
+
+        calls = {c[1]["name"]: c[1]["body"] for c in rescale.call_args_list}
+        assert calls == {
+            "worker-spot": {"spec": {"replicas": 3}},
+            "worker-compute": {"spec": {"replicas": 2}},
+        }
+
+    @patch("zelt.kubernetes.deployer.fleet.wait_until_ready")
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_waits_for_workers_when_given_a_fraction(
+        self, _rescale, _config, wait_until_ready, manifest_set: ManifestSet
+    ):
+        deployer.rescale_worker_deployment(manifest_set, 4, wait_ready=0.5)
+        wait_until_ready.assert_called_once()
+        assert wait_until_ready.call_args[0][:2] == (manifest_set.workers, 0.5)
+
+
+class TestRampWorkerDeployment:
+    @patch("zelt.kubernetes.deployer.sleep")
+    @patch("zelt.kubernetes.deployer.fleet.wait_until_ready")
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_rescales_and_waits_for_each_step(
+        self, rescale, _config, wait_until_ready, sleep, manifest_set: ManifestSet
+    ):
+        steps = [ramp.RampStep(2, 60.0), ramp.RampStep(4, 60.0)]
+        deployer.ramp_worker_deployment(manifest_set, steps)
+
+        replicas = [c[1]["body"]["spec"]["replicas"] for c in rescale.call_args_list]
+        assert replicas == [2, 4]
+        assert wait_until_ready.call_count == 2
+        assert wait_until_ready.call_args[0][1] == 1.0
+        sleep.assert_called_once()
+
+    @patch("zelt.kubernetes.deployer.sleep")
+    @patch("zelt.kubernetes.deployer.fleet.wait_until_ready")
+    @patch("zelt.kubernetes.client.config")
+    @patch("zelt.kubernetes.client.AppsV1Api.patch_namespaced_deployment_scale")
+    def test_it_stops_at_the_first_failure(
+        self, rescale, _config, wait_until_ready, sleep, manifest_set: ManifestSet
+    ):
+        wait_until_ready.side_effect = kube.WaitTimeoutError("too slow")
+        steps = [ramp.RampStep(2, 60.0), ramp.RampStep(4, 60.0)]
+        deployer.ramp_worker_deployment(manifest_set, steps)
+
         rescale.assert_called_once()
+        sleep.assert_not_called()
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from zelt.kubernetes import digest
+from zelt.kubernetes.manifest import Manifest
+
+
+def _deployment() -> Manifest:
+    return Manifest(
+        body={
+            "kind": "Deployment",
+            "metadata": {"name": "a_deployment", "namespace": "a_namespace"},
+            "spec": {"replicas": 1, "template": {"spec": {"containers": []}}},
+        }
+    )
+
+
+class TestFileDigest:
+    def test_it_depends_only_on_file_content(self, tmp_path: Path):
+        a, b = Path(tmp_path, "a.py"), Path(tmp_path, "b.py")
+        a.write_text("content")
+        b.write_text("content")
+        assert digest.file_digest(a) == digest.file_digest(b)
+        b.write_text("other content")
+        assert digest.file_digest(a) != digest.file_digest(b)
+
+
+class TestManifestDigest:
+    def test_it_ignores_key_order(self):
+        a = Manifest(body={"kind": "Service", "metadata": {"name": "a"}})
+        b = Manifest(body={"metadata": {"name": "a"}, "kind": "Service"})
+        assert digest.manifest_digest(a) == digest.manifest_digest(b)
+
+    def test_it_changes_with_the_manifest(self):
+        manifest = _deployment()
+        before = digest.manifest_digest(manifest)
+        manifest.body["spec"]["replicas"] = 2
+        assert digest.manifest_digest(manifest) != before
+
+    def test_it_ignores_its_own_annotation(self):
+        manifest = _deployment()
+        before = digest.manifest_digest(manifest)
+        digest.annotate_digest(manifest)
+        assert digest.manifest_digest(manifest) == before
+
+
+class TestAnnotations:
+    def test_stored_digest_can_be_read_back(self):
+        manifest = _deployment()
+        stored = digest.annotate_digest(manifest)
+        assert digest.applied_digest(manifest.body) == stored
+
+    def test_stored_locustfile_digest_can_be_read_back(self):
+        manifest = _deployment()
+        digest.annotate_locustfile_digest(manifest, "abc")
+        assert digest.applied_locustfile_digest(manifest.body) == "abc"
+
+    def test_locustfile_digest_changes_the_manifest_digest(self):
+        manifest = _deployment()
+        before = digest.manifest_digest(manifest)
+        digest.annotate_locustfile_digest(manifest, "abc")
+        assert digest.manifest_digest(manifest) != before
+
+    def test_missing_digests_are_none(self):
+        assert digest.applied_digest(None) is None
+        assert digest.applied_locustfile_digest({"metadata": {}}) is None
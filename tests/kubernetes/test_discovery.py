@@ -0,0 +1,60 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from zelt.kubernetes.discovery import (
+    CrdCache,
+    CustomResource,
+    default_cache_directory,
+    index,
+)
+
+RESOURCES = index(
+    [
+        CustomResource("StackSet", "stacksets", "Namespaced"),
+        CustomResource("ClusterThing", "clusterthings", "Cluster"),
+    ]
+)
+
+
+class TestIndex:
+    def test_it_indexes_resources_by_lower_cased_kind(self):
+        assert RESOURCES["stackset"].plural == "stacksets"
+        assert RESOURCES["stackset"].namespaced
+        assert not RESOURCES["clusterthing"].namespaced
+
+
+class TestDefaultCacheDirectory:
+    def test_it_follows_xdg_cache_home(self, monkeypatch, tmp_path: Path):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert default_cache_directory() == tmp_path / "zelt" / "crds"
+
+
+class TestCrdCache:
+    def test_it_keeps_resources_in_memory(self):
+        cache = CrdCache()
+        cache.put("https://a", RESOURCES)
+        assert cache.get("https://a") == RESOURCES
+        assert cache.get("https://b") is None
+
+    def test_it_keeps_resources_on_disk_per_cluster(self, tmp_path: Path):
+        CrdCache(tmp_path).put("https://a", RESOURCES)
+
+        assert CrdCache(tmp_path).get("https://a") == RESOURCES
+        assert CrdCache(tmp_path).get("https://b") is None
+        assert len(list(tmp_path.iterdir())) == 1
+
+    @patch("zelt.kubernetes.discovery.time")
+    def test_it_expires_resources_after_ttl(self, time, tmp_path: Path):
+        time.return_value = 1000
+        CrdCache(tmp_path, ttl=60).put("https://a", RESOURCES)
+
+        time.return_value = 1061
+        assert CrdCache(tmp_path, ttl=60).get("https://a") is None
+
+    def test_it_ignores_corrupted_files(self, tmp_path: Path):
+        cache = CrdCache(tmp_path)
+        cache.put("https://a", RESOURCES)
+        for f in tmp_path.iterdir():
+            f.write_text("{not json")
+
+        assert CrdCache(tmp_path).get("https://a") is None
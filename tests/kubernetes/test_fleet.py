@@ -0,0 +1,152 @@
+from typing import Optional
+from unittest.mock import patch
+
+import pytest
+from kubernetes.client import (
+    V1Deployment,
+    V1DeploymentList,
+    V1DeploymentSpec,
+    V1DeploymentStatus,
+    V1LabelSelector,
+    V1ListMeta,
+    V1ObjectMeta,
+    V1PodTemplateSpec,
+)
+
+from zelt.kubernetes import fleet
+from zelt.kubernetes.fleet import FleetStatus
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.watcher import WatchUnavailableError
+
+
+def _deployment(name: str, replicas: int, ready: Optional[int]) -> V1Deployment:
+    return V1Deployment(
+        metadata=V1ObjectMeta(name=name, namespace="ns", resource_version="1"),
+        spec=V1DeploymentSpec(
+            replicas=replicas, selector=V1LabelSelector(), template=V1PodTemplateSpec()
+        ),
+        status=V1DeploymentStatus(ready_replicas=ready),
+    )
+
+
+def _manifest(name: str) -> Manifest:
+    return Manifest(
+        body={"kind": "Deployment", "metadata": {"name": name, "namespace": "ns"}}
+    )
+
+
+def _listed(*deployments: V1Deployment) -> V1DeploymentList:
+    return V1DeploymentList(
+        items=list(deployments), metadata=V1ListMeta(resource_version="1")
+    )
+
+
+class TestFleetStatus:
+    def test_it_sums_ready_and_desired_replicas(self):
+        status = fleet.fleet_status(
+            [_deployment("a", 1, 1), _deployment("b", 4, None), _deployment("c", 2, 3)]
+        )
+        assert status == FleetStatus(ready=3, total=7)
+
+    def test_an_empty_fleet_is_fully_ready(self):
+        assert fleet.fleet_status([]).fraction == 1.0
+
+
+class TestReadStatus:
+    @patch("zelt.kubernetes.fleet.AppsV1Api.list_namespaced_deployment")
+    def test_it_only_counts_the_given_deployments(self, list_deployments):
+        list_deployments.return_value = _listed(
+            _deployment("a", 3, 2), _deployment("other", 5, 5)
+        )
+        status = fleet.read_status([_manifest("a"), _manifest("missing")])
+        assert status == FleetStatus(ready=2, total=3)
+
+
+class TestWaitUntilReady:
+    @pytest.mark.parametrize("fraction", [0, -0.5, 1.1])
+    def test_it_rejects_invalid_fractions(self, fraction):
+        with pytest.raises(ValueError, match="fraction"):
+            fleet.wait_until_ready([_manifest("a")], fraction)
+
+    @patch("zelt.kubernetes.fleet.watcher.watch.Watch")
+    @patch("zelt.kubernetes.fleet.AppsV1Api.list_namespaced_deployment")
+    def test_it_follows_readiness_until_target_fraction(self, list_deployments, watch):
+        list_deployments.__name__ = "list_namespaced_deployment"
+        list_deployments.return_value = _listed(_deployment("a", 10, 0))
+        watch().stream.return_value = [
+            {"type": "MODIFIED", "object": _deployment("a", 10, 5)},
+            {"type": "MODIFIED", "object": _deployment("a", 10, 8)},
+            {"type": "MODIFIED", "object": _deployment("a", 10, 10)},
+        ]
+
+        report = fleet.wait_until_ready([_manifest("a")], 0.8)
+
+        assert report.status == FleetStatus(ready=8, total=10)
+        assert sorted(report.milestones) == [25, 50, 75]
+
+    @patch("zelt.kubernetes.fleet.watcher.watch.Watch")
+    @patch("zelt.kubernetes.fleet.AppsV1Api.list_namespaced_deployment")
+    def test_it_ignores_other_deployments_and_waits_for_missing_ones(
+        self, list_deployments, watch
+    ):
+        list_deployments.__name__ = "list_namespaced_deployment"
+        list_deployments.return_value = _listed(_deployment("other", 1, 0))
+        watch().stream.return_value = [
+            {"type": "ADDED", "object": _deployment("a", 2, 2)},
+            {"type": "ADDED", "object": _deployment("b", 1, 1)},
+        ]
+
+        report = fleet.wait_until_ready([_manifest("a"), _manifest("b")], 1)
+
+        assert report.status == FleetStatus(ready=3, total=3)
+        assert sorted(report.milestones) == [25, 50, 75, 90, 100]
+
+    @patch("zelt.kubernetes.fleet.watcher.poll_for")
+    @patch("zelt.kubernetes.fleet.watcher.wait_for")
+    def test_it_polls_when_watching_is_unavailable(self, wait_for, poll_for):
+        wait_for.side_effect = WatchUnavailableError()
+        fleet.wait_until_ready([_manifest("a")], 1)
+        poll_for.assert_called_once()
+
+
+def _rollout(
+    generation: int, observed: int, replicas: int, updated: int, available: int
+) -> V1Deployment:
+    d = _deployment("a", 2, available)
+    d.metadata.generation = generation
+    d.status = V1DeploymentStatus(
+        observed_generation=observed,
+        replicas=replicas,
+        updated_replicas=updated,
+        available_replicas=available,
+    )
+    return d
+
+
+class TestWaitUntilRolledOut:
+    @pytest.mark.parametrize(
+        "deployment, expected",
+        [
+            (_rollout(2, 2, 2, 2, 2), True),
+            (_rollout(2, 1, 2, 2, 2), False),
+            (_rollout(2, 2, 3, 2, 2), False),
+            (_rollout(2, 2, 2, 1, 1), False),
+            (_rollout(2, 2, 2, 2, 1), False),
+        ],
+    )
+    def test_is_rolled_out(self, deployment, expected):
+        assert fleet.is_rolled_out(deployment) is expected
+
+    @patch("zelt.kubernetes.fleet.watcher.watch.Watch")
+    @patch("zelt.kubernetes.fleet.AppsV1Api.list_namespaced_deployment")
+    def test_it_waits_until_old_pods_are_gone(self, list_deployments, watch):
+        list_deployments.__name__ = "list_namespaced_deployment"
+        list_deployments.return_value = _listed(_rollout(2, 2, 3, 1, 2))
+        watch().stream.return_value = [
+            {"type": "MODIFIED", "object": _rollout(2, 2, 2, 2, 2)},
+            {"type": "MODIFIED", "object": _rollout(3, 2, 2, 2, 2)},
+        ]
+
+        fleet.wait_until_rolled_out([_manifest("a")])
+
+        watch().stop.assert_called()
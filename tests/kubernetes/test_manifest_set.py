@@ -99,7 +99,7 @@ class TestFromDirectory:
         assert manifest_set.service is not None
         assert manifest_set.ingress is not None
         assert manifest_set.controller is not None
-        assert manifest_set.worker is not None
+        assert len(manifest_set.workers) == 1
 
     def test_it_returns_a_set_of_manifests_given_a_directory_of_manifest_files_without_a_worker_deployment(
         self, unique_manifests, controller_deployment, tmp_path
@@ -109,4 +109,35 @@ class TestFromDirectory:
         assert manifest_set.service is not None
         assert manifest_set.ingress is not None
         assert manifest_set.controller is not None
-        assert manifest_set.worker is None
+        assert manifest_set.workers == []
+
+    def test_it_returns_all_worker_deployments_given_distinct_pool_labels(
+        self, unique_manifests, controller_deployment, tmp_path
+    ):
+        for pool in ("spot", "compute"):
+            worker = Path(tmp_path, f"worker_{pool}.yaml")
+            with worker.open("w") as f:
+                f.write(
+                    f"kind: deployment\nmetadata:\n  name: worker-{pool}\n"
+                    f"  labels:\n    role: worker\n    pool: {pool}"
+                )
+
+        manifest_set = from_directory(tmp_path)
+        assert sorted(w.name for w in manifest_set.workers) == [
+            "worker-compute",
+            "worker-spot",
+        ]
+
+    def test_it_fails_when_worker_deployments_share_a_pool_label(
+        self, unique_manifests, controller_deployment, tmp_path
+    ):
+        for name in ("a", "b"):
+            worker = Path(tmp_path, f"worker_{name}.yaml")
+            with worker.open("w") as f:
+                f.write(
+                    f"kind: deployment\nmetadata:\n  name: worker-{name}\n"
+                    "  labels:\n    role: worker\n    pool: spot"
+                )
+
+        with pytest.raises(ValueError, match="distinct 'pool' labels"):
+            from_directory(tmp_path)
@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from zelt.kubernetes import metrics
+from zelt.kubernetes.manifest import Manifest
+
+
+def _worker(name: str = "worker", *cpu_requests) -> Manifest:
+    containers = [
+        {"name": f"c{i}", "resources": {"requests": {"cpu": cpu}}}
+        for i, cpu in enumerate(cpu_requests)
+    ]
+    return Manifest(
+        body={
+            "kind": "Deployment",
+            "metadata": {"name": name, "namespace": "ns"},
+            "spec": {
+                "selector": {"matchLabels": {"role": "worker", "pool": name}},
+                "template": {"spec": {"containers": containers}},
+            },
+        }
+    )
+
+
+def _pod_metrics(*cpu_usages) -> dict:
+    return {"items": [{"containers": [{"usage": {"cpu": cpu}}]} for cpu in cpu_usages]}
+
+
+class TestParseCpu:
+    @pytest.mark.parametrize(
+        "quantity, cores",
+        [("2", 2.0), ("0.5", 0.5), ("250m", 0.25), ("1500u", 0.0015), (1, 1.0)],
+    )
+    def test_it_converts_quantities_to_cores(self, quantity, cores):
+        assert metrics.parse_cpu(quantity) == pytest.approx(cores)
+
+    def test_it_converts_nanocores(self):
+        assert metrics.parse_cpu("123456789n") == pytest.approx(0.123456789)
+
+    @pytest.mark.parametrize("quantity", ["", "1Gi", "many", "1.2.3"])
+    def test_it_rejects_invalid_quantities(self, quantity):
+        with pytest.raises(ValueError, match="CPU quantity"):
+            metrics.parse_cpu(quantity)
+
+
+class TestCpuRequest:
+    def test_it_sums_the_requests_of_all_containers(self):
+        assert metrics.cpu_request(_worker("w", "250m", "0.5")) == 0.75
+
+    def test_it_is_none_when_a_container_has_no_request(self):
+        worker = _worker("w", "250m")
+        worker.body["spec"]["template"]["spec"]["containers"].append({"name": "x"})
+        assert metrics.cpu_request(worker) is None
+
+
+class TestCpuUsage:
+    @patch("zelt.kubernetes.metrics.CustomObjectsApi")
+    def test_it_reads_the_pods_of_the_deployment(self, api):
+        list_metrics = api.return_value.list_namespaced_custom_object
+        list_metrics.return_value = _pod_metrics("100m", "200m")
+
+        assert metrics.cpu_usage(_worker("spot", "1")) == [0.1, 0.2]
+        assert list_metrics.call_args[1]["group"] == "metrics.k8s.io"
+        assert list_metrics.call_args[1]["label_selector"] == "role=worker,pool=spot"
+
+    @patch("zelt.kubernetes.metrics.CustomObjectsApi")
+    def test_it_explains_a_missing_metrics_api(self, api, caplog):
+        api.return_value.list_namespaced_custom_object.side_effect = ApiException(
+            status=404
+        )
+        with pytest.raises(ApiException):
+            metrics.cpu_usage(_worker("w", "1"))
+        assert "metrics-server" in caplog.text
+
+
+class TestMedianUtilisation:
+    @patch("zelt.kubernetes.metrics.cpu_usage")
+    def test_it_is_relative_to_the_request_of_each_deployment(self, cpu_usage):
+        cpu_usage.side_effect = [[0.25, 0.5], [0.9]]
+        workers = [_worker("a", "500m"), _worker("b", "1")]
+        assert metrics.median_utilisation(workers) == pytest.approx(0.9)
+
+    @patch("zelt.kubernetes.metrics.cpu_usage")
+    def test_it_ignores_deployments_without_request(self, cpu_usage):
+        assert metrics.median_utilisation([_worker("a")]) is None
+        cpu_usage.assert_not_called()
@@ -0,0 +1,47 @@
+import pytest
+
+from zelt.kubernetes import pools
+from zelt.kubernetes.manifest import Manifest
+
+
+def _worker(name: str, weight=None) -> Manifest:
+    metadata = {"name": name, "labels": {"role": "worker", "pool": name}}
+    if weight is not None:
+        metadata["annotations"] = {pools.POOL_WEIGHT_ANNOTATION: weight}
+    return Manifest(body={"kind": "Deployment", "metadata": metadata})
+
+
+class TestPoolWeight:
+    def test_it_defaults_to_one(self):
+        assert pools.pool_weight(_worker("a")) == 1
+
+    def test_it_reads_the_weight_annotation(self):
+        assert pools.pool_weight(_worker("a", "2.5")) == 2.5
+
+    @pytest.mark.parametrize("weight", ["0", "-1", "heavy", "inf"])
+    def test_it_rejects_non_positive_weights(self, weight):
+        with pytest.raises(ValueError, match="pool-weight"):
+            pools.pool_weight(_worker("a", weight))
+
+
+class TestDistribute:
+    def test_it_returns_nothing_without_workers(self):
+        assert pools.distribute(10, []) == []
+
+    def test_it_gives_everything_to_a_single_pool(self):
+        worker = _worker("a", "3")
+        assert pools.distribute(7, [worker]) == [(worker, 7)]
+
+    def test_it_splits_proportionally_to_weights(self):
+        a, b = _worker("a", "3"), _worker("b", "1")
+        assert pools.distribute(8, [a, b]) == [(a, 6), (b, 2)]
+
+    def test_it_gives_remainders_to_earlier_pools_on_ties(self):
+        workers = [_worker("a"), _worker("b"), _worker("c")]
+        shares = [n for _, n in pools.distribute(5, workers)]
+        assert shares == [2, 2, 1]
+
+    def test_it_always_sums_to_the_total(self):
+        workers = [_worker("a", "1"), _worker("b", "1.7"), _worker("c", "0.3")]
+        for total in range(20):
+            assert sum(n for _, n in pools.distribute(total, workers)) == total
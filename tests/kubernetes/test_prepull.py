@@ -0,0 +1,152 @@
+from unittest.mock import MagicMock, patch
+
+from kubernetes.client import (
+    V1ContainerState,
+    V1ContainerStateTerminated,
+    V1ContainerStateWaiting,
+    V1ContainerStatus,
+    V1DaemonSet,
+    V1DaemonSetStatus,
+    V1ObjectMeta,
+    V1Pod,
+    V1PodStatus,
+)
+
+from zelt.kubernetes import prepull
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.manifest_set import ManifestSet
+from zelt.kubernetes.watcher import WaitTimeoutError
+
+
+def _deployment(name: str, *images: str, **placement) -> Manifest:
+    spec = {
+        "initContainers": [{"name": "init", "image": "busybox"}],
+        "containers": [{"name": f"c{i}", "image": i} for i in images],
+        **placement,
+    }
+    return Manifest(
+        body={
+            "kind": "Deployment",
+            "metadata": {"name": name, "namespace": "ns"},
+            "spec": {"template": {"spec": spec}},
+        }
+    )
+
+
+def _manifest_set(*workers: Manifest) -> ManifestSet:
+    return ManifestSet(
+        namespace=MagicMock(),
+        service=MagicMock(),
+        ingress=MagicMock(),
+        controller=_deployment("controller", "locust"),
+        workers=list(workers),
+        others=[],
+    )
+
+
+def _pod(*image_ids: str) -> V1Pod:
+    return V1Pod(
+        status=V1PodStatus(
+            container_statuses=[
+                V1ContainerStatus(
+                    name="c",
+                    image="i",
+                    image_id=image_id,
+                    ready=False,
+                    restart_count=0,
+                )
+                for image_id in image_ids
+            ]
+        )
+    )
+
+
+class TestImages:
+    def test_it_lists_distinct_images_including_init_containers(self):
+        deployments = [
+            _deployment("a", "locust"),
+            _deployment("b", "locust", "sidecar"),
+        ]
+        assert prepull.images(deployments) == ["busybox", "locust", "sidecar"]
+
+
+class TestDaemonsetBody:
+    def test_it_runs_one_container_per_image(self):
+        body = prepull.daemonset_body(_deployment("w"), ["a", "b"])
+        containers = body["spec"]["template"]["spec"]["containers"]
+        assert [c["image"] for c in containers] == ["a", "b"]
+        assert body["metadata"]["namespace"] == "ns"
+
+    def test_it_targets_the_nodes_of_the_deployment(self):
+        worker = _deployment(
+            "w", "a", nodeSelector={"pool": "spot"}, tolerations=[{"key": "spot"}]
+        )
+        spec = prepull.daemonset_body(worker, ["a"])["spec"]["template"]["spec"]
+        assert spec["nodeSelector"] == {"pool": "spot"}
+        assert spec["tolerations"] == [{"key": "spot"}]
+        assert "affinity" not in spec
+
+
+class TestIsPulled:
+    def test_it_needs_an_image_id_for_all_containers(self):
+        assert prepull.is_pulled(_pod("sha256:a", "sha256:b"))
+        assert not prepull.is_pulled(_pod("sha256:a", ""))
+        assert not prepull.is_pulled(V1Pod(status=V1PodStatus()))
+
+    def test_it_accepts_containers_whose_command_failed(self):
+        for state in (
+            V1ContainerState(
+                waiting=V1ContainerStateWaiting(reason="RunContainerError")
+            ),
+            V1ContainerState(terminated=V1ContainerStateTerminated(exit_code=127)),
+        ):
+            pod = _pod("")
+            pod.status.container_statuses[0].state = state
+            assert prepull.is_pulled(pod)
+
+    def test_it_waits_for_failing_pulls(self):
+        pod = _pod("")
+        pod.status.container_statuses[0].state = V1ContainerState(
+            waiting=V1ContainerStateWaiting(reason="ErrImagePull")
+        )
+        assert not prepull.is_pulled(pod)
+
+
+class TestScheduled:
+    def test_it_waits_for_the_daemonset_to_be_observed(self):
+        daemonset = V1DaemonSet(
+            metadata=V1ObjectMeta(generation=1),
+            status=V1DaemonSetStatus(
+                current_number_scheduled=0,
+                desired_number_scheduled=0,
+                number_misscheduled=0,
+                number_ready=0,
+            ),
+        )
+        assert not prepull._scheduled([daemonset])
+        daemonset.status.observed_generation = 1
+        assert prepull._scheduled([daemonset])
+
+
+class TestPrepullImages:
+    @patch("zelt.kubernetes.prepull._wait_until_pulled")
+    @patch("zelt.kubernetes.prepull.AppsV1Api")
+    def test_it_creates_and_deletes_one_daemonset_per_pool(self, apps_api, wait):
+        ms = _manifest_set(_deployment("spot", "locust"), _deployment("zone-a", "x"))
+        prepull.prepull_images(ms)
+
+        created = apps_api.return_value.create_namespaced_daemon_set.call_args_list
+        assert sorted(c[1]["body"]["metadata"]["name"] for c in created) == [
+            "zelt-prepull-spot",
+            "zelt-prepull-zone-a",
+        ]
+        assert apps_api.return_value.delete_namespaced_daemon_set.call_count == 2
+
+    @patch("zelt.kubernetes.prepull._wait_until_pulled")
+    @patch("zelt.kubernetes.prepull.AppsV1Api")
+    def test_it_only_warns_and_cleans_up_on_timeout(self, apps_api, wait, caplog):
+        wait.side_effect = WaitTimeoutError("too slow")
+        prepull.prepull_images(_manifest_set(_deployment("spot", "locust")))
+
+        assert "not pulled" in caplog.text
+        apps_api.return_value.delete_namespaced_daemon_set.assert_called_once()
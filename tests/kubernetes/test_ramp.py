@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+from zelt.kubernetes import ramp
+from zelt.kubernetes.ramp import RampStep
+
+
+class TestParseRate:
+    @pytest.mark.parametrize(
+        "rate, expected",
+        [("10/min", (10, 60.0)), ("1/s", (1, 1.0)), (" 5 / H ", (5, 3600.0))],
+    )
+    def test_it_parses_pods_per_time_unit(self, rate, expected):
+        assert ramp.parse_rate(rate) == expected
+
+    @pytest.mark.parametrize("rate", ["10", "10/day", "0/min", "-1/min", "a/min"])
+    def test_it_rejects_invalid_rates(self, rate):
+        with pytest.raises(ValueError, match="ramp rate"):
+            ramp.parse_rate(rate)
+
+
+class TestStepsAtRate:
+    def test_it_ramps_up_to_the_target(self):
+        assert ramp.steps_at_rate(0, 25, "10/min") == [
+            RampStep(10, 60.0),
+            RampStep(20, 60.0),
+            RampStep(25, 60.0),
+        ]
+
+    def test_it_ramps_down_to_the_target(self):
+        assert ramp.steps_at_rate(12, 2, "5/s") == [
+            RampStep(7, 1.0),
+            RampStep(2, 1.0),
+        ]
+
+    def test_it_has_no_step_when_already_at_the_target(self):
+        assert ramp.steps_at_rate(4, 4, "1/s") == []
+
+
+class TestStepsFromFile:
+    def test_it_reads_steps_and_ends_at_the_target(self, tmp_path: Path):
+        schedule = Path(tmp_path, "ramp.yaml")
+        schedule.write_text("- workers: 5\n  duration: 30\n- workers: 10\n")
+        assert ramp.steps_from_file(schedule, 20) == [
+            RampStep(5, 30.0),
+            RampStep(10, 0.0),
+            RampStep(20, 0.0),
+        ]
+
+    def test_it_does_not_repeat_a_final_step_at_the_target(self, tmp_path: Path):
+        schedule = Path(tmp_path, "ramp.yaml")
+        schedule.write_text("- workers: 5\n  duration: 30\n")
+        assert ramp.steps_from_file(schedule, 5) == [RampStep(5, 30.0)]
+
+    @pytest.mark.parametrize(
+        "content", ["workers: 5", "- duration: 3", "- workers: -1", "- [1, 2]"]
+    )
+    def test_it_rejects_invalid_schedules(self, content, tmp_path: Path):
+        schedule = Path(tmp_path, "ramp.yaml")
+        schedule.write_text(content)
+        with pytest.raises(ValueError, match="ramp step"):
+            ramp.steps_from_file(schedule, 5)
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from kubernetes.client import (
+    V1Event,
+    V1ObjectMeta,
+    V1ObjectReference,
+    V1Pod,
+    V1PodCondition,
+    V1PodList,
+    V1PodStatus,
+    V1EventList,
+)
+
+from zelt.kubernetes import startup
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.startup import PodStartup
+
+T0 = datetime(2020, 1, 1, 12, 0, 0)
+
+
+def _at(seconds: float) -> datetime:
+    return T0 + timedelta(seconds=seconds)
+
+
+def _pod(name: str, **conditions: float) -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, creation_timestamp=T0),
+        status=V1PodStatus(
+            conditions=[
+                V1PodCondition(type=t, status="True", last_transition_time=_at(s))
+                for t, s in conditions.items()
+            ]
+        ),
+    )
+
+
+def _pulled(pod: str, seconds: float) -> V1Event:
+    return V1Event(
+        metadata=V1ObjectMeta(name=f"{pod}.pulled"),
+        involved_object=V1ObjectReference(kind="Pod", name=pod),
+        reason="Pulled",
+        last_timestamp=_at(seconds),
+    )
+
+
+def _startup(name: str, **milestones: float) -> PodStartup:
+    return PodStartup(name, T0, {k: _at(s) for k, s in milestones.items()})
+
+
+class TestPodStartup:
+    def test_it_reads_milestones_from_conditions(self):
+        s = startup.pod_startup(
+            _pod("p", PodScheduled=1, Initialized=5, Ready=20), pulled=_at(12)
+        )
+        assert s.phases() == {
+            "scheduled": 1.0,
+            "initialized": 4.0,
+            "pulled": 7.0,
+            "ready": 8.0,
+        }
+
+    def test_phases_start_at_the_previous_milestone_reached(self):
+        s = _startup("p", scheduled=2, ready=10)
+        assert s.phases() == {"scheduled": 2.0, "ready": 8.0}
+
+
+class TestCollect:
+    @patch("zelt.kubernetes.startup.CoreV1Api")
+    def test_it_matches_the_last_pull_of_each_pod(self, core_api):
+        core_api.return_value.list_namespaced_pod.return_value = V1PodList(
+            items=[_pod("a", PodScheduled=1), _pod("b", PodScheduled=2)]
+        )
+        core_api.return_value.list_namespaced_event.return_value = V1EventList(
+            items=[_pulled("a", 3), _pulled("a", 9), _pulled("other", 4)]
+        )
+        worker = Manifest(
+            body={"kind": "Deployment", "metadata": {"name": "w", "namespace": "ns"}}
+        )
+
+        startups = {s.name: s for s in startup.collect([worker])}
+
+        assert startups["a"].milestones["pulled"] == _at(9)
+        assert "pulled" not in startups["b"].milestones
+
+
+class TestSummarise:
+    def test_it_computes_percentiles_per_phase(self):
+        startups = [_startup(str(i), scheduled=i) for i in range(1, 21)]
+        stats = startup.summarise(startups)
+        assert list(stats) == ["scheduled"]
+        assert stats["scheduled"] == startup.PhaseStats(
+            count=20, p50=10.0, p95=19.0, max=20.0
+        )
+
+
+class TestReports:
+    def test_it_formats_a_table_with_ready_pods(self):
+        report = startup.format_report(
+            [_startup("a", scheduled=1, ready=3), _startup("b", scheduled=2)]
+        )
+        assert report.splitlines()[0].split() == ["phase", "pods", "p50", "p95", "max"]
+        assert "1/2 pod(s) ready." in report
+
+    def test_it_writes_json(self, tmp_path: Path):
+        path = Path(tmp_path, "startup.json")
+        startup.write_json([_startup("a", scheduled=1, ready=3)], path)
+        report = json.loads(path.read_text())
+        assert report["phases"]["ready"]["max"] == pytest.approx(2.0)
+        assert report["pods"][0]["phases"] == {"scheduled": 1.0, "ready": 2.0}
@@ -0,0 +1,72 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from zelt.kubernetes.taskgraph import TaskGraph
+
+
+class TestAdd:
+    def test_it_rejects_duplicate_task_names(self):
+        graph = TaskGraph()
+        graph.add("a", MagicMock())
+        with pytest.raises(ValueError, match="duplicate"):
+            graph.add("a", MagicMock())
+
+    def test_it_rejects_unknown_dependencies(self):
+        graph = TaskGraph()
+        with pytest.raises(ValueError, match="unknown dependency"):
+            graph.add("a", MagicMock(), ["b"])
+
+
+class TestRun:
+    def test_it_runs_dependencies_first(self):
+        order = []
+        graph = TaskGraph()
+        graph.add("a", lambda: order.append("a"))
+        graph.add("b", lambda: order.append("b"), ["a"])
+        graph.add("c", lambda: order.append("c"), ["b"])
+
+        graph.run()
+
+        assert order == ["a", "b", "c"]
+
+    def test_it_runs_independent_tasks_concurrently(self):
+        # Each task blocks until the other one has started.
+        barrier = threading.Barrier(2, timeout=5)
+        graph = TaskGraph()
+        graph.add("a", barrier.wait)
+        graph.add("b", barrier.wait)
+
+        graph.run()
+
+        assert set(graph.timings) == {"a", "b"}
+
+    def test_it_raises_the_first_error_and_skips_dependent_tasks(self):
+        dependent = MagicMock()
+        graph = TaskGraph()
+        graph.add("a", MagicMock(side_effect=RuntimeError("boom")))
+        graph.add("b", dependent, ["a"])
+
+        with pytest.raises(RuntimeError, match="boom"):
+            graph.run()
+
+        dependent.assert_not_called()
+
+
+class TestCriticalPath:
+    def test_it_is_empty_before_running(self):
+        assert TaskGraph().critical_path() == ([], 0.0)
+
+    def test_it_follows_the_latest_finishing_dependencies(self):
+        graph = TaskGraph()
+        graph.add("root", MagicMock())
+        graph.add("fast", MagicMock(), ["root"])
+        graph.add("slow", lambda: threading.Event().wait(0.05), ["root"])
+        graph.add("last", MagicMock(), ["fast", "slow"])
+
+        graph.run()
+        path, total = graph.critical_path()
+
+        assert path == ["root", "slow", "last"]
+        assert total >= 0.05
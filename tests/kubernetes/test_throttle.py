@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from kubernetes.client import Configuration
+from kubernetes.client.rest import ApiException
+
+from zelt.kubernetes import throttle
+from zelt.kubernetes.session import Session
+from zelt.kubernetes.throttle import Throttle, TokenBucket
+
+
+def _error(status: int, retry_after: str = None) -> ApiException:
+    err = ApiException(status=status, reason="Oops")
+    err.headers = {"Retry-After": retry_after} if retry_after else {}
+    return err
+
+
+class TestTokenBucket:
+    def test_it_allows_a_burst_then_spaces_out_requests(self):
+        now = [0.0]
+        bucket = TokenBucket(qps=2, burst=3, clock=lambda: now[0])
+        assert [bucket.reserve() for _ in range(5)] == [0, 0, 0, 0.5, 1.0]
+
+    def test_it_refills_up_to_the_burst(self):
+        now = [0.0]
+        bucket = TokenBucket(qps=2, burst=2, clock=lambda: now[0])
+        bucket.reserve()
+        bucket.reserve()
+        now[0] = 100.0
+        assert [bucket.reserve() for _ in range(3)] == [0, 0, 0.5]
+
+    @pytest.mark.parametrize("qps, burst", [(0, 1), (1, 0)])
+    def test_it_rejects_invalid_limits(self, qps, burst):
+        with pytest.raises(ValueError):
+            TokenBucket(qps, burst)
+
+
+class TestRetries:
+    @pytest.mark.parametrize(
+        "method, status, expected",
+        [
+            ("GET", 429, True),
+            ("GET", 503, True),
+            ("PATCH", 500, True),
+            ("GET", 404, False),
+            ("POST", 429, True),
+            ("POST", 503, False),
+        ],
+    )
+    def test_is_retryable(self, method, status, expected):
+        assert throttle.is_retryable(method, _error(status)) is expected
+
+    def test_retry_after_accepts_seconds_and_dates(self):
+        assert throttle.retry_after(_error(429, "3")) == 3.0
+        later = datetime.now(timezone.utc) + timedelta(seconds=60)
+        assert 50 < throttle.retry_after(_error(429, format_datetime(later))) <= 60
+        assert throttle.retry_after(_error(429, "soon")) is None
+        assert throttle.retry_after(_error(429)) is None
+
+    def test_backoff_grows_exponentially_up_to_a_maximum(self):
+        assert throttle.backoff(0, rand=max) == throttle.BACKOFF_BASE
+        assert throttle.backoff(2, rand=max) == throttle.BACKOFF_BASE * 4
+        assert throttle.backoff(20, rand=max) == throttle.BACKOFF_MAX
+
+    def test_backoff_waits_at_least_as_asked(self):
+        assert throttle.backoff(0, retry_after=10, rand=lambda *_: 0) == 10
+
+
+@patch("zelt.kubernetes.throttle.sleep")
+class TestThrottle:
+    def test_it_retries_transient_failures(self, sleep):
+        request = MagicMock(side_effect=[_error(503), _error(429, "2"), "ok"])
+        assert Throttle(retries=2).call("GET", request) == "ok"
+        assert request.call_count == 3
+        assert sleep.call_args[0][0] >= 2
+
+    def test_it_gives_up_after_the_maximum_of_retries(self, _sleep):
+        request = MagicMock(side_effect=_error(503))
+        with pytest.raises(ApiException):
+            Throttle(retries=2).call("GET", request)
+        assert request.call_count == 3
+
+    def test_it_does_not_retry_other_failures(self, _sleep):
+        request = MagicMock(side_effect=_error(409))
+        with pytest.raises(ApiException):
+            Throttle().call("POST", request)
+        request.assert_called_once()
+
+
+class TestSession:
+    @patch("kubernetes.client.ApiClient.request")
+    def test_it_sends_requests_through_the_throttle(self, request):
+        request.side_effect = [_error(429, "0"), "ok"]
+        try:
+            throttle.configure(retries=1)
+            assert Session(Configuration()).request("GET", "http://x") == "ok"
+        finally:
+            throttle.configure()
+        assert request.call_count == 2
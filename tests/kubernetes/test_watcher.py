@@ -0,0 +1,120 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from kubernetes.client import V1ListMeta, V1ObjectMeta, V1Pod, V1PodList
+from kubernetes.client.rest import ApiException
+
+from zelt.kubernetes.watcher import (
+    STATUS_GONE,
+    WaitTimeoutError,
+    WatchUnavailableError,
+    poll_for,
+    wait_for,
+    wait_or_poll_for,
+)
+
+
+def _pod(name: str, version: str = "1") -> V1Pod:
+    return V1Pod(
+        metadata=V1ObjectMeta(name=name, namespace="ns", resource_version=version)
+    )
+
+
+def _list_function(*pods: V1Pod) -> MagicMock:
+    list_pods = MagicMock(
+        return_value=V1PodList(
+            items=list(pods), metadata=V1ListMeta(resource_version="1")
+        )
+    )
+    list_pods.__name__ = "list_namespaced_pod"
+    return list_pods
+
+
+def _names(pods) -> set:
+    return {p.metadata.name for p in pods}
+
+
+class TestWaitFor:
+    def test_it_refuses_functions_that_cannot_be_watched(self):
+        read_pod = MagicMock()
+        read_pod.__name__ = "read_namespaced_pod"
+        with pytest.raises(WatchUnavailableError):
+            wait_for(read_pod, lambda _: True, timeout=1)
+        read_pod.assert_not_called()
+
+    @patch("zelt.kubernetes.watcher.watch.Watch")
+    def test_it_does_not_watch_when_condition_already_holds(self, watch):
+        list_pods = _list_function(_pod("a"))
+
+        found = wait_for(list_pods, lambda p: len(p) == 1, timeout=1, namespace="ns")
+
+        assert _names(found) == {"a"}
+        list_pods.assert_called_once_with(namespace="ns")
+        watch.assert_not_called()
+
+    @patch("zelt.kubernetes.watcher.watch.Watch")
+    def test_it_applies_watch_events_until_condition_holds(self, watch):
+        watch().stream.return_value = [
+            {"type": "ADDED", "object": _pod("b", "2")},
+            {"type": "DELETED", "object": _pod("a", "3")},
+            {"type": "ADDED", "object": _pod("c", "4")},
+        ]
+        list_pods = _list_function(_pod("a"))
+
+        found = wait_for(list_pods, lambda p: _names(p) == {"b"}, timeout=10)
+
+        assert _names(found) == {"b"}
+        assert watch().stream.call_args[1]["resource_version"] == "1"
+
+    @patch("zelt.kubernetes.watcher.watch.Watch")
+    def test_it_lists_again_when_resource_version_expired(self, watch):
+        watch().stream.side_effect = [
+            [{"type": "ERROR", "raw_object": {"code": STATUS_GONE}}],
+            [{"type": "DELETED", "object": _pod("a", "5")}],
+        ]
+        list_pods = _list_function(_pod("a"))
+
+        found = wait_for(list_pods, lambda p: not p, timeout=10)
+
+        assert found == []
+        assert list_pods.call_count == 2
+
+    @patch("zelt.kubernetes.watcher.watch.Watch")
+    def test_it_raises_when_watching_is_forbidden(self, watch):
+        watch().stream.side_effect = ApiException(status=403)
+        with pytest.raises(WatchUnavailableError):
+            wait_for(_list_function(_pod("a")), lambda p: not p, timeout=10)
+
+    @patch("zelt.kubernetes.watcher.watch.Watch")
+    def test_it_raises_when_timeout_reached(self, watch):
+        watch().stream.return_value = []
+        with pytest.raises(WaitTimeoutError):
+            wait_for(_list_function(_pod("a")), lambda p: not p, timeout=0)
+
+
+class TestPollFor:
+    def test_it_lists_until_condition_holds(self):
+        list_pods = _list_function(_pod("a"))
+        list_pods.side_effect = [
+            list_pods.return_value,
+            V1PodList(items=[], metadata=V1ListMeta(resource_version="2")),
+        ]
+
+        found = poll_for(list_pods, lambda p: not p, timeout=10, interval=0)
+
+        assert found == []
+        assert list_pods.call_count == 2
+
+    def test_it_raises_when_timeout_reached(self):
+        with pytest.raises(WaitTimeoutError):
+            poll_for(_list_function(_pod("a")), lambda p: not p, timeout=0, interval=1)
+
+
+class TestWaitOrPollFor:
+    def test_it_polls_functions_that_cannot_be_watched(self):
+        list_pods = _list_function(_pod("a"))
+        list_pods.__name__ = "read_namespaced_pod"
+
+        found = wait_or_poll_for(list_pods, bool, timeout=10, interval=0)
+
+        assert _names(found) == {"a"}
@@ -0,0 +1,126 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+from kubernetes.client import Configuration
+from tenacity import retry, stop_after_attempt
+
+from zelt import tracing
+from zelt.kubernetes.session import Session
+
+
+@pytest.fixture()
+def tracer():
+    yield tracing.enable()
+    tracing.disable()
+
+
+class TestSpan:
+    def test_it_does_nothing_when_tracing_is_disabled(self):
+        tracing.disable()
+        with tracing.span("a"):
+            tracing.count_api_call()
+
+    def test_it_records_nested_spans(self, tracer: tracing.Tracer):
+        with tracing.span("outer"):
+            with tracing.span("inner"):
+                pass
+
+        inner, outer = tracer.spans
+        assert (inner.name, outer.name) == ("inner", "outer")
+        assert outer.start <= inner.start <= inner.end <= outer.end
+
+    def test_it_attributes_api_calls_to_the_innermost_span(
+        self, tracer: tracing.Tracer
+    ):
+        with tracing.span("outer"):
+            tracing.count_api_call()
+            with tracing.span("inner"):
+                tracing.count_api_call()
+                tracing.count_api_call()
+
+        inner, outer = tracer.spans
+        assert (inner.api_calls, outer.api_calls) == (2, 1)
+
+    def test_it_keeps_spans_of_other_threads_apart(self, tracer: tracing.Tracer):
+        def work():
+            with tracing.span("thread"):
+                tracing.count_api_call()
+
+        with tracing.span("main"):
+            t = threading.Thread(target=work)
+            t.start()
+            t.join()
+
+        spans = {s.name: s for s in tracer.spans}
+        assert spans["thread"].api_calls == 1
+        assert spans["main"].api_calls == 0
+        assert spans["thread"].thread_id != spans["main"].thread_id
+
+
+class TestTraced:
+    def test_it_names_spans_after_the_function(self, tracer: tracing.Tracer):
+        @tracing.traced
+        def step():
+            return 42
+
+        assert step() == 42
+        assert tracer.spans[0].name.startswith("test_tracing.")
+        assert tracer.spans[0].name.endswith(".step")
+
+    def test_it_counts_tenacity_retries(self, tracer: tracing.Tracer):
+        attempts = iter([ValueError(), None])
+
+        @tracing.traced
+        @retry(stop=stop_after_attempt(2), before_sleep=tracing.count_retry)
+        def flaky():
+            error = next(attempts)
+            if error:
+                raise error
+
+        flaky()
+        assert tracer.spans[0].retries == 1
+
+
+class TestSession:
+    @patch("kubernetes.client.ApiClient.request")
+    def test_it_counts_api_calls(self, request, tracer: tracing.Tracer):
+        session = Session(Configuration())
+        with tracing.span("call"):
+            session.request("GET", "http://localhost")
+        assert tracer.spans[0].api_calls == 1
+        request.assert_called_once()
+
+
+class TestReport:
+    def test_summary_aggregates_spans_by_name(self, tracer: tracing.Tracer):
+        for _ in range(2):
+            with tracing.span("step"):
+                tracing.count_api_call()
+
+        header, row = tracer.summary().splitlines()
+        assert header.split() == [
+            "Span",
+            "Count",
+            "Total",
+            "(s)",
+            "API",
+            "calls",
+            "Retries",
+        ]
+        assert row.split()[0:2] == ["step", "2"]
+        assert row.split()[3:] == ["2", "0"]
+
+    def test_it_writes_chrome_trace_events(self, tracer: tracing.Tracer, tmp_path):
+        with tracing.span("step", "cat"):
+            pass
+        path = tmp_path / "trace.json"
+
+        tracer.write_chrome_trace(path)
+
+        (event,) = json.loads(path.read_text())["traceEvents"]
+        assert event["name"] == "step"
+        assert event["cat"] == "cat"
+        assert event["ph"] == "X"
+        assert event["dur"] >= 0
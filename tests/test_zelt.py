@@ -8,8 +8,13 @@ import pytest
 from kubernetes.client.rest import ApiException
 
 import zelt
+from zelt.kubernetes.autoscaler import AutoscalePolicy
+from zelt.kubernetes.fleet import FleetStatus
 from zelt.kubernetes.storage.configmap import ConfigmapStorage
+from zelt.kubernetes.storage import registry
+from zelt.kubernetes.storage.pvc import PvcStorage
 from zelt.kubernetes.storage.s3 import S3Storage
+from zelt.kubernetes.storage.sharded import ShardedConfigmapStorage
 from zelt.zelt import StorageMethod, HARFilesNotFoundException
 
 
@@ -53,6 +58,32 @@ class TestDeploy:
         )
         subprocess.assert_called_once()
 
+    @patch("subprocess.run")
+    def test_it_runs_bundles_locally_from_their_directory(self, subprocess, tmp_path):
+        Path(tmp_path, "locustfile.py").write_text("")
+        zelt.deploy(
+            locustfile=tmp_path,
+            worker_pods=0,
+            manifests_path=None,
+            clean=False,
+            storage_method=StorageMethod.CONFIGMAP,
+            local=True,
+        )
+        args, kwargs = subprocess.call_args
+        assert args[0][2] == str(Path(tmp_path, "locustfile.py").resolve())
+        assert kwargs["cwd"] == tmp_path
+
+    def test_it_rejects_bundles_without_locustfile(self, tmp_path):
+        with pytest.raises(ValueError, match="Missing locustfile.py"):
+            zelt.deploy(
+                locustfile=tmp_path,
+                worker_pods=0,
+                manifests_path="some_manifests",
+                clean=False,
+                storage_method=StorageMethod.CONFIGMAP,
+                local=False,
+            )
+
     @patch("zelt.zelt._deploy_in_kubernetes")
     def test_it_deploys_locust_in_kubernetes_when_given_manifests(
         self, deploy_in_kubernetes
@@ -81,11 +112,12 @@ class TestDeploy:
     @patch("zelt.kubernetes.deployer.create_resources")
     @patch("zelt.kubernetes.deployer.delete_resources")
     @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
     @patch(
         "zelt.kubernetes.storage.configmap.ConfigmapStorage.__init__", return_value=None
     )
     def test_it_does_not_clean_before_deployment_when_not_given_clean_option(
-        self, _cm_init, _from_dir, delete, create
+        self, _cm_init, _read_config, _from_dir, delete, create
     ):
         zelt.deploy(
             locustfile="a_locustfile",
@@ -101,11 +133,12 @@ class TestDeploy:
     @patch("zelt.kubernetes.deployer.create_resources")
     @patch("zelt.kubernetes.deployer.delete_resources")
     @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
     @patch(
         "zelt.kubernetes.storage.configmap.ConfigmapStorage.__init__", return_value=None
     )
     def test_it_cleans_before_deployment_when_given_clean_option(
-        self, _cm_init, _from_dir, delete, create
+        self, _cm_init, _read_config, _from_dir, delete, create
     ):
         zelt.deploy(
             locustfile="a_locustfile",
@@ -118,6 +151,59 @@ class TestDeploy:
         delete.assert_called_once()
         create.assert_called_once()
 
+    @patch("zelt.kubernetes.deployer.create_resources")
+    @patch("zelt.kubernetes.deployer.delete_resources")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_shares_one_session_between_storage_and_deployer(
+        self, read_config, _from_dir, delete, create
+    ):
+        zelt.deploy(
+            locustfile="a_locustfile",
+            worker_pods=0,
+            manifests_path="some_manifests",
+            clean=True,
+            storage_method=StorageMethod.CONFIGMAP,
+            local=False,
+            api_pool_size=3,
+        )
+        read_config.assert_called_once_with(3)
+        storage = create.call_args[0][1]
+        assert storage.session is read_config.return_value
+        assert delete.call_args[0][2] is read_config.return_value
+        assert create.call_args[0][3] is read_config.return_value
+
+    def test_it_errors_when_given_both_clean_and_apply_options(self):
+        with pytest.raises(ValueError, match="incompatible"):
+            zelt.deploy(
+                locustfile="a_locustfile",
+                worker_pods=0,
+                manifests_path="some_manifests",
+                clean=True,
+                storage_method=StorageMethod.CONFIGMAP,
+                local=False,
+                apply=True,
+            )
+
+    @patch("zelt.kubernetes.deployer.apply_resources")
+    @patch("zelt.kubernetes.deployer.create_resources")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_applies_changes_when_given_apply_option(
+        self, _read_config, _from_dir, create, apply
+    ):
+        zelt.deploy(
+            locustfile="a_locustfile",
+            worker_pods=0,
+            manifests_path="some_manifests",
+            clean=False,
+            storage_method=StorageMethod.CONFIGMAP,
+            local=False,
+            apply=True,
+        )
+        apply.assert_called_once()
+        create.assert_not_called()
+
 
 class TestRescale:
     def test_it_exits_when_not_given_manifests(self):
@@ -130,12 +216,128 @@ class TestRescale:
 
     @patch("zelt.kubernetes.deployer.rescale_worker_deployment")
     @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
     def test_it_calls_rescale_worker_deployment_when_given_a_positive_number_of_worker_pods(
-        self, rescale_worker_deployment, _from_dir
+        self, _read_config, _from_dir, rescale_worker_deployment
     ):
         zelt.rescale(manifests_path="some_manifests", worker_pods=0)
         rescale_worker_deployment.assert_called_once()
 
+    @patch("zelt.kubernetes.deployer.rescale_worker_deployment")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_rescales_workers_in_each_worker_context(
+        self, read_config, _from_dir, rescale_worker_deployment
+    ):
+        zelt.rescale(
+            manifests_path="some_manifests",
+            worker_pods=5,
+            worker_contexts=["a", "b"],
+        )
+        assert [c[1] for c in read_config.call_args_list] == [
+            {"context": "a"},
+            {"context": "b"},
+        ]
+        replicas = sorted(c[0][1] for c in rescale_worker_deployment.call_args_list)
+        assert replicas == [2, 3]
+
+    @patch("zelt.kubernetes.deployer.ramp_worker_deployment")
+    @patch("zelt.kubernetes.fleet.read_status")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_ramps_from_the_current_number_of_worker_pods(
+        self, _read_config, _from_dir, read_status, ramp_worker_deployment
+    ):
+        read_status.return_value = FleetStatus(ready=2, total=2)
+        zelt.rescale(manifests_path="some_manifests", worker_pods=7, ramp_rate="3/s")
+        steps = ramp_worker_deployment.call_args[0][1]
+        assert [s.replicas for s in steps] == [5, 7]
+
+    @patch("zelt.kubernetes.startup.collect")
+    @patch("zelt.kubernetes.deployer.rescale_worker_deployment")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_writes_a_startup_report_when_given_a_json_path(
+        self, _read_config, _from_dir, _rescale, collect, tmp_path
+    ):
+        collect.return_value = []
+        path = Path(tmp_path, "startup.json")
+        zelt.rescale(manifests_path="some_manifests", worker_pods=1, startup_json=path)
+        collect.assert_called_once()
+        assert path.exists()
+
+    def test_it_exits_when_given_both_a_ramp_rate_and_schedule(self):
+        with pytest.raises(ValueError, match="incompatible"):
+            zelt.rescale(
+                manifests_path="some_manifests",
+                worker_pods=1,
+                ramp_rate="1/s",
+                ramp_schedule="ramp.yaml",
+            )
+
+    @pytest.mark.parametrize("wait_ready", [0, 1.5])
+    def test_it_exits_when_given_an_invalid_fraction_of_ready_pods(self, wait_ready):
+        with pytest.raises(ValueError, match="fraction of ready pods"):
+            zelt.rescale(
+                manifests_path="some_manifests", worker_pods=1, wait_ready=wait_ready
+            )
+
+
+class TestAutoscale:
+    def test_it_exits_when_not_given_manifests(self):
+        with pytest.raises(ValueError, match="[Mm]issing required"):
+            zelt.autoscale(manifests_path=None, policy=AutoscalePolicy(1))
+
+    def test_it_exits_when_given_a_non_positive_interval(self):
+        with pytest.raises(ValueError, match="sampling interval"):
+            zelt.autoscale(
+                manifests_path="some_manifests", policy=AutoscalePolicy(1), interval=0
+            )
+
+    @patch("zelt.kubernetes.autoscaler.Autoscaler.run")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_stops_when_interrupted(self, _read_config, _from_dir, run):
+        run.side_effect = KeyboardInterrupt()
+        zelt.autoscale(manifests_path="some_manifests", policy=AutoscalePolicy(1))
+        run.assert_called_once()
+
+
+class TestUpdateLocustfile:
+    def test_it_exits_when_not_given_manifests(self):
+        with pytest.raises(ValueError, match="[Mm]issing required"):
+            zelt.update_locustfile(
+                "locustfile.py",
+                manifests_path=None,
+                storage_method=StorageMethod.CONFIGMAP,
+            )
+
+    @pytest.mark.parametrize(
+        "controller_updated, worker_updates", [(True, 2), (False, 0)]
+    )
+    @patch("zelt.kubernetes.deployer.update_worker_locustfile")
+    @patch("zelt.kubernetes.deployer.update_locustfile")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_updates_workers_of_other_contexts_after_the_controller(
+        self,
+        _read_config,
+        _from_dir,
+        update_locustfile,
+        update_worker_locustfile,
+        controller_updated,
+        worker_updates,
+    ):
+        update_locustfile.return_value = controller_updated
+        zelt.update_locustfile(
+            "locustfile.py",
+            manifests_path="some_manifests",
+            storage_method=StorageMethod.CONFIGMAP,
+            worker_contexts=["a", "b"],
+        )
+        update_locustfile.assert_called_once()
+        assert update_worker_locustfile.call_count == worker_updates
+
 
 class TestDelete:
     def test_it_exits_when_not_given_manifests(self):
@@ -144,12 +346,42 @@ class TestDelete:
 
     @patch("zelt.kubernetes.deployer.delete_resources")
     @patch("zelt.kubernetes.manifest_set.from_directory")
-    def test_it_calls_delete_resources(self, delete_resources, _from_dir):
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_calls_delete_resources(self, _read_config, _from_dir, delete_resources):
         zelt.delete(
             manifests_path="some_manifests", storage_method=StorageMethod.CONFIGMAP
         )
         delete_resources.assert_called_once()
 
+    @patch("zelt.kubernetes.deployer.delete_worker_resources")
+    @patch("zelt.kubernetes.deployer.delete_resources")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_deletes_workers_in_each_worker_context(
+        self, _read_config, _from_dir, delete_resources, delete_worker_resources
+    ):
+        zelt.delete(
+            manifests_path="some_manifests",
+            storage_method=StorageMethod.CONFIGMAP,
+            worker_contexts=["a", "b"],
+        )
+        delete_resources.assert_called_once()
+        assert delete_worker_resources.call_count == 2
+
+    @patch("zelt.kubernetes.deployer.delete_resources")
+    @patch("zelt.kubernetes.manifest_set.from_directory")
+    @patch("zelt.kubernetes.client.read_config")
+    def test_it_passes_fast_mode_options(
+        self, _read_config, _from_dir, delete_resources
+    ):
+        zelt.delete(
+            manifests_path="some_manifests",
+            storage_method=StorageMethod.CONFIGMAP,
+            fast=True,
+            wait=False,
+        )
+        assert delete_resources.call_args[1] == {"fast": True, "wait": False}
+
 
 class TestInvokeTransformer:
     @patch("pathlib.Path.open")
@@ -178,6 +410,23 @@ class TestStorageMethod:
         def test_it_returns_configmap_when_given_configmap_or_cm(self, arg):
             assert StorageMethod.from_storage_arg(arg) is StorageMethod.CONFIGMAP
 
+        @pytest.mark.parametrize("arg", ("configmap-sharded", "cm-sharded"))
+        def test_it_returns_sharded_configmap_when_given_sharded(self, arg):
+            assert (
+                StorageMethod.from_storage_arg(arg) is StorageMethod.SHARDED_CONFIGMAP
+            )
+
+        @pytest.mark.parametrize("arg", ("pvc", "PVC", "persistentvolumeclaim"))
+        def test_it_returns_pvc_when_given_pvc(self, arg):
+            assert StorageMethod.from_storage_arg(arg) is StorageMethod.PVC
+
+        @pytest.mark.parametrize("arg", ("configmap-gzip", "cm-gzip", "ConfigMap-gzip"))
+        def test_it_returns_compressed_configmap_when_given_gzip(self, arg):
+            assert (
+                StorageMethod.from_storage_arg(arg)
+                is StorageMethod.COMPRESSED_CONFIGMAP
+            )
+
     class TestBuildStorage:
         @pytest.mark.parametrize(
             "kwargs",
@@ -216,3 +465,30 @@ class TestStorageMethod:
                 StorageMethod.CONFIGMAP.build_storage(manifests=MagicMock()),
                 ConfigmapStorage,
             )
+
+        def test_it_returns_a_shardedconfigmapstorage_when_given_sharded(self):
+            assert isinstance(
+                StorageMethod.SHARDED_CONFIGMAP.build_storage(manifests=MagicMock()),
+                ShardedConfigmapStorage,
+            )
+
+        def test_it_returns_a_pvcstorage_when_given_pvc(self):
+            assert isinstance(
+                StorageMethod.PVC.build_storage(manifests=MagicMock()), PvcStorage
+            )
+
+        def test_it_builds_storage_with_plugins(self):
+            factory = MagicMock()
+            plugins = {"my-storage": MagicMock(load=lambda: factory)}
+            with patch.object(registry, "_entry_points", plugins):
+                method = StorageMethod.from_storage_arg("my-storage")
+                storage = method.build_storage(manifests=MagicMock())
+            assert method is StorageMethod("my-storage")
+            assert storage is factory.return_value
+
+        def test_it_returns_a_compressing_configmapstorage_when_given_gzip(self):
+            storage = StorageMethod.COMPRESSED_CONFIGMAP.build_storage(
+                manifests=MagicMock()
+            )
+            assert isinstance(storage, ConfigmapStorage)
+            assert storage.compress
@@ -1,3 +1,17 @@
-from .zelt import deploy, rescale, delete, invoke_transformer
+from .zelt import (
+    deploy,
+    rescale,
+    autoscale,
+    update_locustfile,
+    delete,
+    invoke_transformer,
+)
 
-__all__ = ["deploy", "rescale", "delete", "invoke_transformer"]
+__all__ = [
+    "deploy",
+    "rescale",
+    "autoscale",
+    "update_locustfile",
+    "delete",
+    "invoke_transformer",
+]
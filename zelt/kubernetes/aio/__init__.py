@@ -0,0 +1,7 @@
+try:
+    import kubernetes_asyncio  # noqa: F401
+except ImportError as err:
+    raise ImportError(
+        "kubernetes_asyncio not found. It is required for the asyncio backend. "
+        "It can be installed with 'pip install zelt[asyncio]'."
+    ) from err
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from kubernetes_asyncio import config
+from kubernetes_asyncio.client import (
+    ApiClient,
+    ApiextensionsV1beta1Api,
+    AppsV1Api,
+    Configuration,
+    CoreV1Api,
+    CustomObjectsApi,
+    NetworkingV1beta1Api,
+    V1DeleteOptions,
+    V1Deployment,
+    V1Namespace,
+    V1Scale,
+    V1Service,
+    V1Status,
+)
+from kubernetes_asyncio.client.rest import ApiException
+from tenacity import (
+    retry,
+    retry_if_exception,
+    retry_if_exception_type,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_fixed,
+    wait_random,
+)
+
+from zelt.kubernetes.client import (
+    KUBE_API_CONFLICT_RETRIES,
+    KUBE_API_DELETE_TIMEOUT,
+    KUBE_API_LIST_TIMEOUT,
+    KUBE_API_WAIT,
+    STATUS_CONFLICT,
+    STATUS_NOT_FOUND,
+    ResourceStillThereError,
+    any_pod_ready,
+    nothing_found,
+)
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.session import DEFAULT_POOL_SIZE
+from zelt.kubernetes.watcher import WaitTimeoutError, WatchUnavailableError
+from . import watcher
+from .session import Session
+
+DEFAULT_DELETE_OPTIONS = V1DeleteOptions(propagation_policy="Foreground")
+
+
+async def read_config(pool_size: int = DEFAULT_POOL_SIZE) -> ApiClient:
+    """
+    Returns a new session configured from the current kubeconfig context,
+    allowing up to *pool_size* concurrent connections to the API.
+
+    The session must be closed with ``await session.close()`` when done.
+    """
+    if pool_size < 1:
+        raise ValueError(f"Expected a positive pool size, got {pool_size}.")
+    configuration = Configuration()
+    try:
+        await config.load_kube_config(client_configuration=configuration)
+    except FileNotFoundError:
+        logging.error("Kubernetes config. not found!")
+        raise
+    return Session(configuration, pool_size)
+
+
+async def create_namespace(namespace: Manifest, session: ApiClient) -> V1Namespace:
+    logging.info("Creating Namespace %r...", namespace.name)
+    try:
+        return await CoreV1Api(session).create_namespace(body=namespace.body)
+    except ApiException as err:
+        logging.error("Failed to create Namespace %r: %s", namespace.name, err.reason)
+        raise
+
+
+async def delete_namespace(
+    name: str, session: ApiClient, wait: bool = True
+) -> Optional[V1Status]:
+    """
+    Deletes namespace *name*, which deletes all the resources it contains.
+
+    Unless *wait* is false, waits until the namespace is completely gone.
+    """
+    logging.info("Deleting Namespace %r...", name)
+    try:
+        await CoreV1Api(session).delete_namespace(
+            name=name, body=DEFAULT_DELETE_OPTIONS
+        )
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            logging.debug("Skipping Namespace %r deletion: %s", name, err.reason)
+            return
+        logging.error("Failed to delete Namespace %r: %s", name, err.reason)
+        raise
+    if not wait:
+        return
+
+    logging.info("Waiting for Namespace %r and its resources to be deleted...", name)
+    start = monotonic()
+    await await_no_resources_found(
+        CoreV1Api(session).list_namespace, field_selector=f"metadata.name={name}"
+    )
+    logging.info("Namespace %r deleted in %.1fs.", name, monotonic() - start)
+
+
+async def create_deployment(deployment: Manifest, session: ApiClient) -> V1Deployment:
+    logging.info("Creating Deployment %r...", deployment.name)
+    try:
+        return await AppsV1Api(session).create_namespaced_deployment(
+            namespace=deployment.namespace, body=deployment.body
+        )
+    except ApiException as err:
+        logging.error("Failed to create Deployment %r: %s", deployment.name, err.reason)
+        raise
+
+
+async def rescale_deployment(
+    manifest: Manifest, replicas: int, session: ApiClient
+) -> V1Scale:
+    logging.info("Rescaling Deployment %r to %s Replicas...", manifest.name, replicas)
+
+    if replicas < 0:
+        raise ValueError(f"Expected a positive number of Replicas, got {replicas}")
+
+    try:
+        return await _patch_deployment_scale(manifest, replicas, session)
+    except ApiException as err:
+        logging.error("Failed to rescale Deployment %r: %s", manifest.name, err.reason)
+        raise
+
+
+async def rescale_deployments(
+    targets: Sequence[Tuple[Manifest, int]], session: ApiClient
+) -> List[V1Scale]:
+    """
+    Rescales each deployment of *targets* to its associated number of
+    replicas, concurrently.
+    """
+    return list(
+        await asyncio.gather(
+            *(rescale_deployment(m, replicas, session) for m, replicas in targets)
+        )
+    )
+
+
+@retry(
+    stop=stop_after_attempt(KUBE_API_CONFLICT_RETRIES),
+    wait=wait_random(0, KUBE_API_WAIT),
+    retry=retry_if_exception(lambda e: getattr(e, "status", None) == STATUS_CONFLICT),
+    reraise=True,
+)
+async def _patch_deployment_scale(
+    manifest: Manifest, replicas: int, session: ApiClient
+) -> V1Scale:
+    return await AppsV1Api(session).patch_namespaced_deployment_scale(
+        name=manifest.name,
+        namespace=manifest.namespace,
+        body={"spec": {"replicas": replicas}},
+    )
+
+
+async def delete_deployments(namespace: str, session: ApiClient) -> Optional[V1Status]:
+    logging.info("Deleting Deployments in Namespace %r...", namespace)
+    try:
+        await AppsV1Api(session).delete_collection_namespaced_deployment(
+            namespace=namespace
+        )
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            logging.debug("Skipping Deployment deletion: %s", err.reason)
+            return
+        logging.error(
+            "Failed to delete Deployments in Namespace %r: %s", namespace, err.reason
+        )
+        raise
+    await await_no_resources_found(
+        AppsV1Api(session).list_namespaced_deployment, namespace=namespace
+    )
+
+
+async def create_service(service: Manifest, session: ApiClient) -> V1Service:
+    logging.info("Creating Service %r...", service.name)
+    try:
+        return await CoreV1Api(session).create_namespaced_service(
+            namespace=service.namespace, body=service.body
+        )
+    except ApiException as err:
+        logging.error("Failed to create Service %r: %s", service.name, err.reason)
+        raise
+
+
+async def delete_service(
+    name: str, namespace: str, session: ApiClient
+) -> Optional[V1Status]:
+    logging.info("Deleting Service %r...", name)
+    try:
+        await CoreV1Api(session).delete_namespaced_service(
+            name=name, namespace=namespace, body=DEFAULT_DELETE_OPTIONS
+        )
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            logging.debug("Skipping Service %r deletion: %s", name, err.reason)
+            return
+        logging.error("Failed to delete Service %r: %s", name, err.reason)
+        raise
+    await await_no_resources_found(
+        CoreV1Api(session).list_namespaced_service,
+        namespace=namespace,
+        field_selector=f"metadata.name={name}",
+    )
+
+
+async def create_ingress(ingress: Manifest, session: ApiClient):
+    logging.info("Creating Ingress %r...", ingress.name)
+    try:
+        return await NetworkingV1beta1Api(session).create_namespaced_ingress(
+            namespace=ingress.namespace, body=ingress.body
+        )
+    except ApiException as err:
+        logging.error("Failed to create Ingress %r: %s", ingress.name, err.reason)
+        raise
+
+
+async def delete_ingress(
+    name: str, namespace: str, session: ApiClient
+) -> Optional[V1Status]:
+    logging.info("Deleting Ingress %r...", name)
+    try:
+        await NetworkingV1beta1Api(session).delete_namespaced_ingress(
+            name=name, namespace=namespace, body=DEFAULT_DELETE_OPTIONS
+        )
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            logging.debug("Skipping Ingress %r deletion: %s", name, err.reason)
+            return
+        logging.error("Failed to delete Ingress %r: %s", name, err.reason)
+        raise
+    await await_no_resources_found(
+        NetworkingV1beta1Api(session).list_namespaced_ingress,
+        namespace=namespace,
+        field_selector=f"metadata.name={name}",
+    )
+
+
+async def try_creating_custom_objects(
+    manifests: List[Manifest], session: ApiClient
+) -> None:
+    """
+    Creates the custom objects of *manifests* whose kind is defined by a
+    namespaced CRD of the cluster, concurrently. Others are ignored.
+    """
+    logging.info("Fetching CRDs available in the cluster...")
+    try:
+        custom_resources = (
+            await ApiextensionsV1beta1Api(session).list_custom_resource_definition()
+        ).items
+    except ApiException as err:
+        logging.error("Failed to fetch CRDs: %s", err.reason)
+        raise
+
+    plurals = {
+        r.spec.names.kind.lower(): r.spec.names.plural
+        for r in custom_resources
+        if r.spec.scope.lower() == "namespaced"
+    }
+    creations = []
+    for m in manifests:
+        plural = plurals.get(m.body["kind"].lower())
+        if plural is None:
+            logging.error(
+                "Unsupported custom manifest %r of kind %r is ignored. "
+                "Supported namespaced custom resource types are: %s",
+                m.name,
+                m.body["kind"],
+                set(plurals),
+            )
+            continue
+        creations.append(_create_custom_object_with_plural(m, plural, session))
+    await asyncio.gather(*creations)
+
+
+async def _create_custom_object_with_plural(
+    custom_object: Manifest, plural: str, session: ApiClient
+):
+    logging.info("Creating %s %r ", custom_object.body["kind"], custom_object.name)
+    try:
+        group, version = custom_object.body.get("apiVersion").rsplit("/", 1)
+        return await CustomObjectsApi(session).create_namespaced_custom_object(
+            namespace=custom_object.namespace,
+            body=custom_object.body,
+            group=group,
+            version=version,
+            plural=plural,
+        )
+    except ApiException as err:
+        logging.error(
+            "Failed to create %s %r: %s",
+            custom_object.body["kind"],
+            custom_object.name,
+            err.reason,
+        )
+        raise
+
+
+async def await_no_resources_found(list_resources: Callable, **kwargs) -> None:
+    """
+    Waits until *list_resources* (called with *kwargs*) doesn't find anything.
+
+    Deletions are watched when possible, otherwise the API is polled.
+
+    :raise WaitTimeoutError: If resources are still found after
+        KUBE_API_DELETE_TIMEOUT seconds.
+    """
+    try:
+        await watcher.wait_for(
+            list_resources, nothing_found, KUBE_API_DELETE_TIMEOUT, **kwargs
+        )
+    except WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        await _poll_no_resources_found(list_resources, **kwargs)
+    except ApiException as err:
+        if err.status != STATUS_NOT_FOUND:
+            raise
+
+
+@retry(
+    stop=stop_after_delay(KUBE_API_DELETE_TIMEOUT),
+    wait=wait_fixed(KUBE_API_WAIT),
+    retry=retry_if_exception_type(ResourceStillThereError),
+)
+async def _poll_no_resources_found(list_resources: Callable, **kwargs) -> None:
+    try:
+        found = (await list_resources(**kwargs)).items
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            return
+        raise
+    if found:
+        raise ResourceStillThereError(f"Resource(s): {found} still found; retrying.")
+
+
+async def wait_until_pod_ready(deployment: Manifest, session: ApiClient) -> None:
+    """
+    Waits until a pod of *deployment* is ready.
+
+    Pods are watched when possible, otherwise the API is polled.
+
+    :raise WaitTimeoutError: If no pod is ready after KUBE_API_LIST_TIMEOUT
+        seconds.
+    """
+    list_pods = CoreV1Api(session).list_namespaced_pod
+    selectors = {
+        "namespace": deployment.namespace,
+        "label_selector": deployment.labels,
+    }
+    try:
+        await watcher.wait_for(
+            list_pods, any_pod_ready, KUBE_API_LIST_TIMEOUT, **selectors
+        )
+    except WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        await watcher.poll_for(
+            list_pods, any_pod_ready, KUBE_API_LIST_TIMEOUT, KUBE_API_WAIT, **selectors
+        )
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+from time import monotonic
+from typing import Awaitable, Callable, Optional
+
+from kubernetes.client.rest import ApiException as SyncApiException
+from tenacity import RetryError
+
+import zelt.kubernetes.aio.client as kube
+from zelt.kubernetes import pools
+from zelt.kubernetes.client import error_reason
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.manifest_set import ManifestSet
+from zelt.kubernetes.storage.protocol import LocustfileStorage
+
+# Storage backends still use the synchronous client.
+_ERRORS = (kube.ApiException, SyncApiException, RetryError, kube.WaitTimeoutError)
+
+
+async def create_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: Optional[kube.ApiClient] = None,
+) -> None:
+    """
+    Asynchronous version of :func:`zelt.kubernetes.deployer.create_resources`.
+    """
+    await _with_session(
+        session, lambda s: _create_resources(ms, storage, locustfile, s)
+    )
+
+
+async def _create_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: kube.ApiClient,
+) -> None:
+    loop = asyncio.get_event_loop()
+    start = monotonic()
+    try:
+        await kube.create_namespace(ms.namespace, session)
+        upload = loop.run_in_executor(None, storage.upload, locustfile)
+
+        async def controller() -> None:
+            await kube.create_deployment(ms.controller, session)
+            await upload
+            await kube.wait_until_pod_ready(ms.controller, session)
+
+        async def worker(deployment: Manifest) -> None:
+            await upload
+            await kube.create_deployment(deployment, session)
+
+        tasks = [
+            controller(),
+            kube.create_service(ms.service, session),
+            kube.create_ingress(ms.ingress, session),
+        ]
+        tasks.extend(worker(w) for w in ms.workers)
+        if ms.others:
+            tasks.append(kube.try_creating_custom_objects(ms.others, session))
+        await asyncio.gather(*tasks)
+    except _ERRORS as err:
+        logging.error("Kubernetes operation failed: %s", error_reason(err))
+        return
+
+    logging.info("Resources created in %.1fs.", monotonic() - start)
+
+
+async def delete_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    session: Optional[kube.ApiClient] = None,
+    fast: bool = False,
+    wait: bool = True,
+) -> None:
+    """
+    Asynchronous version of :func:`zelt.kubernetes.deployer.delete_resources`.
+
+    The Ingress, Service and Deployments are deleted concurrently.
+    """
+    await _with_session(
+        session, lambda s: _delete_resources(ms, storage, s, fast, wait)
+    )
+
+
+async def _delete_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    session: kube.ApiClient,
+    fast: bool,
+    wait: bool,
+) -> None:
+    loop = asyncio.get_event_loop()
+    namespace = ms.namespace.name
+    try:
+        if fast:
+            logging.info("Deleting Namespace %r and its resources...", namespace)
+            if not storage.deleted_with_namespace:
+                await loop.run_in_executor(None, storage.delete)
+            await kube.delete_namespace(namespace, session, wait=wait)
+            return
+
+        logging.info("Deleting resources...")
+        await asyncio.gather(
+            kube.delete_ingress(ms.ingress.name, namespace, session),
+            kube.delete_service(ms.service.name, namespace, session),
+            kube.delete_deployments(namespace, session),
+        )
+        # Storage mounted by the pods, like a PersistentVolumeClaim, can only
+        # be deleted once they are gone.
+        await loop.run_in_executor(None, storage.delete)
+        await kube.delete_namespace(namespace, session)
+    except _ERRORS as err:
+        logging.error("Kubernetes operation failed: %s", error_reason(err))
+
+
+async def rescale_worker_deployment(
+    ms: ManifestSet, replicas: int, session: Optional[kube.ApiClient] = None
+) -> None:
+    """
+    Asynchronous version of
+    :func:`zelt.kubernetes.deployer.rescale_worker_deployment`.
+    """
+    if not ms.workers:
+        logging.error(
+            "Missing worker manifest. Only worker deployments can be rescaled."
+        )
+        return
+
+    async def rescale(s: kube.ApiClient) -> None:
+        try:
+            await kube.rescale_deployments(pools.distribute(replicas, ms.workers), s)
+        except _ERRORS as err:
+            logging.error("Kubernetes operation failed: %s", error_reason(err))
+
+    await _with_session(session, rescale)
+
+
+async def _with_session(
+    session: Optional[kube.ApiClient],
+    operation: Callable[[kube.ApiClient], Awaitable[None]],
+) -> None:
+    # Sessions created here are closed here; given ones belong to the caller,
+    # who may share them between concurrent operations.
+    if session is not None:
+        await operation(session)
+        return
+    session = await kube.read_config()
+    try:
+        await operation(session)
+    finally:
+        await session.close()
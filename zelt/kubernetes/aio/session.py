@@ -0,0 +1,30 @@
+from kubernetes_asyncio.client import ApiClient, Configuration
+
+from zelt import tracing
+from zelt.kubernetes.session import DEFAULT_POOL_SIZE
+from . import throttle
+
+
+class Session(ApiClient):
+    """
+    Asynchronous version of :class:`zelt.kubernetes.session.Session`.
+
+    Calls are rate-limited and retried on transient failures by the throttle
+    shared with synchronous sessions (see :mod:`zelt.kubernetes.throttle`).
+    """
+
+    def __init__(
+        self, configuration: Configuration, pool_size: int = DEFAULT_POOL_SIZE
+    ) -> None:
+        if pool_size < 1:
+            raise ValueError(f"Expected a positive pool size, got {pool_size}.")
+        configuration.connection_pool_maxsize = pool_size
+        super().__init__(configuration)
+        self.pool_size = pool_size
+
+    async def request(self, method, *args, **kwargs):
+        async def send():
+            tracing.count_api_call()
+            return await super(Session, self).request(method, *args, **kwargs)
+
+        return await throttle.call(method, send)
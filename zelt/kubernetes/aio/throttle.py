@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from kubernetes_asyncio.client.rest import ApiException
+
+from zelt import tracing
+from zelt.kubernetes import throttle
+from zelt.kubernetes.throttle import backoff, is_retryable, retry_after
+
+T = TypeVar("T")
+
+
+async def call(method: str, request: Callable[[], Awaitable[T]]) -> T:
+    """
+    Asynchronous version of :func:`zelt.kubernetes.throttle.call`.
+
+    Calls take their tokens from the bucket of the current throttle, so that
+    the limit applies to synchronous and asynchronous calls alike.
+    """
+    current = throttle.current()
+    attempt = 0
+    while True:
+        delay = current.bucket.reserve()
+        if delay > 0:
+            logging.debug("Throttling Kubernetes API call for %.2fs.", delay)
+            await asyncio.sleep(delay)
+        try:
+            return await request()
+        except ApiException as err:
+            if attempt >= current.retries or not is_retryable(method, err):
+                raise
+            delay = backoff(attempt, retry_after(err))
+            logging.warning(
+                "Kubernetes API call failed with %s %s; retrying in %.1fs...",
+                err.status,
+                err.reason,
+                delay,
+            )
+            tracing.count_retry()
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kubernetes_asyncio import watch
+from kubernetes_asyncio.client.rest import ApiException
+
+from zelt.kubernetes.watcher import (
+    STATUS_GONE,
+    WATCH_UNAVAILABLE_STATUSES,
+    WaitTimeoutError,
+    WatchUnavailableError,
+    object_key,
+)
+
+
+async def wait_for(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    timeout: float,
+    **kwargs,
+) -> List:
+    """
+    Asynchronous version of :func:`zelt.kubernetes.watcher.wait_for`.
+
+    :raise WatchUnavailableError: If *list_resources* can't be watched.
+    :raise WaitTimeoutError: If *condition* still doesn't hold after *timeout*
+        seconds.
+    """
+    if not getattr(list_resources, "__name__", "").startswith("list_"):
+        raise WatchUnavailableError(f"{list_resources!r} is not a list function")
+
+    deadline = monotonic() + timeout
+    objects, version = await _list(list_resources, **kwargs)
+    while not condition(list(objects.values())):
+        remaining = int(deadline - monotonic())
+        if remaining <= 0:
+            raise WaitTimeoutError(
+                f"Condition not met after {timeout}s for {list(objects)}."
+            )
+        try:
+            version = await _follow(
+                list_resources, condition, objects, version, remaining, **kwargs
+            )
+        except ApiException as err:
+            if err.status in WATCH_UNAVAILABLE_STATUSES:
+                raise WatchUnavailableError(err.reason) from err
+            if err.status != STATUS_GONE:
+                raise
+            version = None
+        if version is None:
+            logging.debug("Watch expired; listing resources again...")
+            objects, version = await _list(list_resources, **kwargs)
+    return list(objects.values())
+
+
+async def poll_for(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    timeout: float,
+    interval: float,
+    **kwargs,
+) -> List:
+    """
+    Asynchronous version of :func:`zelt.kubernetes.watcher.poll_for`.
+    """
+    deadline = monotonic() + timeout
+    while True:
+        objects = list((await _list(list_resources, **kwargs))[0].values())
+        if condition(objects):
+            return objects
+        if monotonic() + interval > deadline:
+            raise WaitTimeoutError(f"Condition not met after {timeout}s.")
+        await asyncio.sleep(interval)
+
+
+async def _list(list_resources: Callable, **kwargs) -> Tuple[Dict[Tuple, object], str]:
+    found = await list_resources(**kwargs)
+    objects = {object_key(o): o for o in found.items}
+    return objects, found.metadata.resource_version
+
+
+async def _follow(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    objects: Dict[Tuple, object],
+    version: str,
+    timeout: int,
+    **kwargs,
+) -> Optional[str]:
+    async with watch.Watch() as w:
+        async for event in w.stream(
+            list_resources, resource_version=version, timeout_seconds=timeout, **kwargs
+        ):
+            if event["type"] == "ERROR":
+                if event["raw_object"].get("code") == STATUS_GONE:
+                    return None
+                raise ApiException(
+                    status=event["raw_object"].get("code"),
+                    reason=event["raw_object"].get("message"),
+                )
+            obj = event["object"]
+            if event["type"] == "DELETED":
+                objects.pop(object_key(obj), None)
+            else:
+                objects[object_key(obj)] = obj
+            version = obj.metadata.resource_version
+            if condition(list(objects.values())):
+                return version
+    return version
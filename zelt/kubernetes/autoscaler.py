@@ -0,0 +1,134 @@
+import logging
+import math
+from time import sleep
+from typing import NamedTuple, Optional
+
+from tenacity import RetryError
+
+import zelt.kubernetes.client as kube
+from zelt.kubernetes import deployer, fleet, metrics
+from zelt.kubernetes.manifest_set import ManifestSet
+from zelt.kubernetes.session import Session
+
+DEFAULT_CPU_THRESHOLD = 0.8
+DEFAULT_SUSTAIN = 3
+DEFAULT_INTERVAL = 30
+
+
+class AutoscalePolicy(NamedTuple):
+    # Maximum number of worker pods the autoscaler may scale up to.
+    max_workers: int
+    # Median CPU utilisation of the workers, relative to their CPU request,
+    # above which workers are added.
+    cpu_threshold: float = DEFAULT_CPU_THRESHOLD
+    # Number of consecutive samples above the threshold needed to scale up,
+    # so that short spikes don't add workers.
+    sustain: int = DEFAULT_SUSTAIN
+
+    def check(self) -> None:
+        """
+        :raise ValueError: If a value of this policy is out of range.
+        """
+        if self.max_workers < 1:
+            raise ValueError(
+                f"Expected a positive maximum of workers, got {self.max_workers}."
+            )
+        if not self.cpu_threshold > 0:
+            raise ValueError(
+                f"Expected a positive CPU threshold, got {self.cpu_threshold}."
+            )
+        if self.sustain < 1:
+            raise ValueError(
+                f"Expected a positive number of samples, got {self.sustain}."
+            )
+
+
+class Autoscaler:
+    """
+    Adds workers of *ms* while their median CPU utilisation stays above the
+    threshold of *policy*.
+
+    Workers are never removed: removing workers stops the users they
+    simulate, which would change the load of the test.
+    """
+
+    def __init__(
+        self,
+        ms: ManifestSet,
+        policy: AutoscalePolicy,
+        session: Optional[Session] = None,
+        wait_ready: Optional[float] = None,
+    ) -> None:
+        policy.check()
+        self.ms = ms
+        self.policy = policy
+        self.session = session
+        self.wait_ready = wait_ready
+        self.samples_above = 0
+
+    def decide(self, workers: int, utilisation: Optional[float]) -> int:
+        """
+        Returns the number of workers wanted after a sample of median
+        *utilisation* with *workers* pods.
+
+        Enough workers are added to bring the utilisation back to the
+        threshold, assuming the load spreads evenly between them.
+        """
+        if utilisation is None or utilisation <= self.policy.cpu_threshold:
+            self.samples_above = 0
+            return workers
+        self.samples_above += 1
+        if self.samples_above < self.policy.sustain:
+            return workers
+        if workers >= self.policy.max_workers:
+            logging.warning(
+                "Workers are saturated (%.0f%% CPU) but already at the maximum "
+                "of %s.",
+                utilisation * 100,
+                self.policy.max_workers,
+            )
+            return workers
+
+        self.samples_above = 0
+        wanted = math.ceil(workers * utilisation / self.policy.cpu_threshold)
+        return min(max(wanted, workers + 1), self.policy.max_workers)
+
+    def sample(self) -> int:
+        """
+        Samples the CPU utilisation of the workers, adding workers if needed,
+        and returns the resulting number of workers.
+        """
+        workers = fleet.read_status(self.ms.workers, self.session).total
+        utilisation = metrics.median_utilisation(self.ms.workers, self.session)
+        logging.info(
+            "%s worker pod(s) at %s median CPU utilisation.",
+            workers,
+            "unknown" if utilisation is None else f"{utilisation:.0%}",
+        )
+        wanted = self.decide(workers, utilisation)
+        if wanted == workers:
+            return workers
+        logging.info("Adding %s worker pod(s)...", wanted - workers)
+        rescaled = deployer.rescale_worker_deployment(
+            self.ms, wanted, self.session, self.wait_ready or 1.0
+        )
+        if rescaled is None:
+            logging.warning("Adding workers failed; still %s worker pod(s).", workers)
+            return workers
+        return rescaled
+
+    def run(self, interval: float = DEFAULT_INTERVAL) -> None:
+        """
+        Samples the workers every *interval* seconds, until interrupted.
+
+        Failed samples are logged and skipped, unless the metrics API is
+        missing altogether.
+        """
+        while True:
+            try:
+                self.sample()
+            except (kube.ApiException, RetryError) as err:
+                if getattr(err, "status", None) == kube.STATUS_NOT_FOUND:
+                    raise
+                logging.error("Sampling workers failed: %s", kube.error_reason(err))
+            sleep(interval)
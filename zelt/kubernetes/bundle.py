@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import io
+import os
+import tarfile
+from pathlib import Path
+from typing import Dict
+
+# Name of the locustfile at the root of a bundle.
+LOCUSTFILE_NAME = "locustfile.py"
+# Name of the file listing the digests of the files of a bundle, in the
+# format of ``sha256sum -c``, stored along with them.
+MANIFEST_NAME = ".zelt-bundle.sha256"
+_EXCLUDED_DIRECTORIES = {"__pycache__"}
+_EXCLUDED_SUFFIXES = {".pyc", ".pyo"}
+
+
+def is_bundle(path: os.PathLike) -> bool:
+    """
+    Returns whether *path* is a bundle, i.e. a directory holding a
+    locustfile and the files it uses, rather than a single locustfile.
+    """
+    return Path(path).is_dir()
+
+
+def check(directory: os.PathLike) -> None:
+    """
+    :raise ValueError: If *directory* has no locustfile at its root.
+    """
+    if not Path(directory, LOCUSTFILE_NAME).is_file():
+        raise ValueError(f"Missing {LOCUSTFILE_NAME} in bundle {directory}.")
+
+
+def locustfile_of(path: os.PathLike) -> Path:
+    """
+    Returns the locustfile of bundle *path*, or *path* itself if it is a
+    single locustfile.
+    """
+    return Path(path, LOCUSTFILE_NAME) if is_bundle(path) else Path(path)
+
+
+def size(path: os.PathLike) -> int:
+    """
+    Returns the size in bytes of the files of bundle *path*, or of *path*
+    itself if it is a single locustfile.
+    """
+    if not is_bundle(path):
+        return Path(path).stat().st_size
+    return sum(Path(path, f).stat().st_size for f in file_digests(path))
+
+
+def file_digests(directory: os.PathLike) -> Dict[str, str]:
+    """
+    Returns the SHA-256 hex digest of each file of *directory*, by path
+    relative to it, in sorted order.
+
+    Hidden files and directories, as well as compiled Python files, are
+    left out.
+    """
+    root = Path(directory)
+    digests = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d
+            for d in dirnames
+            if not d.startswith(".") and d not in _EXCLUDED_DIRECTORIES
+        )
+        for name in sorted(filenames):
+            path = Path(dirpath, name)
+            if name.startswith(".") or path.suffix in _EXCLUDED_SUFFIXES:
+                continue
+            relative = path.relative_to(root).as_posix()
+            digests[relative] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return dict(sorted(digests.items()))
+
+
+def manifest(digests: Dict[str, str]) -> str:
+    """
+    Returns the manifest of a bundle made of files with *digests*.
+    """
+    return "".join(f"{sha}  {path}\n" for path, sha in digests.items())
+
+
+def parse_manifest(text: str) -> Dict[str, str]:
+    """
+    Returns the digest of each file listed in manifest *text*, by path.
+    """
+    digests = {}
+    for line in text.splitlines():
+        sha, _, path = line.strip().partition("  ")
+        if path:
+            digests[path] = sha
+    return digests
+
+
+def bundle_digest(directory: os.PathLike) -> str:
+    """
+    Returns the SHA-256 hex digest of the manifest of *directory*, which
+    changes whenever one of its files does.
+    """
+    text = manifest(file_digests(directory))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack(path: os.PathLike) -> bytes:
+    """
+    Returns the files of bundle *path* and their manifest as a gzipped
+    tarball. A single locustfile is packed as the only file of a bundle.
+
+    Files are added in sorted order with fixed ownership and modification
+    times, so that packing the same files twice gives the same bytes.
+    """
+    if is_bundle(path):
+        digests = file_digests(path)
+        sources = {name: Path(path, name) for name in digests}
+    else:
+        content = Path(path).read_bytes()
+        digests = {LOCUSTFILE_NAME: hashlib.sha256(content).hexdigest()}
+        sources = {LOCUSTFILE_NAME: Path(path)}
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w") as tar:
+            _add(tar, MANIFEST_NAME, manifest(digests).encode("utf-8"))
+            for name, source in sources.items():
+                _add(tar, name, source.read_bytes())
+    return buffer.getvalue()
+
+
+def _add(tar: tarfile.TarFile, name: str, content: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(content))
@@ -1,8 +1,14 @@
 import logging
-from typing import List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import partial
+from time import monotonic
+from typing import List, Optional, Callable, Sequence, Tuple
 
 from kubernetes import config
 from kubernetes.client import (
+    ApiClient,
+    Configuration,
     CoreV1Api,
     V1Namespace,
     AppsV1Api,
@@ -10,22 +16,36 @@ from kubernetes.client import (
     V1Service,
     V1DeleteOptions,
     V1Deployment,
+    V1Scale,
     V1Status,
-    V1ContainerStatus,
     NetworkingV1beta1Api,
     NetworkingV1beta1Ingress,
     CustomObjectsApi,
     ApiextensionsV1beta1Api,
 )
 from kubernetes.client.rest import ApiException
-from tenacity import retry, stop_after_delay, wait_fixed, retry_if_exception_type
+from tenacity import (
+    retry,
+    retry_if_exception,
+    retry_if_exception_type,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_fixed,
+    wait_random,
+)
 
-from .manifest import Manifest
+from zelt import tracing
+from . import discovery, watcher
+from .manifest import Manifest, ResourceType
+from .session import DEFAULT_POOL_SIZE, Session
+from .watcher import WaitTimeoutError
 
 KUBE_API_LIST_TIMEOUT = 360
 KUBE_API_DELETE_TIMEOUT = 240
 KUBE_API_WAIT = 1
+KUBE_API_CONFLICT_RETRIES = 5
 STATUS_NOT_FOUND = 404
+STATUS_CONFLICT = 409
 DEFAULT_DELETE_OPTIONS = V1DeleteOptions(propagation_policy="Foreground")
 
 
@@ -37,40 +57,78 @@ class ResourceStillThereError(RuntimeError):
     pass
 
 
-def read_config():
+def error_reason(err: Exception) -> str:
+    """
+    Returns the reason of *err* as given by the Kubernetes API, or its
+    message for other errors.
+    """
+    return getattr(err, "reason", None) or str(err)
+
+
+def read_config(
+    pool_size: int = DEFAULT_POOL_SIZE, context: Optional[str] = None
+) -> Session:
+    """
+    Returns a new session configured from kubeconfig *context*, defaulting to
+    the current context.
+    """
+    configuration = Configuration()
     try:
-        config.load_kube_config()
+        config.load_kube_config(context=context, client_configuration=configuration)
     except FileNotFoundError:
         logging.error("Kubernetes config. not found!")
         raise
+    return Session(configuration, pool_size)
 
 
-def create_namespace(namespace: Manifest) -> V1Namespace:
+@tracing.traced
+def create_namespace(
+    namespace: Manifest, session: Optional[ApiClient] = None
+) -> V1Namespace:
     logging.info("Creating Namespace %r...", namespace.name)
     try:
-        return CoreV1Api().create_namespace(body=namespace.body)
+        return CoreV1Api(session).create_namespace(body=namespace.body)
     except ApiException as err:
         logging.error("Failed to create Namespace %r: %s", namespace.name, err.reason)
         raise
 
 
-def delete_namespace(name: str) -> Optional[V1Status]:
+@tracing.traced
+def delete_namespace(
+    name: str, session: Optional[ApiClient] = None, wait: bool = True
+) -> Optional[V1Status]:
+    """
+    Deletes namespace *name*, which deletes all the resources it contains.
+
+    Unless *wait* is false, waits until the namespace is completely gone.
+    """
     logging.info("Deleting Namespace %r...", name)
     try:
-        CoreV1Api().delete_namespace(name=name, body=DEFAULT_DELETE_OPTIONS)
+        CoreV1Api(session).delete_namespace(name=name, body=DEFAULT_DELETE_OPTIONS)
     except ApiException as err:
         if err.status == STATUS_NOT_FOUND:
             logging.debug("Skipping Namespace %r deletion: %s", name, err.reason)
             return
         logging.error("Failed to delete Namespace %r: %s", name, err.reason)
         raise
-    await_no_resources_found(CoreV1Api().read_namespace, name=name)
+    if not wait:
+        return
+
+    logging.info("Waiting for Namespace %r and its resources to be deleted...", name)
+    start = monotonic()
+    await_no_resources_found(
+        CoreV1Api(session).list_namespace, field_selector=f"metadata.name={name}"
+    )
+    logging.info("Namespace %r deleted in %.1fs.", name, monotonic() - start)
 
 
-def create_deployment(deployment: Manifest) -> V1Deployment:
+@tracing.traced
+def create_deployment(
+    deployment: Manifest, session: Optional[ApiClient] = None
+) -> V1Deployment:
     logging.info("Creating Deployment %r...", deployment.name)
     try:
-        return AppsV1Api().create_namespaced_deployment(
+        return AppsV1Api(session).create_namespaced_deployment(
             namespace=deployment.namespace, body=deployment.body
         )
     except ApiException as err:
@@ -78,42 +136,85 @@ def create_deployment(deployment: Manifest) -> V1Deployment:
         raise
 
 
-def rescale_deployment(manifest: Manifest, replicas: int) -> V1Deployment:
+@tracing.traced
+def rescale_deployment(
+    manifest: Manifest, replicas: int, session: Optional[ApiClient] = None
+) -> V1Scale:
     logging.info("Rescaling Deployment %r to %s Replicas...", manifest.name, replicas)
 
     if replicas < 0:
         raise ValueError(f"Expected a positive number of Replicas, got {replicas}")
 
-    logging.debug("Fetching existing Deployment %r...", manifest.name)
     try:
-        deployment = AppsV1Api().read_namespaced_deployment(
-            name=manifest.name, namespace=manifest.namespace
-        )
+        return _patch_deployment_scale(manifest, replicas, session)
     except ApiException as err:
-        logging.error("Failed to fetch Deployment: %s", err.reason)
+        logging.error("Failed to rescale Deployment %r: %s", manifest.name, err.reason)
         raise
 
-    logging.debug(
-        "Changing Deployment Replicas from %s to %s...",
-        deployment.spec.replicas,
-        replicas,
+
+def rescale_deployments(
+    targets: Sequence[Tuple[Manifest, int]], session: Optional[ApiClient] = None
+) -> List[V1Scale]:
+    """
+    Rescales each deployment of *targets* to its associated number of
+    replicas, concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=len(targets) or 1) as pool:
+        futures = [
+            pool.submit(rescale_deployment, manifest, replicas, session)
+            for manifest, replicas in targets
+        ]
+    return [f.result() for f in futures]
+
+
+@retry(
+    stop=stop_after_attempt(KUBE_API_CONFLICT_RETRIES),
+    wait=wait_random(0, KUBE_API_WAIT),
+    retry=retry_if_exception(lambda e: getattr(e, "status", None) == STATUS_CONFLICT),
+    reraise=True,
+    before_sleep=tracing.count_retry,
+)
+def _patch_deployment_scale(
+    manifest: Manifest, replicas: int, session: Optional[ApiClient]
+) -> V1Scale:
+    # Only the scale subresource is sent, so no read is needed beforehand and
+    # concurrent changes to the rest of the deployment can't conflict.
+    return AppsV1Api(session).patch_namespaced_deployment_scale(
+        name=manifest.name,
+        namespace=manifest.namespace,
+        body={"spec": {"replicas": replicas}},
     )
-    deployment.spec.replicas = replicas
 
-    logging.debug("Redeploying Deployment %r...", manifest.name)
+
+@tracing.traced
+def annotate_pod_template(
+    deployment: Manifest, annotations: dict, session: Optional[ApiClient] = None
+) -> V1Deployment:
+    """
+    Adds *annotations* to the pod template of *deployment*, which triggers a
+    rolling restart of its pods if they change.
+    """
+    logging.info("Annotating the Pods of Deployment %r...", deployment.name)
     try:
-        return AppsV1Api().replace_namespaced_deployment(
-            name=manifest.name, namespace=manifest.namespace, body=deployment
+        return AppsV1Api(session).patch_namespaced_deployment(
+            name=deployment.name,
+            namespace=deployment.namespace,
+            body={"spec": {"template": {"metadata": {"annotations": annotations}}}},
         )
     except ApiException as err:
-        logging.error("Failed to redeploy Deployment %r: %s", manifest.name, err.reason)
+        logging.error(
+            "Failed to annotate Deployment %r: %s", deployment.name, err.reason
+        )
         raise
 
 
-def delete_deployments(namespace: str) -> Optional[V1Status]:
+@tracing.traced
+def delete_deployments(
+    namespace: str, session: Optional[ApiClient] = None
+) -> Optional[V1Status]:
     logging.info("Deleting Deployments in Namespace %r...", namespace)
     try:
-        AppsV1Api().delete_collection_namespaced_deployment(namespace=namespace)
+        AppsV1Api(session).delete_collection_namespaced_deployment(namespace=namespace)
     except ApiException as err:
         if err.status == STATUS_NOT_FOUND:
             logging.debug("Skipping Deployment deletion: %s", err.reason)
@@ -123,14 +224,15 @@ def delete_deployments(namespace: str) -> Optional[V1Status]:
         )
         raise
     await_no_resources_found(
-        AppsV1Api().list_namespaced_deployment, namespace=namespace
+        AppsV1Api(session).list_namespaced_deployment, namespace=namespace
     )
 
 
-def create_service(service: Manifest) -> V1Service:
+@tracing.traced
+def create_service(service: Manifest, session: Optional[ApiClient] = None) -> V1Service:
     logging.info("Creating Service %r...", service.name)
     try:
-        return CoreV1Api().create_namespaced_service(
+        return CoreV1Api(session).create_namespaced_service(
             namespace=service.namespace, body=service.body
         )
     except ApiException as err:
@@ -138,10 +240,13 @@ def create_service(service: Manifest) -> V1Service:
         raise
 
 
-def delete_service(name: str, namespace: str) -> Optional[V1Status]:
+@tracing.traced
+def delete_service(
+    name: str, namespace: str, session: Optional[ApiClient] = None
+) -> Optional[V1Status]:
     logging.info("Deleting Service %r...", name)
     try:
-        CoreV1Api().delete_namespaced_service(
+        CoreV1Api(session).delete_namespaced_service(
             name=name, namespace=namespace, body=DEFAULT_DELETE_OPTIONS
         )
     except ApiException as err:
@@ -150,13 +255,20 @@ def delete_service(name: str, namespace: str) -> Optional[V1Status]:
             return
         logging.error("Failed to delete Service %r: %s", name, err.reason)
         raise
-    await_no_resources_found(CoreV1Api().list_namespaced_service, namespace=namespace)
+    await_no_resources_found(
+        CoreV1Api(session).list_namespaced_service,
+        namespace=namespace,
+        field_selector=f"metadata.name={name}",
+    )
 
 
-def create_ingress(ingress: Manifest) -> NetworkingV1beta1Ingress:
+@tracing.traced
+def create_ingress(
+    ingress: Manifest, session: Optional[ApiClient] = None
+) -> NetworkingV1beta1Ingress:
     logging.info("Creating Ingress %r...", ingress.name)
     try:
-        return NetworkingV1beta1Api().create_namespaced_ingress(
+        return NetworkingV1beta1Api(session).create_namespaced_ingress(
             namespace=ingress.namespace, body=ingress.body
         )
     except ApiException as err:
@@ -164,10 +276,13 @@ def create_ingress(ingress: Manifest) -> NetworkingV1beta1Ingress:
         raise
 
 
-def delete_ingress(name: str, namespace: str) -> Optional[V1Status]:
+@tracing.traced
+def delete_ingress(
+    name: str, namespace: str, session: Optional[ApiClient] = None
+) -> Optional[V1Status]:
     logging.info("Deleting Ingress %r...", name)
     try:
-        NetworkingV1beta1Api().delete_namespaced_ingress(
+        NetworkingV1beta1Api(session).delete_namespaced_ingress(
             name=name, namespace=namespace, body=DEFAULT_DELETE_OPTIONS
         )
     except ApiException as err:
@@ -177,60 +292,213 @@ def delete_ingress(name: str, namespace: str) -> Optional[V1Status]:
         logging.error("Failed to delete Ingress %r: %s", name, err.reason)
         raise
     await_no_resources_found(
-        NetworkingV1beta1Api().list_namespaced_ingress, namespace=namespace
+        NetworkingV1beta1Api(session).list_namespaced_ingress,
+        namespace=namespace,
+        field_selector=f"metadata.name={name}",
     )
 
 
-def try_creating_custom_objects(manifests: List[Manifest]):
-    logging.info("Fetching CRDs available in the cluster...")
+_CREATE_FUNCTIONS = {
+    ResourceType.NAMESPACE: create_namespace,
+    ResourceType.DEPLOYMENT: create_deployment,
+    ResourceType.SERVICE: create_service,
+    ResourceType.INGRESS: create_ingress,
+}
+
+
+@tracing.traced
+def read_resource(
+    manifest: Manifest, session: Optional[ApiClient] = None
+) -> Optional[dict]:
+    """
+    Returns the serialized form of the resource described by *manifest* as it
+    currently exists in the cluster, or None if it doesn't exist.
+    """
+    read, _ = _read_and_replace_functions(manifest, session)
+    logging.debug("Reading %s %r...", manifest.kind.value, manifest.name)
     try:
-        custom_resources = (
-            ApiextensionsV1beta1Api().list_custom_resource_definition().items
-        )
+        found = read()
     except ApiException as err:
-        logging.error("Failed to fetch CRDs: %s", err.reason)
+        if err.status == STATUS_NOT_FOUND:
+            return None
+        logging.error(
+            "Failed to read %s %r: %s", manifest.kind.value, manifest.name, err.reason
+        )
         raise
+    return (session or ApiClient()).sanitize_for_serialization(found)
 
-    available_kinds = {r.spec.names.kind.lower() for r in custom_resources}
 
+@tracing.traced
+def apply_manifest(manifest: Manifest, session: Optional[ApiClient] = None) -> None:
+    """
+    Replaces the resource described by *manifest*, so that fields removed from
+    the manifest are removed from the resource too, or creates it if it
+    doesn't exist yet.
+    """
+    logging.info("Updating %s %r...", manifest.kind.value, manifest.name)
+    try:
+        _replace_resource(manifest, session)
+        return
+    except ApiException as err:
+        if err.status != STATUS_NOT_FOUND:
+            logging.error(
+                "Failed to update %s %r: %s",
+                manifest.kind.value,
+                manifest.name,
+                err.reason,
+            )
+            raise
+    _CREATE_FUNCTIONS[manifest.kind](manifest, session)
+
+
+@retry(
+    stop=stop_after_attempt(KUBE_API_CONFLICT_RETRIES),
+    wait=wait_random(0, KUBE_API_WAIT),
+    retry=retry_if_exception(lambda e: getattr(e, "status", None) == STATUS_CONFLICT),
+    reraise=True,
+    before_sleep=tracing.count_retry,
+)
+def _replace_resource(manifest: Manifest, session: Optional[ApiClient]) -> None:
+    # The resourceVersion of the resource as read makes the replacement fail
+    # with a conflict if it changed in the meantime, instead of overwriting it.
+    read, replace = _read_and_replace_functions(manifest, session)
+    current = read()
+    body = deepcopy(manifest.body)
+    metadata = body.setdefault("metadata", {})
+    metadata["resourceVersion"] = current.metadata.resource_version
+    if manifest.kind is ResourceType.SERVICE:
+        # The cluster IP of a Service is assigned by the API server and can't
+        # be changed.
+        body.setdefault("spec", {}).setdefault("clusterIP", current.spec.cluster_ip)
+    replace(body=body)
+
+
+def _read_and_replace_functions(
+    manifest: Manifest, session: Optional[ApiClient]
+) -> Tuple[Callable, Callable]:
+    kind = manifest.kind
+    if kind not in _CREATE_FUNCTIONS:
+        raise ValueError(f"unsupported resource kind {manifest.body.get('kind')!r}")
+
+    if kind is ResourceType.NAMESPACE:
+        api = CoreV1Api(session)
+        return (
+            partial(api.read_namespace, name=manifest.name),
+            partial(api.replace_namespace, name=manifest.name),
+        )
+
+    names = {"name": manifest.name, "namespace": manifest.namespace}
+    if kind is ResourceType.DEPLOYMENT:
+        api = AppsV1Api(session)
+        return (
+            partial(api.read_namespaced_deployment, **names),
+            partial(api.replace_namespaced_deployment, **names),
+        )
+    if kind is ResourceType.SERVICE:
+        api = CoreV1Api(session)
+        return (
+            partial(api.read_namespaced_service, **names),
+            partial(api.replace_namespaced_service, **names),
+        )
+    api = NetworkingV1beta1Api(session)
+    return (
+        partial(api.read_namespaced_ingress, **names),
+        partial(api.replace_namespaced_ingress, **names),
+    )
+
+
+@tracing.traced
+def try_creating_custom_objects(
+    manifests: List[Manifest], session: Optional[ApiClient] = None
+):
+    """
+    Creates the custom objects of *manifests* whose kind is defined by a
+    namespaced CRD of the cluster, concurrently. Others are ignored.
+
+    CRDs are looked up in the CRD cache of *session*, if it has one, and
+    fetched again if a kind is missing from it.
+    """
+    resources, cached = _custom_resources(session)
+    if cached and any(m.body["kind"].lower() not in resources for m in manifests):
+        resources, _ = _custom_resources(session, refresh=True)
+
+    to_create = []
     for m in manifests:
         logging.info("Found a custom manifest: %s %r", m.body["kind"], m.name)
-        if m.body["kind"].lower() not in available_kinds:
+        resource = resources.get(m.body["kind"].lower())
+        if resource is None:
             logging.error(
                 "Unsupported custom manifest %r of kind %r is ignored. "
                 "Supported custom resource types are: %s",
                 m.name,
                 m.body["kind"],
-                available_kinds,
+                set(resources),
             )
             continue
 
         # By supporting only namespaced resources we don't have to manage
         # the cleanup - it will be handled by the deletion of the namespace.
-        matching_resources = [
-            r
-            for r in custom_resources
-            if r.spec.names.kind.lower() == m.body["kind"].lower()
-            and r.spec.scope.lower() == "namespaced"
-        ]
-        if not matching_resources:
+        if not resource.namespaced:
             logging.error(
                 "Failed to match %r to a namespaced custom resource "
                 "definition. Non-namespaced resources are not supported!",
                 m.body["kind"],
             )
             continue
+        to_create.append((m, resource.plural))
+
+    if not to_create:
+        return
+    with ThreadPoolExecutor(max_workers=len(to_create)) as pool:
+        futures = [
+            pool.submit(_create_custom_object_with_plural, m, plural, session)
+            for m, plural in to_create
+        ]
+    for f in futures:
+        f.result()
+
+
+def _custom_resources(
+    session: Optional[ApiClient], refresh: bool = False
+) -> Tuple[discovery.CustomResources, bool]:
+    """
+    Returns the custom resources of the cluster, and whether they come from
+    the CRD cache of *session*.
+    """
+    cache: Optional[discovery.CrdCache] = getattr(session, "crd_cache", None)
+    cluster = session.configuration.host if cache is not None else None
+    if cache is not None and not refresh:
+        resources = cache.get(cluster)
+        if resources is not None:
+            logging.debug("Using cached CRDs of %r.", cluster)
+            return resources, True
 
-        _create_custom_object_with_plural(
-            custom_object=m, plural=matching_resources[0].spec.names.plural
+    logging.info("Fetching CRDs available in the cluster...")
+    try:
+        crds = ApiextensionsV1beta1Api(session).list_custom_resource_definition().items
+    except ApiException as err:
+        logging.error("Failed to fetch CRDs: %s", err.reason)
+        raise
+
+    resources = discovery.index(
+        discovery.CustomResource(
+            kind=r.spec.names.kind, plural=r.spec.names.plural, scope=r.spec.scope
         )
+        for r in crds
+    )
+    if cache is not None:
+        cache.put(cluster, resources)
+    return resources, False
 
 
-def _create_custom_object_with_plural(custom_object: Manifest, plural: str):
+@tracing.traced
+def _create_custom_object_with_plural(
+    custom_object: Manifest, plural: str, session: Optional[ApiClient] = None
+):
     logging.info("Creating %s %r ", custom_object.body["kind"], custom_object.name)
     try:
         group, version = custom_object.body.get("apiVersion").rsplit("/", 1)
-        return CustomObjectsApi().create_namespaced_custom_object(
+        return CustomObjectsApi(session).create_namespaced_custom_object(
             namespace=custom_object.namespace,
             body=custom_object.body,
             group=group,
@@ -247,12 +515,37 @@ def _create_custom_object_with_plural(custom_object: Manifest, plural: str):
         raise
 
 
+@tracing.traced
+def await_no_resources_found(list_resources: Callable, **kwargs) -> None:
+    """
+    Waits until *list_resources* (called with *kwargs*) doesn't find anything.
+
+    Deletions are watched when possible, otherwise the API is polled.
+
+    :raise WaitTimeoutError: If resources are still found after
+        KUBE_API_DELETE_TIMEOUT seconds of watching.
+    :raise RetryError: If resources are still found after
+        KUBE_API_DELETE_TIMEOUT seconds of polling.
+    """
+    try:
+        watcher.wait_for(
+            list_resources, nothing_found, KUBE_API_DELETE_TIMEOUT, **kwargs
+        )
+    except watcher.WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        _poll_no_resources_found(list_resources, **kwargs)
+    except ApiException as err:
+        if err.status != STATUS_NOT_FOUND:
+            raise
+
+
 @retry(
     stop=stop_after_delay(KUBE_API_DELETE_TIMEOUT),
     wait=wait_fixed(KUBE_API_WAIT),
     retry=retry_if_exception_type(ResourceStillThereError),
+    before_sleep=tracing.count_retry,
 )
-def await_no_resources_found(list_resources: Callable, **kwargs):
+def _poll_no_resources_found(list_resources: Callable, **kwargs):
     try:
         found = list_resources(**kwargs)
     except ApiException as err:
@@ -265,28 +558,75 @@ def await_no_resources_found(list_resources: Callable, **kwargs):
         raise ResourceStillThereError(f"Resource(s): {found} still found; retrying.")
 
 
+@tracing.traced
+def wait_until_pod_ready(
+    deployment: Manifest, session: Optional[ApiClient] = None
+) -> None:
+    """
+    Waits until a pod of *deployment* is ready.
+
+    Pods are watched when possible, otherwise the API is polled.
+
+    :raise WaitTimeoutError: If no pod is ready after KUBE_API_LIST_TIMEOUT
+        seconds of watching.
+    :raise RetryError: If no pod is ready after KUBE_API_LIST_TIMEOUT seconds
+        of polling.
+    """
+    try:
+        watcher.wait_for(
+            CoreV1Api(session).list_namespaced_pod,
+            any_pod_ready,
+            KUBE_API_LIST_TIMEOUT,
+            namespace=deployment.namespace,
+            label_selector=deployment.labels,
+        )
+    except watcher.WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        _poll_until_pod_ready(deployment, session)
+
+
+def nothing_found(found: List) -> bool:
+    """
+    Returns whether *found*, a list of resources, is empty.
+    """
+    return not found
+
+
+def any_pod_ready(pods: List[V1Pod]) -> bool:
+    """
+    Returns whether any of *pods* is ready.
+    """
+    return any(is_pod_ready(p) for p in pods)
+
+
+def is_pod_ready(pod: V1Pod) -> bool:
+    """
+    Returns whether all containers of *pod* are ready.
+    """
+    statuses = pod.status.container_statuses if pod.status else None
+    return bool(statuses) and all(c.ready for c in statuses)
+
+
 @retry(
     stop=stop_after_delay(KUBE_API_LIST_TIMEOUT),
     wait=wait_fixed(KUBE_API_WAIT),
     retry=retry_if_exception_type(PodNotReadyError),
+    before_sleep=tracing.count_retry,
 )
-def wait_until_pod_ready(deployment: Manifest) -> None:
-    pod_ready = _pod_status(deployment).ready
-    if not pod_ready:
+def _poll_until_pod_ready(
+    deployment: Manifest, session: Optional[ApiClient] = None
+) -> None:
+    if not any_pod_ready(_list_pod(deployment.namespace, deployment.labels, session)):
         raise PodNotReadyError()
 
 
-@retry(stop=stop_after_delay(KUBE_API_LIST_TIMEOUT), wait=wait_fixed(KUBE_API_WAIT))
-def _pod_status(deployment: Manifest) -> V1ContainerStatus:
-    pod_list = _list_pod(deployment.namespace, deployment.labels)
-    return pod_list[0].status.container_statuses[0]
-
-
-def _list_pod(namespace: str, labels: str) -> List[V1Pod]:
+def _list_pod(
+    namespace: str, labels: str, session: Optional[ApiClient] = None
+) -> List[V1Pod]:
     logging.debug("Listing Pod(s) in Namespace %r with Labels %r...", namespace, labels)
     try:
         return (
-            CoreV1Api()
+            CoreV1Api(session)
             .list_namespaced_pod(namespace=namespace, label_selector=labels)
             .items
         )
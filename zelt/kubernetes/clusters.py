@@ -0,0 +1,92 @@
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import zelt.kubernetes.client as kube
+from zelt.kubernetes import pools
+from zelt.kubernetes.manifest_set import ManifestSet
+from zelt.kubernetes.session import DEFAULT_POOL_SIZE, Session
+
+
+class WorkerCluster(NamedTuple):
+    """
+    Kubernetes cluster running worker pods, identified by its kubeconfig
+    *context* (None for the current context).
+
+    Its *manifests* hold its own copy of the worker deployments, so that each
+    cluster can run a different number of replicas.
+    """
+
+    context: Optional[str]
+    session: Session
+    manifests: ManifestSet
+
+
+def worker_clusters(
+    ms: ManifestSet, contexts: Sequence[str], pool_size: int = DEFAULT_POOL_SIZE
+) -> List[WorkerCluster]:
+    """
+    Returns one cluster per kubeconfig context of *contexts*, each running
+    all the worker pools of *ms*.
+
+    :raise ValueError: If *contexts* contains duplicates, or if *ms* has no
+        worker deployment to fan out.
+    """
+    if len(set(contexts)) != len(contexts):
+        raise ValueError(f"Expected distinct worker contexts, got {list(contexts)}.")
+    if contexts and not ms.workers:
+        raise ValueError("Missing worker manifest to deploy in worker contexts.")
+    return [
+        WorkerCluster(
+            context=context,
+            session=kube.read_config(pool_size, context=context),
+            manifests=ms._replace(workers=copy.deepcopy(ms.workers)),
+        )
+        for context in contexts
+    ]
+
+
+def current_cluster(
+    ms: ManifestSet, pool_size: int = DEFAULT_POOL_SIZE
+) -> WorkerCluster:
+    """
+    Returns the cluster of the current kubeconfig context, running the worker
+    pools of *ms* along with the controller.
+    """
+    return WorkerCluster(
+        context=None, session=kube.read_config(pool_size), manifests=ms
+    )
+
+
+def distribute(
+    total: int, clusters: Sequence[WorkerCluster]
+) -> List[Tuple[WorkerCluster, int]]:
+    """
+    Splits *total* worker replicas evenly between *clusters*, pairing each
+    cluster with its number of replicas.
+    """
+    return list(zip(clusters, pools.split(total, [1] * len(clusters))))
+
+
+def run_in_each(
+    clusters: Sequence[WorkerCluster], operation: Callable[[WorkerCluster], None]
+) -> None:
+    """
+    Runs *operation* on all *clusters* concurrently.
+
+    All operations are run to completion before the first error, if any, is
+    raised.
+    """
+    if not clusters:
+        return
+    with ThreadPoolExecutor(max_workers=len(clusters)) as pool:
+        futures = [pool.submit(_run_in, c, operation) for c in clusters]
+    for f in futures:
+        f.result()
+
+
+def _run_in(cluster: WorkerCluster, operation: Callable[[WorkerCluster], None]) -> None:
+    if cluster.context is not None:
+        logging.info("Operating on worker context %r...", cluster.context)
+    operation(cluster)
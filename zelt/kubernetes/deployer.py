@@ -1,66 +1,513 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic, sleep
+from typing import Callable, Optional, Sequence, Tuple
+
 from tenacity import RetryError
 
 import zelt.kubernetes.client as kube
+from zelt import tracing
+from zelt.kubernetes import digest, fleet, pools, ramp
+from zelt.kubernetes.manifest import Manifest, ResourceType
 from zelt.kubernetes.manifest_set import ManifestSet
+from zelt.kubernetes.prepull import prepull_images
+from zelt.kubernetes.session import Session
 from zelt.kubernetes.storage.protocol import LocustfileStorage
+from zelt.kubernetes.taskgraph import TaskGraph
 
 
+@tracing.traced
 def create_resources(
-    ms: ManifestSet, storage: LocustfileStorage, locustfile: os.PathLike
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: Optional[Session] = None,
+    wait_ready: Optional[float] = None,
+    prepull: bool = False,
 ) -> None:
+    """
+    Creates the resources of *ms* and uploads the locustfile.
+
+    With *wait_ready*, also waits until this fraction of the worker pods are
+    ready. With *prepull*, workers are only created once their images are
+    pulled on all the nodes where they may run.
+    """
+    session = session or kube.read_config()
+
+    # Only the namespace, the locustfile and the controller's readiness are
+    # real dependencies: workers wait for the controller on their own. Pods
+    # are only created once the locustfile is stored, so that they never
+    # start with a missing or stale one.
+    graph = TaskGraph()
+    graph.add(
+        "namespace", partial(kube.create_namespace, ms.namespace, session=session)
+    )
+    graph.add("locustfile", partial(storage.upload, locustfile), ["namespace"])
+    graph.add(
+        "controller",
+        partial(kube.create_deployment, ms.controller, session=session),
+        ["namespace", "locustfile"],
+    )
+    graph.add(
+        "controller-ready",
+        partial(kube.wait_until_pod_ready, ms.controller, session=session),
+        ["controller", "locustfile"],
+    )
+    _add_workers(graph, ms, session, wait_ready, prepull)
+    graph.add(
+        "service",
+        partial(kube.create_service, ms.service, session=session),
+        ["namespace"],
+    )
+    graph.add(
+        "ingress",
+        partial(kube.create_ingress, ms.ingress, session=session),
+        ["namespace"],
+    )
+    if ms.others:
+        graph.add(
+            "custom-objects",
+            partial(kube.try_creating_custom_objects, ms.others, session=session),
+            ["namespace"],
+        )
+
     try:
-        kube.read_config()
-        kube.create_namespace(ms.namespace)
+        graph.run()
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+        return
+
+    path, total = graph.critical_path()
+    logging.info(
+        "Resources created in %.1fs; critical path: %s.", total, " -> ".join(path)
+    )
+
+
+@tracing.traced
+def create_worker_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: Optional[Session] = None,
+    wait_ready: Optional[float] = None,
+    prepull: bool = False,
+) -> None:
+    """
+    Creates the namespace and worker deployments of *ms* in a cluster other
+    than the controller's, as well as the locustfile if *storage* lives in
+    that namespace. Storage living outside of it is shared with the
+    controller's cluster, where it is uploaded.
+
+    *wait_ready* and *prepull* are handled as by :func:`create_resources`.
+    """
+    session = session or kube.read_config()
 
+    graph = TaskGraph()
+    graph.add(
+        "namespace", partial(kube.create_namespace, ms.namespace, session=session)
+    )
+    graph.add(
+        "locustfile",
+        (
+            partial(storage.upload, locustfile)
+            if storage.deleted_with_namespace
+            else partial(logging.debug, "Locustfile is shared between clusters.")
+        ),
+        ["namespace"],
+    )
+    _add_workers(graph, ms, session, wait_ready, prepull)
+
+    try:
+        graph.run()
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+
+
+@tracing.traced
+def apply_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: Optional[Session] = None,
+    wait_ready: Optional[float] = None,
+) -> None:
+    """
+    Creates the resources of *ms* that don't exist yet and updates only those
+    that changed since they were last applied, as well as the locustfile.
+    With *wait_ready*, also waits until this fraction of the worker pods are
+    ready.
+
+    Changes are detected with digests stored as annotations of the resources.
+    Deployments using the locustfile carry its digest in their pod template,
+    so that only their pods are restarted when it changes.
+    """
+    session = session or kube.read_config()
+
+    locustfile_digest = digest.file_digest(locustfile)
+    deployments = [ms.controller, *ms.workers]
+    consumers = [d for d in deployments if storage.is_used_by(d)]
+    for deployment in consumers:
+        digest.annotate_locustfile_digest(deployment, locustfile_digest)
+
+    manifests = [ms.namespace, *deployments, ms.service, ms.ingress]
+    try:
+        applied = {_key(m): kube.read_resource(m, session) for m in manifests}
+    except kube.ApiException as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+        return
+
+    changed = {
+        _key(m)
+        for m in manifests
+        if digest.annotate_digest(m) != digest.applied_digest(applied[_key(m)])
+    }
+    locustfile_changed = not consumers or any(
+        digest.applied_locustfile_digest(applied[_key(d)]) != locustfile_digest
+        for d in consumers
+    )
+    if not changed and not locustfile_changed:
+        logging.info("All resources are up to date.")
+        return
+
+    def apply(manifest: Manifest) -> Callable[[], object]:
+        if _key(manifest) in changed:
+            return partial(kube.apply_manifest, manifest, session=session)
+        return partial(logging.debug, "%r is up to date.", manifest.name)
+
+    graph = TaskGraph()
+    graph.add("namespace", apply(ms.namespace))
+    graph.add(
+        "locustfile",
+        (
+            partial(storage.upload, locustfile)
+            if locustfile_changed
+            else partial(logging.debug, "Locustfile is up to date.")
+        ),
+        ["namespace"],
+    )
+    graph.add("controller", apply(ms.controller), ["namespace", "locustfile"])
+    if _key(ms.controller) in changed:
+        graph.add(
+            "controller-ready",
+            partial(kube.wait_until_pod_ready, ms.controller, session=session),
+            ["controller"],
+        )
+    for worker in ms.workers:
+        graph.add(_worker_task(worker), apply(worker), ["namespace", "locustfile"])
+    _add_workers_ready(graph, ms, session, wait_ready)
+    graph.add("service", apply(ms.service), ["namespace"])
+    graph.add("ingress", apply(ms.ingress), ["namespace"])
+    if ms.others and applied[_key(ms.namespace)] is None:
+        # Custom objects are not tracked; they are only created along with
+        # their namespace.
+        graph.add(
+            "custom-objects",
+            partial(kube.try_creating_custom_objects, ms.others, session=session),
+            ["namespace"],
+        )
+
+    try:
+        graph.run()
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+        return
+
+    logging.info(
+        "Applied %s changed resource(s)%s.",
+        len(changed),
+        " and the locustfile" if locustfile_changed else "",
+    )
+
+
+@tracing.traced
+def update_locustfile(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: Optional[Session] = None,
+    wait: bool = False,
+) -> bool:
+    """
+    Uploads *locustfile* and restarts the pods using it, without touching the
+    other resources of *ms*. The controller is restarted first, and workers
+    only once it is rolled out, so that new workers connect to the new
+    controller. With *wait*, also waits until workers are rolled out.
+
+    Pods are restarted by storing the digest of *locustfile* in the pod
+    template of their deployment, as :func:`apply_resources` does, so that
+    pods already running this locustfile are left alone.
+
+    Returns whether the update succeeded.
+    """
+    session = session or kube.read_config()
+    locustfile_digest = digest.file_digest(locustfile)
+    try:
         storage.upload(locustfile)
+        if storage.is_used_by(ms.controller):
+            start = monotonic()
+            _annotate_locustfile_digest([ms.controller], locustfile_digest, session)
+            fleet.wait_until_rolled_out([ms.controller], session)
+            logging.info("Controller restarted in %.1fs.", monotonic() - start)
+        _restart_workers(ms, storage, locustfile_digest, session, wait)
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+        return False
+    return True
 
-        kube.create_deployment(ms.controller)
-        kube.wait_until_pod_ready(ms.controller)
 
-        if ms.worker:
-            kube.create_deployment(ms.worker)
+@tracing.traced
+def update_worker_locustfile(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile: os.PathLike,
+    session: Optional[Session] = None,
+    wait: bool = False,
+) -> bool:
+    """
+    Like :func:`update_locustfile`, for the workers of *ms* in a cluster
+    other than the controller's. The locustfile is only uploaded if *storage*
+    lives in that cluster.
+    """
+    session = session or kube.read_config()
+    locustfile_digest = digest.file_digest(locustfile)
+    try:
+        if storage.deleted_with_namespace:
+            storage.upload(locustfile)
+        _restart_workers(ms, storage, locustfile_digest, session, wait)
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+        return False
+    return True
 
-        kube.create_service(ms.service)
-        kube.create_ingress(ms.ingress)
 
-        if ms.others:
-            kube.try_creating_custom_objects(ms.others)
+def _restart_workers(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    locustfile_digest: str,
+    session: Session,
+    wait: bool,
+) -> None:
+    workers = [w for w in ms.workers if storage.is_used_by(w)]
+    if not workers:
+        return
+    _annotate_locustfile_digest(workers, locustfile_digest, session)
+    if wait:
+        elapsed = fleet.wait_until_rolled_out(workers, session)
+        logging.info("Workers restarted in %.1fs.", elapsed)
 
-    except (kube.ApiException, RetryError) as err:
-        logging.error("Kubernetes operation failed: %s", err.reason)
 
+def _annotate_locustfile_digest(
+    deployments: Sequence[Manifest], locustfile_digest: str, session: Session
+) -> None:
+    annotations = {digest.LOCUSTFILE_DIGEST_ANNOTATION: locustfile_digest}
+    with ThreadPoolExecutor(max_workers=len(deployments)) as pool:
+        futures = [
+            pool.submit(kube.annotate_pod_template, d, annotations, session)
+            for d in deployments
+        ]
+    for f in futures:
+        f.result()
+
+
+@tracing.traced
+def delete_resources(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    session: Optional[Session] = None,
+    fast: bool = False,
+    wait: bool = True,
+) -> None:
+    """
+    Deletes the resources of *ms* and the stored locustfile.
+
+    In *fast* mode, only the namespace is deleted (deleting everything it
+    contains), along with storage living outside of it. Waiting for the
+    namespace to be gone can then be skipped with *wait*.
+    """
+    if fast:
+        _delete_namespace(ms, storage, session, wait)
+        return
 
-def delete_resources(ms: ManifestSet, storage: LocustfileStorage) -> None:
     logging.info("Deleting resources...")
     try:
-        kube.read_config()
+        session = session or kube.read_config()
         namespace = ms.namespace.name
 
+        kube.delete_ingress(ms.ingress.name, namespace, session)
+        kube.delete_service(ms.service.name, namespace, session)
+        kube.delete_deployments(namespace, session)
+        # Storage mounted by the pods, like a PersistentVolumeClaim, can only
+        # be deleted once they are gone.
         storage.delete()
-        kube.delete_ingress(ms.ingress.name, namespace)
-        kube.delete_service(ms.service.name, namespace)
-        kube.delete_deployments(namespace)
-        kube.delete_namespace(namespace)
-    except (kube.ApiException, RetryError) as err:
-        logging.error("Kubernetes operation failed: %s", err.reason)
+        kube.delete_namespace(namespace, session)
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+
+
+@tracing.traced
+def delete_worker_resources(
+    ms: ManifestSet, session: Optional[Session] = None, wait: bool = True
+) -> None:
+    """
+    Deletes the resources created by :func:`create_worker_resources`, i.e.
+    the namespace of *ms* and everything it contains.
+    """
+    logging.info("Deleting Namespace %r and its workers...", ms.namespace.name)
+    try:
+        session = session or kube.read_config()
+        kube.delete_namespace(ms.namespace.name, session, wait=wait)
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+
+
+def _delete_namespace(
+    ms: ManifestSet,
+    storage: LocustfileStorage,
+    session: Optional[Session],
+    wait: bool,
+) -> None:
+    logging.info("Deleting Namespace %r and its resources...", ms.namespace.name)
+    try:
+        session = session or kube.read_config()
+        if not storage.deleted_with_namespace:
+            storage.delete()
+        kube.delete_namespace(ms.namespace.name, session, wait=wait)
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
 
 
 def update_worker_pods(ms: ManifestSet, worker_replicas: int) -> None:
-    if ms.worker is not None:
-        ms.worker.body["spec"]["replicas"] = worker_replicas
+    """
+    Distributes *worker_replicas* between the worker pools of *ms*,
+    according to their weights.
+    """
+    for worker, replicas in pools.distribute(worker_replicas, ms.workers):
+        worker.body["spec"]["replicas"] = replicas
+
 
+@tracing.traced
+def rescale_worker_deployment(
+    ms: ManifestSet,
+    replicas: int,
+    session: Optional[Session] = None,
+    wait_ready: Optional[float] = None,
+) -> Optional[int]:
+    """
+    Sets the total number of worker pods to *replicas*, distributed between
+    the worker pools according to their weights.
 
-def rescale_worker_deployment(ms: ManifestSet, replicas: int) -> None:
-    if not ms.worker:
+    With *wait_ready*, also waits until this fraction of the worker pods of
+    all pools are ready.
+
+    Returns *replicas* once the worker deployments are rescaled, even if
+    their pods don't get ready in time, or None if they couldn't be rescaled.
+    """
+    if not ms.workers:
+        logging.error(
+            "Missing worker manifest. Only worker deployments can be rescaled."
+        )
+        return None
+
+    try:
+        session = session or kube.read_config()
+        kube.rescale_deployments(pools.distribute(replicas, ms.workers), session)
+    except (kube.ApiException, RetryError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+        return None
+    if wait_ready:
+        try:
+            fleet.wait_until_ready(ms.workers, wait_ready, session)
+        except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+            logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+    return replicas
+
+
+@tracing.traced
+def ramp_worker_deployment(
+    ms: ManifestSet,
+    steps: Sequence[ramp.RampStep],
+    session: Optional[Session] = None,
+    wait_ready: Optional[float] = None,
+) -> None:
+    """
+    Rescales the worker pods through each of *steps* in turn.
+
+    Before moving on to the next step, waits until *wait_ready* (by default
+    all) of the pods of the current step are ready and until the duration of
+    the step has elapsed. The ramp stops at the first failure.
+    """
+    if not ms.workers:
         logging.error(
             "Missing worker manifest. Only worker deployments can be rescaled."
         )
         return
 
     try:
-        kube.read_config()
-        kube.rescale_deployment(ms.worker, replicas)
-    except kube.ApiException as err:
-        logging.error("Kubernetes operation failed: %s", err.reason)
+        session = session or kube.read_config()
+        for i, step in enumerate(steps, 1):
+            start = monotonic()
+            kube.rescale_deployments(
+                pools.distribute(step.replicas, ms.workers), session
+            )
+            report = fleet.wait_until_ready(ms.workers, wait_ready or 1.0, session)
+            logging.info(
+                "Ramp step %s/%s: %s/%s worker pod(s) ready, %s planned.",
+                i,
+                len(steps),
+                report.status.ready,
+                report.status.total,
+                step.replicas,
+            )
+            remaining = step.duration - (monotonic() - start)
+            if i < len(steps) and remaining > 0:
+                sleep(remaining)
+    except (kube.ApiException, RetryError, kube.WaitTimeoutError) as err:
+        logging.error("Kubernetes operation failed: %s", kube.error_reason(err))
+
+
+def _add_workers(
+    graph: TaskGraph,
+    ms: ManifestSet,
+    session: Session,
+    wait_ready: Optional[float],
+    prepull: bool,
+) -> None:
+    dependencies = ["namespace", "locustfile"]
+    if prepull and ms.workers:
+        graph.add(
+            "prepull",
+            partial(prepull_images, ms, session=session),
+            ["namespace"],
+        )
+        dependencies.append("prepull")
+    for worker in ms.workers:
+        graph.add(
+            _worker_task(worker),
+            partial(kube.create_deployment, worker, session=session),
+            dependencies,
+        )
+    _add_workers_ready(graph, ms, session, wait_ready)
+
+
+def _add_workers_ready(
+    graph: TaskGraph,
+    ms: ManifestSet,
+    session: Session,
+    wait_ready: Optional[float],
+) -> None:
+    if wait_ready and ms.workers:
+        graph.add(
+            "workers-ready",
+            partial(fleet.wait_until_ready, ms.workers, wait_ready, session),
+            [_worker_task(w) for w in ms.workers],
+        )
+
+
+def _worker_task(worker: Manifest) -> str:
+    return f"worker:{pools.pool_name(worker)}"
+
+
+def _key(manifest: Manifest) -> Tuple[ResourceType, str]:
+    return manifest.kind, manifest.name
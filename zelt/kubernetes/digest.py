@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from zelt.kubernetes import bundle
+from zelt.kubernetes.manifest import Manifest
+
+MANIFEST_DIGEST_ANNOTATION = "zelt.zalando.org/manifest-digest"
+LOCUSTFILE_DIGEST_ANNOTATION = "zelt.zalando.org/locustfile-digest"
+
+
+def file_digest(path: os.PathLike) -> str:
+    """
+    Returns the SHA-256 hex digest of the content of *path*, or of its
+    manifest if *path* is a bundle.
+    """
+    if bundle.is_bundle(path):
+        return bundle.bundle_digest(path)
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def manifest_digest(manifest: Manifest) -> str:
+    """
+    Returns the SHA-256 hex digest of *manifest*, ignoring its own digest
+    annotation.
+    """
+    body = json.loads(json.dumps(manifest.body))
+    metadata = body.get("metadata") or {}
+    annotations = metadata.get("annotations") or {}
+    annotations.pop(MANIFEST_DIGEST_ANNOTATION, None)
+    if not annotations:
+        metadata.pop("annotations", None)
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def annotate_digest(manifest: Manifest) -> str:
+    """
+    Stores the digest of *manifest* as one of its annotations and returns it.
+    """
+    digest = manifest_digest(manifest)
+    _annotations(manifest.body)[MANIFEST_DIGEST_ANNOTATION] = digest
+    return digest
+
+
+def annotate_locustfile_digest(deployment: Manifest, digest: str) -> None:
+    """
+    Stores *digest* as an annotation of the pod template of *deployment*, so
+    that changing it triggers a rollout of the deployment's pods.
+    """
+    template = deployment.body.setdefault("spec", {}).setdefault("template", {})
+    _annotations(template)[LOCUSTFILE_DIGEST_ANNOTATION] = digest
+
+
+def applied_digest(body: Optional[dict]) -> Optional[str]:
+    """
+    Returns the manifest digest stored in *body*, the serialized form of a
+    resource read from the cluster.
+    """
+    metadata = (body or {}).get("metadata") or {}
+    return (metadata.get("annotations") or {}).get(MANIFEST_DIGEST_ANNOTATION)
+
+
+def applied_locustfile_digest(body: Optional[dict]) -> Optional[str]:
+    """
+    Returns the locustfile digest stored in the pod template of *body*, the
+    serialized form of a deployment read from the cluster.
+    """
+    template = ((body or {}).get("spec") or {}).get("template") or {}
+    return ((template.get("metadata") or {}).get("annotations") or {}).get(
+        LOCUSTFILE_DIGEST_ANNOTATION
+    )
+
+
+def _annotations(body: dict) -> dict:
+    metadata = body.setdefault("metadata", {})
+    if metadata.get("annotations") is None:
+        metadata["annotations"] = {}
+    return metadata["annotations"]
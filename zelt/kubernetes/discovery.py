@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+CRD_CACHE_TTL = 3600
+
+
+class CustomResource(NamedTuple):
+    kind: str
+    plural: str
+    scope: str
+
+    @property
+    def namespaced(self) -> bool:
+        return self.scope.lower() == "namespaced"
+
+
+# Custom resources of a cluster, indexed by lower-cased kind.
+CustomResources = Dict[str, CustomResource]
+
+
+def index(resources: Iterable[CustomResource]) -> CustomResources:
+    return {r.kind.lower(): r for r in resources}
+
+
+def default_cache_directory() -> Path:
+    """
+    Returns the directory where Zelt caches CRD discovery results, following
+    the XDG base directory specification.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base, "zelt", "crds")
+
+
+class CrdCache:
+    """
+    Custom resources of Kubernetes clusters, kept in memory and, unless
+    *directory* is None, on disk for *ttl* seconds.
+
+    Only the kind, plural and scope of each CRD are kept, instead of the full
+    CRDs with their (sometimes huge) OpenAPI schemas.
+    """
+
+    def __init__(
+        self, directory: Optional[os.PathLike] = None, ttl: float = CRD_CACHE_TTL
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.ttl = ttl
+        self._memory: Dict[str, Tuple[float, CustomResources]] = {}
+        self._lock = Lock()
+
+    def get(self, cluster: str) -> Optional[CustomResources]:
+        """
+        Returns the custom resources of *cluster* if they were stored less than
+        *ttl* seconds ago, otherwise None.
+        """
+        with self._lock:
+            entry = self._memory.get(cluster)
+        if entry is None:
+            entry = self._read(cluster)
+            if entry is None:
+                return None
+            with self._lock:
+                self._memory[cluster] = entry
+        stored_at, resources = entry
+        if time() - stored_at > self.ttl:
+            return None
+        return resources
+
+    def put(self, cluster: str, resources: CustomResources) -> None:
+        entry = (time(), resources)
+        with self._lock:
+            self._memory[cluster] = entry
+        self._write(cluster, entry)
+
+    def _path(self, cluster: str) -> Path:
+        digest = hashlib.sha256(cluster.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{digest}.json"
+
+    def _read(self, cluster: str) -> Optional[Tuple[float, CustomResources]]:
+        if self.directory is None:
+            return None
+        try:
+            content = json.loads(self._path(cluster).read_text())
+            if content["cluster"] != cluster:
+                return None
+            resources = index(CustomResource(*r) for r in content["resources"])
+            return content["stored_at"], resources
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            logging.debug("Ignoring unreadable CRD cache for %r: %s", cluster, err)
+            return None
+
+    def _write(self, cluster: str, entry: Tuple[float, CustomResources]) -> None:
+        if self.directory is None:
+            return
+        stored_at, resources = entry
+        content = {
+            "cluster": cluster,
+            "stored_at": stored_at,
+            "resources": [list(r) for r in resources.values()],
+        }
+        path = self._path(cluster)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Written then renamed, so that concurrent Zelt runs never read a
+            # partially written file.
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(content))
+            os.replace(tmp, path)
+        except OSError as err:
+            logging.debug("Failed to cache CRDs of %r: %s", cluster, err)
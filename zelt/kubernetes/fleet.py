@@ -0,0 +1,193 @@
+import logging
+import math
+from time import monotonic
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from kubernetes.client import ApiClient, AppsV1Api, V1Deployment
+
+from zelt import tracing
+
+from . import watcher
+from .client import KUBE_API_LIST_TIMEOUT, KUBE_API_WAIT
+from .manifest import Manifest
+
+# Percentages of ready pods whose time of achievement is reported.
+MILESTONES = (25, 50, 75, 90, 100)
+
+
+class FleetStatus(NamedTuple):
+    ready: int
+    total: int
+
+    @property
+    def fraction(self) -> float:
+        return self.ready / self.total if self.total else 1.0
+
+
+class FleetReport(NamedTuple):
+    status: FleetStatus
+    elapsed: float
+    # Seconds it took to reach each percentage of MILESTONES that was reached.
+    milestones: Dict[int, float]
+
+
+def fleet_status(deployments: Iterable[V1Deployment]) -> FleetStatus:
+    """
+    Returns how many pods of *deployments* are ready, out of how many are
+    desired in total.
+    """
+    ready = total = 0
+    for d in deployments:
+        desired = (d.spec.replicas if d.spec else None) or 0
+        ready += min((d.status.ready_replicas if d.status else None) or 0, desired)
+        total += desired
+    return FleetStatus(ready, total)
+
+
+@tracing.traced
+def read_status(
+    deployments: Sequence[Manifest], session: Optional[ApiClient] = None
+) -> FleetStatus:
+    """
+    Returns the current status of the pods of *deployments*, all in the same
+    namespace. Deployments that don't exist count as having no pods.
+    """
+    if not deployments:
+        return FleetStatus(0, 0)
+    names = {d.name for d in deployments}
+    found = (
+        AppsV1Api(session)
+        .list_namespaced_deployment(namespace=deployments[0].namespace)
+        .items
+    )
+    return fleet_status(d for d in found if d.metadata.name in names)
+
+
+@tracing.traced
+def wait_until_ready(
+    deployments: Sequence[Manifest],
+    fraction: float,
+    session: Optional[ApiClient] = None,
+    timeout: float = KUBE_API_LIST_TIMEOUT,
+) -> FleetReport:
+    """
+    Waits until at least *fraction* of the pods desired by *deployments*, all
+    in the same namespace, are ready, logging progress along the way.
+
+    Deployments are watched when possible, otherwise the API is polled.
+
+    :raise ValueError: If *fraction* is not in ]0, 1].
+    :raise WaitTimeoutError: If the fleet is not ready enough after *timeout*
+        seconds.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"Expected a fraction in ]0, 1], got {fraction}.")
+    if not deployments:
+        return FleetReport(FleetStatus(0, 0), 0.0, {})
+
+    progress = _Progress({d.name for d in deployments}, fraction)
+    list_deployments = AppsV1Api(session).list_namespaced_deployment
+    namespace = deployments[0].namespace
+    try:
+        watcher.wait_for(list_deployments, progress, timeout, namespace=namespace)
+    except watcher.WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        watcher.poll_for(
+            list_deployments, progress, timeout, KUBE_API_WAIT, namespace=namespace
+        )
+
+    report = progress.report()
+    logging.info(
+        "%s/%s pod(s) ready in %.1fs%s.",
+        report.status.ready,
+        report.status.total,
+        report.elapsed,
+        "".join(f"; {p}% in {t:.1f}s" for p, t in report.milestones.items()),
+    )
+    return report
+
+
+def is_rolled_out(deployment: V1Deployment) -> bool:
+    """
+    Returns whether all the pods of *deployment* run its latest pod template
+    and are available, with no pod of a previous template left.
+    """
+    status = deployment.status
+    if status is None:
+        return False
+    desired = (deployment.spec.replicas if deployment.spec else None) or 0
+    updated = status.updated_replicas or 0
+    return (
+        (status.observed_generation or 0) >= (deployment.metadata.generation or 0)
+        and updated >= desired
+        and (status.replicas or 0) <= updated
+        and (status.available_replicas or 0) >= updated
+    )
+
+
+@tracing.traced
+def wait_until_rolled_out(
+    deployments: Sequence[Manifest],
+    session: Optional[ApiClient] = None,
+    timeout: float = KUBE_API_LIST_TIMEOUT,
+) -> float:
+    """
+    Waits until *deployments*, all in the same namespace, are rolled out (see
+    :func:`is_rolled_out`), and returns how many seconds it took.
+
+    Deployments are watched when possible, otherwise the API is polled.
+
+    :raise WaitTimeoutError: If they are not rolled out after *timeout*
+        seconds.
+    """
+    if not deployments:
+        return 0.0
+    names = {d.name for d in deployments}
+
+    def rolled_out(found: List[V1Deployment]) -> bool:
+        tracked = [d for d in found if d.metadata.name in names]
+        return len(tracked) == len(names) and all(is_rolled_out(d) for d in tracked)
+
+    start = monotonic()
+    list_deployments = AppsV1Api(session).list_namespaced_deployment
+    namespace = deployments[0].namespace
+    try:
+        watcher.wait_for(list_deployments, rolled_out, timeout, namespace=namespace)
+    except watcher.WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        watcher.poll_for(
+            list_deployments, rolled_out, timeout, KUBE_API_WAIT, namespace=namespace
+        )
+    return monotonic() - start
+
+
+class _Progress:
+    """
+    Condition of :func:`watcher.wait_for` recording when milestones are
+    reached by the deployments named *names*.
+    """
+
+    def __init__(self, names: Iterable[str], fraction: float) -> None:
+        self.names = set(names)
+        self.fraction = fraction
+        self.start = monotonic()
+        self.status = FleetStatus(0, 0)
+        self.milestones: Dict[int, float] = {}
+
+    def __call__(self, deployments: List[V1Deployment]) -> bool:
+        tracked = [d for d in deployments if d.metadata.name in self.names]
+        if len(tracked) < len(self.names):
+            # Deployments that don't exist yet can't count as ready.
+            return False
+        status = fleet_status(tracked)
+        if status != self.status:
+            self.status = status
+            logging.info("%s/%s pod(s) ready.", status.ready, status.total)
+        elapsed = monotonic() - self.start
+        for percent in MILESTONES:
+            if percent not in self.milestones and status.fraction * 100 >= percent:
+                self.milestones[percent] = elapsed
+        return status.ready >= math.ceil(self.fraction * status.total)
+
+    def report(self) -> FleetReport:
+        return FleetReport(self.status, monotonic() - self.start, self.milestones)
@@ -90,6 +90,16 @@ class Manifest(NamedTuple):
     def labels_dict(self) -> Dict[str, str]:
         return dict(self.body.get("metadata", {}).get("labels", {}))
 
+    @property
+    def selector(self) -> str:
+        """
+        Label selector of the pods of this deployment, defaulting to its own
+        labels.
+        """
+        selector = self.body.get("spec", {}).get("selector", {})
+        labels = selector.get("matchLabels") or self.labels_dict
+        return ",".join(f"{k}={v}" for k, v in labels.items())
+
     @property
     def role(self) -> DeploymentRole:
         role = self.labels_dict.get("role", "")
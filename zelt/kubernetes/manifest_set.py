@@ -1,7 +1,8 @@
 from collections import defaultdict
 from os import PathLike
-from typing import NamedTuple, List, Dict, Optional
+from typing import NamedTuple, List, Dict
 
+from zelt.kubernetes import pools
 from zelt.kubernetes.manifest import Manifest, ResourceType, DeploymentRole
 
 
@@ -14,7 +15,8 @@ class ManifestSet(NamedTuple):
     service: Manifest
     ingress: Manifest
     controller: Manifest
-    worker: Optional[Manifest]
+    # One deployment per pool of workers, possibly none.
+    workers: List[Manifest]
     others: List[Manifest]
 
 
@@ -64,15 +66,21 @@ def from_directory(dir_path: PathLike) -> ManifestSet:
 
     workers = [d for d in deployments if d.role is DeploymentRole.WORKER]
     if len(workers) > 1:
-        raise ValueError(
-            f"Expected at most one deployment with role {DeploymentRole.WORKER.value!r}."
-        )
+        pool_names = [d.labels_dict.get(pools.POOL_LABEL) for d in workers]
+        if not all(pool_names) or len(set(pool_names)) != len(pool_names):
+            raise ValueError(
+                "Expected deployments with role "
+                f"{DeploymentRole.WORKER.value!r} to have distinct "
+                f"{pools.POOL_LABEL!r} labels, got {pool_names}."
+            )
+    for d in workers:
+        pools.pool_weight(d)
 
     return ManifestSet(
         namespace=categories[ResourceType.NAMESPACE][0],
         service=categories[ResourceType.SERVICE][0],
         ingress=categories[ResourceType.INGRESS][0],
         controller=controllers[0],
-        worker=workers[0] if workers else None,
+        workers=workers,
         others=categories[ResourceType.OTHER],
     )
@@ -0,0 +1,98 @@
+import logging
+import re
+import statistics
+from typing import List, Optional
+
+from kubernetes.client import ApiClient, CustomObjectsApi
+from kubernetes.client.rest import ApiException
+
+from zelt import tracing
+from .client import STATUS_NOT_FOUND
+from .manifest import Manifest
+
+METRICS_GROUP = "metrics.k8s.io"
+METRICS_VERSION = "v1beta1"
+
+# Multipliers of the suffixes of CPU quantities, in cores.
+_CPU_SUFFIXES = {"": 1.0, "m": 1e-3, "u": 1e-6, "n": 1e-9}
+_CPU_QUANTITY = re.compile(r"^\s*([0-9.]+)\s*([mun]?)\s*$")
+
+
+def parse_cpu(quantity) -> float:
+    """
+    Returns the number of CPU cores of Kubernetes *quantity*, e.g. "250m".
+
+    :raise ValueError: If *quantity* is not a CPU quantity.
+    """
+    match = _CPU_QUANTITY.match(str(quantity))
+    try:
+        return float(match.group(1)) * _CPU_SUFFIXES[match.group(2)]
+    except (AttributeError, ValueError):
+        raise ValueError(f"invalid CPU quantity {quantity!r}") from None
+
+
+def cpu_request(deployment: Manifest) -> Optional[float]:
+    """
+    Returns the CPU cores requested by each pod of *deployment*, or None if
+    one of its containers has no CPU request.
+    """
+    template = deployment.body.get("spec", {}).get("template", {})
+    containers = template.get("spec", {}).get("containers") or []
+    requests = [
+        ((c.get("resources") or {}).get("requests") or {}).get("cpu")
+        for c in containers
+    ]
+    if not requests or None in requests:
+        return None
+    return sum(parse_cpu(r) for r in requests)
+
+
+@tracing.traced
+def cpu_usage(deployment: Manifest, session: Optional[ApiClient] = None) -> List[float]:
+    """
+    Returns the CPU cores currently used by each pod of *deployment*, as
+    reported by the metrics API.
+    """
+    try:
+        found = CustomObjectsApi(session).list_namespaced_custom_object(
+            group=METRICS_GROUP,
+            version=METRICS_VERSION,
+            namespace=deployment.namespace,
+            plural="pods",
+            label_selector=deployment.selector,
+        )
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            logging.error(
+                "The %s API is not available; is metrics-server installed?",
+                METRICS_GROUP,
+            )
+        else:
+            logging.error("Failed to read metrics of Pod(s): %s", err.reason)
+        raise
+    return [
+        sum(parse_cpu(c["usage"]["cpu"]) for c in pod.get("containers") or [])
+        for pod in found.get("items") or []
+    ]
+
+
+def median_utilisation(
+    workers: List[Manifest], session: Optional[ApiClient] = None
+) -> Optional[float]:
+    """
+    Returns the median CPU utilisation of the pods of *workers*, relative to
+    the CPU requested by their deployment, or None without any measurement.
+
+    Deployments without a CPU request are ignored.
+    """
+    utilisations = []
+    for worker in workers:
+        request = cpu_request(worker)
+        if not request:
+            logging.warning(
+                "Ignoring Deployment %r without CPU request for all containers.",
+                worker.name,
+            )
+            continue
+        utilisations.extend(u / request for u in cpu_usage(worker, session))
+    return statistics.median(utilisations) if utilisations else None
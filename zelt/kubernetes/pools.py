@@ -0,0 +1,62 @@
+import math
+from typing import List, Sequence, Tuple
+
+from zelt.kubernetes.manifest import Manifest
+
+# Label distinguishing the worker deployments of a ManifestSet.
+POOL_LABEL = "pool"
+# Annotation of worker deployments giving their share of the total number of
+# workers, relative to the other pools. Pools without it have weight 1.
+POOL_WEIGHT_ANNOTATION = "zelt.zalando.org/pool-weight"
+
+
+def pool_name(deployment: Manifest) -> str:
+    """
+    Returns the pool of worker *deployment*, defaulting to its name.
+    """
+    return deployment.labels_dict.get(POOL_LABEL) or deployment.name
+
+
+def pool_weight(deployment: Manifest) -> float:
+    """
+    Returns the weight of the pool of worker *deployment*.
+
+    :raise ValueError: If the weight annotation is not a positive number.
+    """
+    annotations = deployment.body.get("metadata", {}).get("annotations") or {}
+    raw = annotations.get(POOL_WEIGHT_ANNOTATION, 1)
+    try:
+        weight = float(raw)
+    except (TypeError, ValueError):
+        weight = math.nan
+    if not weight > 0 or math.isinf(weight):
+        raise ValueError(
+            f"expected a positive number as {POOL_WEIGHT_ANNOTATION!r} "
+            f"annotation of {deployment.name!r}, got {raw!r}"
+        )
+    return weight
+
+
+def distribute(total: int, workers: Sequence[Manifest]) -> List[Tuple[Manifest, int]]:
+    """
+    Splits *total* replicas between the pools of *workers* proportionally to
+    their weights, pairing each deployment with its number of replicas.
+    """
+    return list(zip(workers, split(total, [pool_weight(w) for w in workers])))
+
+
+def split(total: int, weights: Sequence[float]) -> List[int]:
+    """
+    Splits *total* into integers proportional to *weights*.
+
+    Units left over by rounding down go to the largest remainders, earlier
+    weights first in case of a tie.
+    """
+    if not weights:
+        return []
+    exact = [total * w / sum(weights) for w in weights]
+    shares = [math.floor(e) for e in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: shares[i] - exact[i])
+    for i in by_remainder[: total - sum(shares)]:
+        shares[i] += 1
+    return shares
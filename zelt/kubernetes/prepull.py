@@ -0,0 +1,215 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import List, Optional, Sequence
+
+from kubernetes.client import (
+    ApiClient,
+    AppsV1Api,
+    CoreV1Api,
+    V1ContainerStatus,
+    V1DaemonSet,
+    V1Pod,
+)
+from kubernetes.client.rest import ApiException
+
+from zelt import tracing
+from . import watcher
+from .client import (
+    DEFAULT_DELETE_OPTIONS,
+    KUBE_API_LIST_TIMEOUT,
+    KUBE_API_WAIT,
+    STATUS_NOT_FOUND,
+)
+from .manifest import Manifest
+from .manifest_set import ManifestSet
+
+PREPULL_LABEL = "zelt.zalando.org/prepull"
+# Pod spec fields deciding on which nodes pods run, copied from the worker
+# pod templates so that images are pulled on the nodes workers will use.
+PLACEMENT_FIELDS = ("nodeSelector", "affinity", "tolerations")
+# Reasons for which a container whose image was pulled doesn't run, e.g.
+# because the image has no shell to run the sleeping command (distroless or
+# scratch images).
+COMMAND_FAILED_REASONS = frozenset(
+    {"CrashLoopBackOff", "CreateContainerError", "RunContainerError", "StartError"}
+)
+
+
+def images(deployments: Sequence[Manifest]) -> List[str]:
+    """
+    Returns the distinct images of the containers and init containers of
+    *deployments*, in order of appearance.
+    """
+    found = {}
+    for d in deployments:
+        spec = _pod_spec(d)
+        for c in (spec.get("initContainers") or []) + (spec.get("containers") or []):
+            if c.get("image"):
+                found[c["image"]] = None
+    return list(found)
+
+
+def daemonset_body(target: Manifest, pulled: Sequence[str]) -> dict:
+    """
+    Returns a DaemonSet running one container per image of *pulled* on each
+    node where the pods of deployment *target* may run.
+
+    Containers only sleep: what matters is that their images get pulled. In
+    images without a shell, they fail to start once the image is pulled.
+    """
+    name = f"zelt-prepull-{target.name}"
+    labels = {PREPULL_LABEL: name}
+    spec = {
+        "containers": [
+            {
+                "name": f"image-{i}",
+                "image": image,
+                "command": ["sh", "-c", "sleep 3600"],
+                "resources": {
+                    "requests": {"cpu": "1m", "memory": "8Mi"},
+                    "limits": {"memory": "32Mi"},
+                },
+            }
+            for i, image in enumerate(pulled)
+        ],
+        "terminationGracePeriodSeconds": 0,
+    }
+    target_spec = _pod_spec(target)
+    for field in PLACEMENT_FIELDS:
+        if field in target_spec:
+            spec[field] = target_spec[field]
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "DaemonSet",
+        "metadata": {"name": name, "namespace": target.namespace, "labels": labels},
+        "spec": {
+            "selector": {"matchLabels": labels},
+            "template": {"metadata": {"labels": labels}, "spec": spec},
+        },
+    }
+
+
+def is_pulled(pod: V1Pod) -> bool:
+    """
+    Returns whether the images of all containers of *pod* have been pulled,
+    whether or not their command could run.
+    """
+    statuses = pod.status.container_statuses if pod.status else None
+    return bool(statuses) and all(_image_pulled(s) for s in statuses)
+
+
+def _image_pulled(status: V1ContainerStatus) -> bool:
+    if status.image_id:
+        return True
+    for state in (status.state, status.last_state):
+        if state is None:
+            continue
+        if state.terminated is not None:
+            return True
+        if state.waiting is not None and state.waiting.reason in COMMAND_FAILED_REASONS:
+            return True
+    return False
+
+
+@tracing.traced
+def prepull_images(
+    ms: ManifestSet,
+    session: Optional[ApiClient] = None,
+    timeout: float = KUBE_API_LIST_TIMEOUT,
+) -> None:
+    """
+    Pulls the images of the controller and workers of *ms* on all the nodes
+    where workers may run, with one short-lived DaemonSet per worker pool.
+    DaemonSets are deleted afterwards, even when pulling failed.
+
+    Not all images being pulled after *timeout* seconds only warrants a
+    warning, since pods will pull missing images themselves.
+    """
+    pulled = images([ms.controller, *ms.workers])
+    targets = ms.workers or [ms.controller]
+    logging.info(
+        "Pre-pulling %s image(s) on the nodes of %s pool(s)...",
+        len(pulled),
+        len(targets),
+    )
+    start = monotonic()
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        futures = [
+            pool.submit(_prepull_with, daemonset_body(t, pulled), session, timeout)
+            for t in targets
+        ]
+    for f in futures:
+        f.result()
+    logging.info("Images pre-pulled in %.1fs.", monotonic() - start)
+
+
+@tracing.traced
+def _prepull_with(body: dict, session: Optional[ApiClient], timeout: float) -> None:
+    name = body["metadata"]["name"]
+    namespace = body["metadata"]["namespace"]
+    logging.info("Creating DaemonSet %r...", name)
+    try:
+        AppsV1Api(session).create_namespaced_daemon_set(namespace=namespace, body=body)
+    except ApiException as err:
+        logging.error("Failed to create DaemonSet %r: %s", name, err.reason)
+        raise
+    try:
+        _wait_until_pulled(name, namespace, session, timeout)
+    except watcher.WaitTimeoutError:
+        logging.warning(
+            "Images not pulled on all nodes by DaemonSet %r after %ss.", name, timeout
+        )
+    finally:
+        _delete_daemonset(name, namespace, session)
+
+
+def _wait_until_pulled(
+    name: str, namespace: str, session: Optional[ApiClient], timeout: float
+) -> None:
+    deadline = monotonic() + timeout
+    daemonsets = watcher.wait_or_poll_for(
+        AppsV1Api(session).list_namespaced_daemon_set,
+        _scheduled,
+        timeout,
+        KUBE_API_WAIT,
+        namespace=namespace,
+        field_selector=f"metadata.name={name}",
+    )
+    nodes = daemonsets[0].status.desired_number_scheduled or 0
+    logging.debug("DaemonSet %r pulls images on %s node(s).", name, nodes)
+    watcher.wait_or_poll_for(
+        CoreV1Api(session).list_namespaced_pod,
+        lambda pods: len(pods) >= nodes and all(is_pulled(p) for p in pods),
+        max(deadline - monotonic(), 0),
+        KUBE_API_WAIT,
+        namespace=namespace,
+        label_selector=f"{PREPULL_LABEL}={name}",
+    )
+
+
+def _scheduled(daemonsets: List[V1DaemonSet]) -> bool:
+    # The DaemonSet controller has computed the nodes to run on once it has
+    # observed the DaemonSet.
+    return bool(daemonsets) and all(
+        d.status is not None
+        and (d.status.observed_generation or 0) >= (d.metadata.generation or 1)
+        for d in daemonsets
+    )
+
+
+def _delete_daemonset(name: str, namespace: str, session: Optional[ApiClient]):
+    logging.info("Deleting DaemonSet %r...", name)
+    try:
+        AppsV1Api(session).delete_namespaced_daemon_set(
+            name=name, namespace=namespace, body=DEFAULT_DELETE_OPTIONS
+        )
+    except ApiException as err:
+        if err.status == STATUS_NOT_FOUND:
+            return
+        logging.error("Failed to delete DaemonSet %r: %s", name, err.reason)
+        raise
+
+
+def _pod_spec(deployment: Manifest) -> dict:
+    return deployment.body.get("spec", {}).get("template", {}).get("spec", {}) or {}
@@ -0,0 +1,93 @@
+import os
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+import yaml
+
+# Seconds per time unit accepted in ramp rates.
+_UNITS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600}
+_RATE = re.compile(r"^\s*(\d+)\s*/\s*([a-z]+)\s*$")
+
+
+class RampStep(NamedTuple):
+    # Total number of worker pods of the step.
+    replicas: int
+    # Minimum number of seconds between the start of the step and the next.
+    duration: float
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    Parses *rate*, e.g. "10/min", into a number of worker pods and the number
+    of seconds over which to add (or remove) them.
+
+    :raise ValueError: If *rate* is not a positive number of pods per time
+        unit among s, sec, m, min, h and hour.
+    """
+    match = _RATE.match(rate.lower())
+    if not match or match.group(2) not in _UNITS or int(match.group(1)) < 1:
+        raise ValueError(
+            f"Expected a ramp rate like '10/min' with a unit in {list(_UNITS)}, "
+            f"got {rate!r}."
+        )
+    return int(match.group(1)), float(_UNITS[match.group(2)])
+
+
+def steps_at_rate(start: int, target: int, rate: str) -> List[RampStep]:
+    """
+    Returns the steps going from *start* to *target* worker pods at *rate*.
+    """
+    pods, seconds = parse_rate(rate)
+    steps = []
+    replicas = start
+    while replicas != target:
+        if target > replicas:
+            replicas = min(replicas + pods, target)
+        else:
+            replicas = max(replicas - pods, target)
+        steps.append(RampStep(replicas, seconds))
+    return steps
+
+
+def steps_from_file(path: os.PathLike, target: int) -> List[RampStep]:
+    """
+    Reads a YAML schedule from *path*: a list of steps, each with a number of
+    ``workers`` and an optional ``duration`` in seconds, e.g.::
+
+        - workers: 10
+          duration: 60
+        - workers: 50
+          duration: 120
+
+    A final step reaching *target* worker pods is added if the schedule ends
+    elsewhere.
+
+    :raise ValueError: If *path* doesn't contain such a list of steps.
+    """
+    try:
+        schedule = yaml.safe_load(Path(path).read_text())
+    except (OSError, yaml.YAMLError) as err:
+        raise ValueError(f"Can't read ramp schedule from {path}: {err}") from err
+    if not isinstance(schedule, list):
+        raise ValueError(f"Expected a list of ramp steps in {path}.")
+
+    steps = []
+    for i, entry in enumerate(schedule):
+        try:
+            step = RampStep(int(entry["workers"]), float(entry.get("duration", 0)))
+        except (TypeError, KeyError, ValueError) as err:
+            raise ValueError(
+                f"Expected 'workers' and an optional 'duration' in ramp step "
+                f"#{i + 1} of {path}, got {entry!r}."
+            ) from err
+        if step.replicas < 0 or step.duration < 0:
+            raise ValueError(
+                f"Expected non-negative values in ramp step #{i + 1} of {path}, "
+                f"got {entry!r}."
+            )
+        steps.append(step)
+
+    if not steps or steps[-1].replicas != target:
+        steps.append(RampStep(target, 0.0))
+    return steps
@@ -0,0 +1,39 @@
+from kubernetes.client import ApiClient, Configuration
+
+from zelt import tracing
+from . import throttle
+from .discovery import CrdCache, default_cache_directory
+
+DEFAULT_POOL_SIZE = 16
+
+
+class Session(ApiClient):
+    """
+    Kubernetes API client shared by all the API calls of a Zelt run.
+
+    Its urllib3 connection pool keeps up to *pool_size* connections alive
+    between calls, so that the kubeconfig is parsed and TLS handshakes happen
+    once per run instead of once per call.
+
+    The CRDs of the cluster are discovered through its *crd_cache*.
+
+    Calls are rate-limited and retried on transient failures by the throttle
+    shared by all sessions (see :mod:`zelt.kubernetes.throttle`).
+    """
+
+    def __init__(
+        self, configuration: Configuration, pool_size: int = DEFAULT_POOL_SIZE
+    ) -> None:
+        if pool_size < 1:
+            raise ValueError(f"Expected a positive pool size, got {pool_size}.")
+        configuration.connection_pool_maxsize = pool_size
+        super().__init__(configuration)
+        self.pool_size = pool_size
+        self.crd_cache = CrdCache(default_cache_directory())
+
+    def request(self, method, *args, **kwargs):
+        def send():
+            tracing.count_api_call()
+            return super(Session, self).request(method, *args, **kwargs)
+
+        return throttle.call(method, send)
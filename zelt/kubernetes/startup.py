@@ -0,0 +1,178 @@
+import json
+import logging
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from kubernetes.client import ApiClient, CoreV1Api, V1Event, V1Pod
+from kubernetes.client.rest import ApiException
+
+from zelt import tracing
+from .manifest import Manifest
+
+# Phases of the startup of a pod, in the order in which they happen. Each
+# phase ends at the milestone of the same name: init containers run before
+# the images of the other containers are pulled.
+PHASES = ("scheduled", "initialized", "pulled", "ready")
+_CONDITIONS = {
+    "scheduled": "PodScheduled",
+    "initialized": "Initialized",
+    "ready": "Ready",
+}
+
+
+class PodStartup(NamedTuple):
+    name: str
+    created: datetime
+    # Time at which each milestone of PHASES was reached, if it was.
+    milestones: Dict[str, datetime]
+
+    def phases(self) -> Dict[str, float]:
+        """
+        Returns the duration in seconds of each phase whose milestone was
+        reached, counted from the previous milestone reached.
+        """
+        durations = {}
+        previous = self.created
+        for phase in PHASES:
+            end = self.milestones.get(phase)
+            if end is None:
+                continue
+            durations[phase] = max((end - previous).total_seconds(), 0.0)
+            previous = max(previous, end)
+        return durations
+
+
+class PhaseStats(NamedTuple):
+    count: int
+    p50: float
+    p95: float
+    max: float
+
+
+def pod_startup(pod: V1Pod, pulled: Optional[datetime] = None) -> PodStartup:
+    """
+    Returns the startup milestones of *pod*, read from its conditions, with
+    *pulled* as time at which its last image was pulled.
+    """
+    conditions = {
+        c.type: c.last_transition_time
+        for c in (pod.status.conditions if pod.status else None) or []
+        if c.status == "True" and c.last_transition_time
+    }
+    milestones = {
+        phase: conditions[condition]
+        for phase, condition in _CONDITIONS.items()
+        if condition in conditions
+    }
+    if pulled is not None:
+        milestones["pulled"] = pulled
+    return PodStartup(pod.metadata.name, pod.metadata.creation_timestamp, milestones)
+
+
+@tracing.traced
+def collect(
+    deployments: Sequence[Manifest], session: Optional[ApiClient] = None
+) -> List[PodStartup]:
+    """
+    Returns the startup milestones of the pods of *deployments*, all in the
+    same namespace, from their conditions and "Pulled" events.
+
+    Events are only kept by Kubernetes for a while (one hour by default), so
+    pull times are missing for older pods.
+    """
+    if not deployments:
+        return []
+    namespace = deployments[0].namespace
+    api = CoreV1Api(session)
+    try:
+        pods = [
+            p
+            for d in deployments
+            for p in api.list_namespaced_pod(
+                namespace=namespace, label_selector=d.selector
+            ).items
+        ]
+        events = api.list_namespaced_event(
+            namespace=namespace, field_selector="involvedObject.kind=Pod,reason=Pulled"
+        ).items
+    except ApiException as err:
+        logging.error(
+            "Failed to list Pods and Events in Namespace %r: %s", namespace, err.reason
+        )
+        raise
+    pulled = _last_pulls(events)
+    return [pod_startup(p, pulled.get(p.metadata.name)) for p in pods]
+
+
+def summarise(startups: Iterable[PodStartup]) -> Dict[str, PhaseStats]:
+    """
+    Returns statistics about the duration of each phase over *startups*.
+    """
+    durations: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    for s in startups:
+        for phase, duration in s.phases().items():
+            durations[phase].append(duration)
+    return {
+        phase: PhaseStats(
+            count=len(values),
+            p50=_percentile(values, 50),
+            p95=_percentile(values, 95),
+            max=max(values),
+        )
+        for phase, values in durations.items()
+        if values
+    }
+
+
+def format_report(startups: Sequence[PodStartup]) -> str:
+    """
+    Returns a table of the statistics of each startup phase of *startups*.
+    """
+    stats = summarise(startups)
+    lines = [f"{'phase':<12}{'pods':>6}{'p50':>9}{'p95':>9}{'max':>9}"]
+    for phase, s in stats.items():
+        lines.append(
+            f"{phase:<12}{s.count:>6}{s.p50:>8.1f}s{s.p95:>8.1f}s{s.max:>8.1f}s"
+        )
+    ready = sum(1 for s in startups if "ready" in s.milestones)
+    lines.append(f"{ready}/{len(startups)} pod(s) ready.")
+    return "\n".join(lines)
+
+
+def write_json(startups: Sequence[PodStartup], path: os.PathLike) -> None:
+    """
+    Writes the statistics of each startup phase of *startups* to *path* in
+    JSON, along with the milestones of each pod.
+    """
+    report = {
+        "phases": {p: s._asdict() for p, s in summarise(startups).items()},
+        "pods": [
+            {
+                "name": s.name,
+                "created": s.created.isoformat(),
+                "milestones": {k: v.isoformat() for k, v in s.milestones.items()},
+                "phases": s.phases(),
+            }
+            for s in startups
+        ],
+    }
+    Path(path).write_text(json.dumps(report, indent=2))
+
+
+def _last_pulls(events: Iterable[V1Event]) -> Dict[str, datetime]:
+    pulls: Dict[str, datetime] = {}
+    for e in events:
+        at = e.last_timestamp or e.event_time or e.first_timestamp
+        name = e.involved_object.name
+        if at is not None and (name not in pulls or at > pulls[name]):
+            pulls[name] = at
+    return pulls
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    # Nearest-rank method: a value that was actually observed.
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
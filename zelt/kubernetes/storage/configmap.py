@@ -1,52 +1,170 @@
+import base64
+import gzip
+import io
 import logging
 import os
 from pathlib import Path
+from typing import Optional
 
-from kubernetes.client import V1ConfigMap, CoreV1Api, V1DeleteOptions
+from kubernetes.client import ApiClient, V1ConfigMap, CoreV1Api, V1DeleteOptions
 from kubernetes.client.rest import ApiException
 
 import zelt.kubernetes.client as client
-from zelt.kubernetes.storage.protocol import LocustfileStorage
+from zelt import tracing
+from zelt.kubernetes import bundle, digest
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.storage.protocol import LocustfileStorage, StorageOptions
 
 CONFIGMAP_NAME = "zelt-locustfile"
 CONFIGMAP_KEY = "locustfile.py"
+# Key of the gzipped locustfile in the binary data of compressed ConfigMaps.
+GZIP_CONFIGMAP_KEY = "locustfile.py.gz"
+ENCODING_ANNOTATION = "zelt.zalando.org/locustfile-encoding"
+GZIP_ENCODING = "gzip"
+# Key of the gzipped tarball of bundles in the binary data of ConfigMaps.
+BUNDLE_CONFIGMAP_KEY = "bundle.tar.gz"
+BUNDLE_ENCODING = "tar+gzip"
+# Asks the API server for the metadata of a resource only, or for the whole
+# resource from servers older than Kubernetes 1.15, which don't support it.
+# Annotations are under "metadata" in both cases.
+PARTIAL_METADATA = (
+    "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,application/json"
+)
 
 
 class ConfigmapStorage(LocustfileStorage):
-    def __init__(self, namespace: str, labels: dict) -> None:
+    deleted_with_namespace = True
+
+    def __init__(
+        self,
+        namespace: str,
+        labels: dict,
+        session: Optional[ApiClient] = None,
+        compress: bool = False,
+    ) -> None:
         super().__init__()
         self.namespace = namespace
         self.labels = dict(labels)
+        self.session = session
+        # Whether the locustfile is stored gzipped, as binary data.
+        self.compress = compress
 
+    @tracing.traced
     def upload(self, locustfile: os.PathLike) -> None:
-        logging.info("Creating ConfigMap %r...", CONFIGMAP_NAME)
+        encoding = self._encoding(locustfile)
+        if encoding == BUNDLE_ENCODING:
+            bundle.check(locustfile)
+        locustfile_digest = digest.file_digest(locustfile)
+        stored = self.stored_digest(locustfile)
+        if stored == locustfile_digest:
+            logging.info(
+                "ConfigMap %r already holds this locustfile; skipped uploading "
+                "%s bytes.",
+                CONFIGMAP_NAME,
+                bundle.size(locustfile),
+            )
+            return
+
+        annotations = {digest.LOCUSTFILE_DIGEST_ANNOTATION: locustfile_digest}
+        if encoding is not None:
+            annotations[ENCODING_ANNOTATION] = encoding
         config_map = V1ConfigMap(
-            data={CONFIGMAP_KEY: Path(locustfile).read_text()},
-            metadata={"name": CONFIGMAP_NAME, "labels": self.labels},
+            metadata={
+                "name": CONFIGMAP_NAME,
+                "labels": self.labels,
+                "annotations": annotations,
+            }
         )
+        if encoding == BUNDLE_ENCODING:
+            config_map.binary_data = {
+                BUNDLE_CONFIGMAP_KEY: _base64(bundle.pack(locustfile))
+            }
+        elif encoding == GZIP_ENCODING:
+            config_map.binary_data = {
+                GZIP_CONFIGMAP_KEY: _gzip(Path(locustfile).read_bytes())
+            }
+        else:
+            config_map.data = {CONFIGMAP_KEY: Path(locustfile).read_text()}
+        if stored is not None:
+            self._replace(config_map)
+            return
+        logging.info("Creating ConfigMap %r...", CONFIGMAP_NAME)
         try:
             logging.debug("Creating ConfigMap %r...", CONFIGMAP_NAME)
-            CoreV1Api().create_namespaced_config_map(
+            CoreV1Api(self.session).create_namespaced_config_map(
                 namespace=self.namespace, body=config_map
             )
             logging.debug("ConfigMap %r created.", CONFIGMAP_NAME)
         except ApiException as err:
+            if err.status == client.STATUS_CONFLICT:
+                self._replace(config_map)
+                return
             logging.error(
                 "Failed to create ConfigMap %r: %s", CONFIGMAP_NAME, err.reason
             )
             raise
 
+    def stored_digest(self, locustfile: Optional[os.PathLike] = None) -> Optional[str]:
+        """
+        Returns the digest of the locustfile stored in the ConfigMap, "" if
+        the ConfigMap has no digest or stores it in another encoding than
+        this storage would use for *locustfile* (a single file by default),
+        or None if it doesn't exist.
+
+        Only the metadata of the ConfigMap is read, not the locustfile.
+        """
+        try:
+            found = CoreV1Api(self.session).api_client.call_api(
+                "/api/v1/namespaces/{namespace}/configmaps/{name}",
+                "GET",
+                path_params={"namespace": self.namespace, "name": CONFIGMAP_NAME},
+                header_params={"Accept": PARTIAL_METADATA},
+                response_type="object",
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+            )
+        except ApiException as err:
+            if err.status == client.STATUS_NOT_FOUND:
+                return None
+            logging.error("Failed to read ConfigMap %r: %s", CONFIGMAP_NAME, err.reason)
+            raise
+        annotations = (found.get("metadata") or {}).get("annotations") or {}
+        if annotations.get(ENCODING_ANNOTATION) != self._encoding(locustfile):
+            return ""
+        return annotations.get(digest.LOCUSTFILE_DIGEST_ANNOTATION, "")
+
+    def _encoding(self, locustfile: Optional[os.PathLike]) -> Optional[str]:
+        if locustfile is not None and bundle.is_bundle(locustfile):
+            return BUNDLE_ENCODING
+        return GZIP_ENCODING if self.compress else None
+
+    def _replace(self, config_map: V1ConfigMap) -> None:
+        try:
+            logging.info("Replacing ConfigMap %r...", CONFIGMAP_NAME)
+            CoreV1Api(self.session).replace_namespaced_config_map(
+                name=CONFIGMAP_NAME, namespace=self.namespace, body=config_map
+            )
+            logging.debug("ConfigMap %r replaced.", CONFIGMAP_NAME)
+        except ApiException as err:
+            logging.error(
+                "Failed to replace ConfigMap %r: %s", CONFIGMAP_NAME, err.reason
+            )
+            raise
+
+    @tracing.traced
     def delete(self) -> None:
         try:
             logging.info("Deleting ConfigMap %r...", CONFIGMAP_NAME)
-            CoreV1Api().delete_namespaced_config_map(
+            CoreV1Api(self.session).delete_namespaced_config_map(
                 name=CONFIGMAP_NAME,
                 namespace=self.namespace,
                 body=V1DeleteOptions(propagation_policy="Foreground"),
             )
             logging.debug("Waiting for ConfigMap %r to be deleted...", CONFIGMAP_NAME)
             client.await_no_resources_found(
-                CoreV1Api().list_namespaced_config_map, namespace=self.namespace
+                CoreV1Api(self.session).list_namespaced_config_map,
+                namespace=self.namespace,
+                field_selector=f"metadata.name={CONFIGMAP_NAME}",
             )
             logging.debug("ConfigMap %r deleted.", CONFIGMAP_NAME)
         except ApiException as err:
@@ -59,3 +177,62 @@ class ConfigmapStorage(LocustfileStorage):
                 "Failed to delete ConfigMap %r: %s", CONFIGMAP_NAME, err.reason
             )
             raise
+
+    def is_used_by(self, deployment: Manifest) -> bool:
+        volumes = (
+            deployment.body.get("spec", {})
+            .get("template", {})
+            .get("spec", {})
+            .get("volumes", [])
+        )
+        return any(
+            (v.get("configMap") or {}).get("name") == CONFIGMAP_NAME for v in volumes
+        )
+
+
+def gzip_bytes(content: bytes) -> bytes:
+    """
+    Returns *content* gzipped with a fixed modification time, so that the
+    output is identical for identical content.
+    """
+    # gzip.compress only accepts an mtime from Python 3.8.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        compressed.write(content)
+    return buffer.getvalue()
+
+
+def _gzip(content: bytes) -> str:
+    """
+    Returns *content* gzipped and base64-encoded, as the API expects binary
+    data. The compressed size is logged.
+    """
+    compressed = gzip_bytes(content)
+    logging.info(
+        "Locustfile compressed from %s to %s bytes (%.1fx).",
+        len(content),
+        len(compressed),
+        len(content) / max(len(compressed), 1),
+    )
+    return _base64(compressed)
+
+
+def _base64(content: bytes) -> str:
+    return base64.b64encode(content).decode("ascii")
+
+
+def build(options: StorageOptions) -> ConfigmapStorage:
+    return ConfigmapStorage(
+        namespace=options.manifests.namespace.name,
+        labels=options.manifests.namespace.labels_dict,
+        session=options.session,
+    )
+
+
+def build_compressed(options: StorageOptions) -> ConfigmapStorage:
+    return ConfigmapStorage(
+        namespace=options.manifests.namespace.name,
+        labels=options.manifests.namespace.labels_dict,
+        session=options.session,
+        compress=True,
+    )
@@ -0,0 +1,73 @@
+import logging
+import threading
+from time import monotonic
+from typing import Callable
+
+from zelt import tracing
+
+# Upload progress is logged every PROGRESS_PERCENT percent, or at least every
+# PROGRESS_INTERVAL seconds for slow uploads.
+PROGRESS_PERCENT = 10
+PROGRESS_INTERVAL = 5.0
+
+
+class UploadProgress:
+    """
+    Callback of uploads adding up the bytes transferred, possibly by several
+    threads, and logging the progress of the upload of *total* bytes to
+    *target* every *percent* percent or *interval* seconds, rather than on
+    every part.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        total: int,
+        percent: float = PROGRESS_PERCENT,
+        interval: float = PROGRESS_INTERVAL,
+        clock: Callable = monotonic,
+    ) -> None:
+        self.target = target
+        self.total = total
+        self.percent = percent
+        self.interval = interval
+        self.transferred = 0
+        self._clock = clock
+        self._started = clock()
+        self._logged_at = self._started
+        self._logged_percent = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, nb_bytes: int) -> None:
+        with self._lock:
+            self.transferred += nb_bytes
+            now = self._clock()
+            percent = 100 * self.transferred / max(self.total, 1)
+            if (
+                percent - self._logged_percent < self.percent
+                and now - self._logged_at < self.interval
+            ):
+                return
+            self._logged_percent = percent
+            self._logged_at = now
+        logging.info(
+            "Uploading to %s: %s/%s bytes (%.0f%%).",
+            self.target,
+            self.transferred,
+            self.total,
+            min(percent, 100.0),
+        )
+
+    def done(self) -> None:
+        """
+        Logs the throughput of the upload and records it for the summary.
+        """
+        elapsed = max(self._clock() - self._started, 1e-6)
+        logging.info(
+            "Uploaded %s bytes to %s in %.1fs (%.1f MiB/s).",
+            self.transferred,
+            self.target,
+            elapsed,
+            self.transferred / 2**20 / elapsed,
+        )
+        tracing.count_transferred(self.transferred)
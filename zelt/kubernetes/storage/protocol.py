@@ -1,9 +1,46 @@
 import os
+from typing import NamedTuple, Optional
+
+from kubernetes.client import ApiClient
+
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.manifest_set import ManifestSet
+
+
+class StorageOptions(NamedTuple):
+    """
+    What storage backends are built from: the manifests of the deployment
+    and the command-line options related to storage.
+    """
+
+    manifests: ManifestSet
+    session: Optional[ApiClient] = None
+    s3_bucket: Optional[str] = None
+    s3_key: Optional[str] = None
 
 
 class LocustfileStorage:
+    # Whether the stored locustfile lives in the deployment's namespace and is
+    # therefore deleted along with it.
+    deleted_with_namespace = False
+
     def upload(self, locustfile: os.PathLike) -> None:
         raise NotImplementedError()
 
     def delete(self) -> None:
         raise NotImplementedError()
+
+    def stored_digest(self) -> Optional[str]:
+        """
+        Returns the SHA-256 hex digest of the stored locustfile, so that
+        uploading the same content again can be skipped, or None if unknown.
+        """
+        return None
+
+    def is_used_by(self, deployment: Manifest) -> bool:
+        """
+        Returns whether the pods of *deployment* read the stored locustfile.
+
+        Storages that can't tell assume that all deployments use it.
+        """
+        return True
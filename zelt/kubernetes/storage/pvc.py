@@ -0,0 +1,415 @@
+import base64
+import logging
+import os
+from typing import List, Optional, Sequence
+
+from kubernetes.client import ApiClient, BatchV1Api, CoreV1Api, V1Job, V1Pod
+from kubernetes.client.rest import ApiException
+from kubernetes.stream import stream
+
+import zelt.kubernetes.client as client
+from zelt import tracing
+from zelt.kubernetes import bundle, digest, throttle, watcher
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.storage.progress import UploadProgress
+from zelt.kubernetes.storage.protocol import LocustfileStorage, StorageOptions
+
+CLAIM_NAME = "zelt-locustfile"
+LOADER_NAME = "zelt-locustfile-loader"
+LOADER_IMAGE = "busybox"
+DEFAULT_SIZE = "1Gi"
+# Pods only read the volume, but the loader writes it from a single pod.
+ACCESS_MODES = ("ReadOnlyMany", "ReadWriteOnce")
+# The websocket of the attach API only carries text: the tarball is sent
+# base64-encoded, in frames of STREAM_CHUNK_SIZE characters.
+STREAM_CHUNK_SIZE = 64 * 1024
+# Empties the volume, extracts the tarball read from stdin into it and checks
+# the digests of the extracted files, so that a truncated stream fails the Job.
+LOADER_SCRIPT = (
+    "rm -rf /data/* /data/.[!.]* && "
+    "base64 -d | tar -xzf - -C /data && "
+    f"cd /data && sha256sum -c -s {bundle.MANIFEST_NAME}"
+)
+
+
+class LoaderFailedError(RuntimeError):
+    pass
+
+
+class ClaimInUseError(RuntimeError):
+    pass
+
+
+class PvcStorage(LocustfileStorage):
+    """
+    Stores the locustfile, or a bundle with its data files, in a
+    PersistentVolumeClaim mounted read-only by all pods, so that large data is
+    copied once per test instead of once per pod.
+
+    The claim named *claim_name* is created with *size* and *storage_class*
+    in the namespace of the deployment, and deleted along with it. A loader
+    Job then mounts it, and the locustfile is streamed to it as a tarball
+    through the attach API.
+
+    The content of a claim mounted by pods isn't replaced under them: the
+    loader couldn't even mount a ReadWriteOnce volume used on other nodes.
+    """
+
+    deleted_with_namespace = True
+
+    def __init__(
+        self,
+        namespace: str,
+        labels: dict,
+        session: Optional[ApiClient] = None,
+        claim_name: str = CLAIM_NAME,
+        size: str = DEFAULT_SIZE,
+        storage_class: Optional[str] = None,
+        access_modes: Sequence[str] = ACCESS_MODES,
+        timeout: float = client.KUBE_API_LIST_TIMEOUT,
+    ) -> None:
+        super().__init__()
+        self.namespace = namespace
+        self.labels = dict(labels)
+        self.session = session
+        self.claim_name = claim_name
+        self.size = size
+        self.storage_class = storage_class
+        self.access_modes = list(access_modes)
+        self.timeout = timeout
+
+    @tracing.traced
+    def upload(self, locustfile: os.PathLike) -> None:
+        if bundle.is_bundle(locustfile):
+            bundle.check(locustfile)
+        locustfile_digest = digest.file_digest(locustfile)
+        stored = self.stored_digest()
+        if stored == locustfile_digest:
+            logging.info(
+                "PersistentVolumeClaim %r already holds this locustfile; skipped "
+                "uploading %s bytes.",
+                self.claim_name,
+                bundle.size(locustfile),
+            )
+            return
+        if stored is None:
+            self._create_claim()
+        else:
+            self._check_unused()
+
+        self._delete_loader()
+        self._create_loader()
+        try:
+            pod = self._wait_until_loader_runs()
+            self._stream(pod, bundle.pack(locustfile))
+            self._wait_until_loaded()
+        finally:
+            self._delete_loader()
+        self._annotate_claim(locustfile_digest)
+
+    def stored_digest(self) -> Optional[str]:
+        """
+        Returns the digest of the locustfile loaded in the claim, "" if none
+        was loaded, or None if the claim doesn't exist.
+        """
+        try:
+            claim = CoreV1Api(self.session).read_namespaced_persistent_volume_claim(
+                name=self.claim_name, namespace=self.namespace
+            )
+        except ApiException as err:
+            if err.status == client.STATUS_NOT_FOUND:
+                return None
+            logging.error(
+                "Failed to read PersistentVolumeClaim %r: %s",
+                self.claim_name,
+                err.reason,
+            )
+            raise
+        annotations = claim.metadata.annotations or {}
+        return annotations.get(digest.LOCUSTFILE_DIGEST_ANNOTATION, "")
+
+    @tracing.traced
+    def delete(self) -> None:
+        self._delete_loader()
+        api = CoreV1Api(self.session)
+        try:
+            logging.info("Deleting PersistentVolumeClaim %r...", self.claim_name)
+            api.delete_namespaced_persistent_volume_claim(
+                name=self.claim_name, namespace=self.namespace
+            )
+            client.await_no_resources_found(
+                api.list_namespaced_persistent_volume_claim,
+                namespace=self.namespace,
+                field_selector=f"metadata.name={self.claim_name}",
+            )
+        except ApiException as err:
+            if err.status == client.STATUS_NOT_FOUND:
+                logging.debug(
+                    "Skipping PersistentVolumeClaim %r deletion: %s",
+                    self.claim_name,
+                    err.reason,
+                )
+                return
+            logging.error(
+                "Failed to delete PersistentVolumeClaim %r: %s",
+                self.claim_name,
+                err.reason,
+            )
+            raise
+
+    def is_used_by(self, deployment: Manifest) -> bool:
+        volumes = (
+            deployment.body.get("spec", {})
+            .get("template", {})
+            .get("spec", {})
+            .get("volumes", [])
+        )
+        return any(
+            (v.get("persistentVolumeClaim") or {}).get("claimName") == self.claim_name
+            for v in volumes
+        )
+
+    def claim_body(self) -> dict:
+        spec = {
+            "accessModes": self.access_modes,
+            "resources": {"requests": {"storage": self.size}},
+        }
+        if self.storage_class is not None:
+            spec["storageClassName"] = self.storage_class
+        return {
+            "apiVersion": "v1",
+            "kind": "PersistentVolumeClaim",
+            "metadata": {
+                "name": self.claim_name,
+                "labels": self.labels,
+            },
+            "spec": spec,
+        }
+
+    def loader_body(self) -> dict:
+        """
+        Returns a Job running a single pod that reads a tarball on its stdin
+        and extracts it into the claim.
+        """
+        return {
+            "apiVersion": "batch/v1",
+            "kind": "Job",
+            "metadata": {"name": LOADER_NAME, "labels": self.labels},
+            "spec": {
+                "backoffLimit": 0,
+                "template": {
+                    "metadata": {"labels": self.labels},
+                    "spec": {
+                        "restartPolicy": "Never",
+                        "containers": [
+                            {
+                                "name": "loader",
+                                "image": LOADER_IMAGE,
+                                "command": ["sh", "-c", LOADER_SCRIPT],
+                                # Stdin is closed once the tarball is sent.
+                                "stdin": True,
+                                "stdinOnce": True,
+                                "volumeMounts": [
+                                    {"name": "data", "mountPath": "/data"}
+                                ],
+                            }
+                        ],
+                        "volumes": [
+                            {
+                                "name": "data",
+                                "persistentVolumeClaim": {"claimName": self.claim_name},
+                            }
+                        ],
+                    },
+                },
+            },
+        }
+
+    def _check_unused(self) -> None:
+        """
+        :raise ClaimInUseError: If pods other than the loader's mount the
+            claim.
+        """
+        try:
+            pods = (
+                CoreV1Api(self.session)
+                .list_namespaced_pod(namespace=self.namespace)
+                .items
+            )
+        except ApiException as err:
+            logging.error("Failed to list Pods: %s", err.reason)
+            raise
+        users = sorted(
+            p.metadata.name
+            for p in pods
+            if (p.metadata.labels or {}).get("job-name") != LOADER_NAME
+            and not (p.status and p.status.phase in ("Failed", "Succeeded"))
+            and any(
+                v.persistent_volume_claim
+                and v.persistent_volume_claim.claim_name == self.claim_name
+                for v in (p.spec.volumes if p.spec else None) or []
+            )
+        )
+        if users:
+            raise ClaimInUseError(
+                f"PersistentVolumeClaim {self.claim_name!r} holds another "
+                f"locustfile but is mounted by Pod(s) {', '.join(users)}; "
+                "redeploy with --clean to change it."
+            )
+
+    def _create_claim(self) -> None:
+        logging.info("Creating PersistentVolumeClaim %r...", self.claim_name)
+        try:
+            CoreV1Api(self.session).create_namespaced_persistent_volume_claim(
+                namespace=self.namespace, body=self.claim_body()
+            )
+        except ApiException as err:
+            if err.status == client.STATUS_CONFLICT:
+                return
+            logging.error(
+                "Failed to create PersistentVolumeClaim %r: %s",
+                self.claim_name,
+                err.reason,
+            )
+            raise
+
+    def _create_loader(self) -> None:
+        logging.info("Creating Job %r...", LOADER_NAME)
+        try:
+            BatchV1Api(self.session).create_namespaced_job(
+                namespace=self.namespace, body=self.loader_body()
+            )
+        except ApiException as err:
+            logging.error("Failed to create Job %r: %s", LOADER_NAME, err.reason)
+            raise
+
+    def _wait_until_loader_runs(self) -> V1Pod:
+        logging.info("Waiting for the pod of Job %r to run...", LOADER_NAME)
+        pods = watcher.wait_or_poll_for(
+            CoreV1Api(self.session).list_namespaced_pod,
+            _running,
+            self.timeout,
+            client.KUBE_API_WAIT,
+            namespace=self.namespace,
+            label_selector=f"job-name={LOADER_NAME}",
+        )
+        return next(p for p in pods if p.status and p.status.phase == "Running")
+
+    def _stream(self, pod: V1Pod, content: bytes) -> None:
+        """
+        Writes *content* to the stdin of the loader *pod*, then detaches,
+        which closes its stdin.
+        """
+        encoded = base64.b64encode(content).decode("ascii")
+        progress = UploadProgress(
+            f"PersistentVolumeClaim {self.claim_name!r}", len(encoded)
+        )
+        attached = throttle.call("GET", lambda: self._attach(pod))
+        try:
+            for i in range(0, len(encoded), STREAM_CHUNK_SIZE):
+                chunk = encoded[i : i + STREAM_CHUNK_SIZE]
+                attached.write_stdin(chunk)
+                progress(len(chunk))
+        finally:
+            attached.close()
+        progress.done()
+
+    def _attach(self, pod: V1Pod):
+        # stream() swaps the request method of the API client for the time of
+        # the call: a dedicated client keeps the shared session usable by
+        # other threads meanwhile.
+        configuration = self.session.configuration if self.session else None
+        tracing.count_api_call()
+        return stream(
+            CoreV1Api(ApiClient(configuration)).connect_get_namespaced_pod_attach,
+            name=pod.metadata.name,
+            namespace=self.namespace,
+            container="loader",
+            stdin=True,
+            stdout=False,
+            stderr=False,
+            tty=False,
+            _preload_content=False,
+        )
+
+    def _wait_until_loaded(self) -> None:
+        jobs = watcher.wait_or_poll_for(
+            BatchV1Api(self.session).list_namespaced_job,
+            _finished,
+            self.timeout,
+            client.KUBE_API_WAIT,
+            namespace=self.namespace,
+            field_selector=f"metadata.name={LOADER_NAME}",
+        )
+        if not jobs[0].status.succeeded:
+            raise LoaderFailedError(
+                f"Job {LOADER_NAME!r} failed to load PersistentVolumeClaim "
+                f"{self.claim_name!r}; see the logs of its pod."
+            )
+        logging.info("PersistentVolumeClaim %r loaded.", self.claim_name)
+
+    def _annotate_claim(self, locustfile_digest: str) -> None:
+        try:
+            CoreV1Api(self.session).patch_namespaced_persistent_volume_claim(
+                name=self.claim_name,
+                namespace=self.namespace,
+                body={
+                    "metadata": {
+                        "annotations": {
+                            digest.LOCUSTFILE_DIGEST_ANNOTATION: locustfile_digest
+                        }
+                    }
+                },
+            )
+        except ApiException as err:
+            logging.error(
+                "Failed to annotate PersistentVolumeClaim %r: %s",
+                self.claim_name,
+                err.reason,
+            )
+            raise
+
+    def _delete_loader(self) -> None:
+        api = BatchV1Api(self.session)
+        try:
+            api.delete_namespaced_job(
+                name=LOADER_NAME,
+                namespace=self.namespace,
+                body=client.DEFAULT_DELETE_OPTIONS,
+            )
+        except ApiException as err:
+            if err.status == client.STATUS_NOT_FOUND:
+                return
+            logging.error("Failed to delete Job %r: %s", LOADER_NAME, err.reason)
+            raise
+        # The claim may only be mountable by one writer at a time: wait for the
+        # loader's pod to be gone.
+        logging.debug("Waiting for Job %r to be deleted...", LOADER_NAME)
+        client.await_no_resources_found(
+            api.list_namespaced_job,
+            namespace=self.namespace,
+            field_selector=f"metadata.name={LOADER_NAME}",
+        )
+
+
+def _running(pods: List[V1Pod]) -> bool:
+    for p in pods:
+        phase = p.status.phase if p.status else None
+        if phase in ("Failed", "Succeeded"):
+            raise LoaderFailedError(
+                f"Pod {p.metadata.name!r} of Job {LOADER_NAME!r} ended before "
+                "receiving the locustfile."
+            )
+    return any(p.status and p.status.phase == "Running" for p in pods)
+
+
+def _finished(jobs: List[V1Job]) -> bool:
+    return bool(jobs) and bool(jobs[0].status.succeeded or jobs[0].status.failed)
+
+
+def build(options: StorageOptions) -> PvcStorage:
+    return PvcStorage(
+        namespace=options.manifests.namespace.name,
+        labels=options.manifests.namespace.labels_dict,
+        session=options.session,
+    )
@@ -0,0 +1,83 @@
+import importlib
+import logging
+from typing import Callable, Dict, List
+
+from zelt.kubernetes.storage.protocol import LocustfileStorage, StorageOptions
+
+# Entry point group under which other packages register storage backends: a
+# function returning a LocustfileStorage from StorageOptions, by name.
+ENTRY_POINT_GROUP = "zelt.storage"
+# Built-in backends, as "module:function", only imported when selected so
+# that e.g. boto3 is only imported for S3 storage.
+BUILTIN_BACKENDS = {
+    "configmap": "zelt.kubernetes.storage.configmap:build",
+    "configmap-gzip": "zelt.kubernetes.storage.configmap:build_compressed",
+    "configmap-sharded": "zelt.kubernetes.storage.sharded:build",
+    "pvc": "zelt.kubernetes.storage.pvc:build",
+    "s3": "zelt.kubernetes.storage.s3:build",
+}
+ALIASES = {
+    "cm": "configmap",
+    "cm-gzip": "configmap-gzip",
+    "cm-sharded": "configmap-sharded",
+    "persistentvolumeclaim": "pvc",
+}
+
+StorageFactory = Callable[[StorageOptions], LocustfileStorage]
+
+_entry_points = None
+
+
+def canonical_name(name: str) -> str:
+    """
+    Returns the name under which backend *name* (case-insensitive, possibly
+    an alias) is registered.
+
+    :raise ValueError: If no backend is registered under *name*.
+    """
+    name = ALIASES.get(name.lower(), name.lower())
+    if name not in BUILTIN_BACKENDS and name not in entry_points():
+        raise ValueError(f"unknown storage backend {name!r}")
+    return name
+
+
+def load(name: str) -> StorageFactory:
+    """
+    Imports backend *name* and returns its factory. Built-in backends take
+    precedence over those registered by other packages.
+
+    :raise ValueError: If no backend is registered under *name*.
+    """
+    name = canonical_name(name)
+    if name in BUILTIN_BACKENDS:
+        module, _, function = BUILTIN_BACKENDS[name].partition(":")
+        return getattr(importlib.import_module(module), function)
+    logging.debug("Loading storage backend %r from entry point...", name)
+    return entry_points()[name].load()
+
+
+def names() -> List[str]:
+    """
+    Returns the names of all available backends, built-in ones first.
+    """
+    return list(BUILTIN_BACKENDS) + sorted(
+        n for n in entry_points() if n not in BUILTIN_BACKENDS
+    )
+
+
+def entry_points() -> Dict[str, object]:
+    """
+    Returns the entry points of the backends registered by installed
+    packages, by lowercase name. They are only looked up once.
+    """
+    global _entry_points
+    if _entry_points is None:
+        # Scanning installed packages is slow, and unnecessary for built-in
+        # backends.
+        import pkg_resources
+
+        _entry_points = {
+            ep.name.lower(): ep
+            for ep in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)
+        }
+    return _entry_points
@@ -1,8 +1,13 @@
+import io
 import logging
 import os
+from pathlib import Path
+from typing import Optional
 
 try:
     import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
 except ImportError as err:
     raise ImportError(
         "boto3 not found. It is required for uploading to S3 with the "
@@ -10,29 +15,107 @@ except ImportError as err:
         "It can be installed with 'pip install boto3'."
     ) from err
 
-from zelt.kubernetes.storage.protocol import LocustfileStorage
+from zelt import tracing
+from zelt.kubernetes import bundle, digest
+from zelt.kubernetes.storage.progress import UploadProgress
+from zelt.kubernetes.storage.protocol import LocustfileStorage, StorageOptions
+
+# User metadata of the S3 object holding the digest of the locustfile.
+DIGEST_METADATA = "locustfile-digest"
+# Large locustfiles and bundles are uploaded in parts of MULTIPART_CHUNK_SIZE
+# bytes, MAX_CONCURRENCY at a time.
+MULTIPART_THRESHOLD = 8 * 2**20
+MULTIPART_CHUNK_SIZE = 8 * 2**20
+MAX_CONCURRENCY = 16
 
 
 class S3Storage(LocustfileStorage):
-    def __init__(self, bucket: str, key: str) -> None:
+    def __init__(
+        self, bucket: str, key: str, max_concurrency: int = MAX_CONCURRENCY
+    ) -> None:
         super().__init__()
         self.bucket = bucket
         self.key = key
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNK_SIZE,
+            max_concurrency=max_concurrency,
+        )
+        self._object = None
 
+    @property
+    def object(self):
+        """
+        S3 object holding the locustfile, created on first use and then reused
+        so that all calls share the same HTTP connections.
+        """
+        if self._object is None:
+            self._object = boto3.resource("s3").Object(self.bucket, self.key)
+        return self._object
+
+    @tracing.traced
     def upload(self, locustfile: os.PathLike) -> None:
-        def _upload_callback(nb_bytes_transferred: int) -> None:
+        if bundle.is_bundle(locustfile):
+            bundle.check(locustfile)
+        locustfile_digest = digest.file_digest(locustfile)
+        if self.stored_digest() == locustfile_digest:
             logging.info(
-                "Uploading %s to %s as %s: %s bytes transferred.",
-                locustfile,
-                self.bucket,
+                "%s in %s already holds this locustfile; skipped uploading "
+                "%s bytes.",
                 self.key,
-                nb_bytes_transferred,
+                self.bucket,
+                bundle.size(locustfile),
             )
+            return
+        extra_args = {"Metadata": {DIGEST_METADATA: locustfile_digest}}
 
-        boto3.resource("s3").Object(self.bucket, self.key).upload_file(
-            Filename=os.fspath(locustfile), Callback=_upload_callback
-        )
+        if bundle.is_bundle(locustfile):
+            # Pods download a single object: bundles are stored as a gzipped
+            # tarball, to be extracted by them.
+            content = bundle.pack(locustfile)
+            progress = UploadProgress(f"{self.bucket}/{self.key}", len(content))
+            self.object.upload_fileobj(
+                io.BytesIO(content),
+                ExtraArgs=extra_args,
+                Callback=progress,
+                Config=self.transfer_config,
+            )
+        else:
+            progress = UploadProgress(
+                f"{self.bucket}/{self.key}", Path(locustfile).stat().st_size
+            )
+            self.object.upload_file(
+                Filename=os.fspath(locustfile),
+                ExtraArgs=extra_args,
+                Callback=progress,
+                Config=self.transfer_config,
+            )
+        progress.done()
+
+    def stored_digest(self) -> Optional[str]:
+        """
+        Returns the digest stored in the metadata of the S3 object, "" if it
+        has none, or None if the object doesn't exist.
+        """
+        try:
+            # Only the headers of the object are fetched, not its content.
+            self.object.load()
+        except ClientError as err:
+            if err.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        return (self.object.metadata or {}).get(DIGEST_METADATA, "")
 
+    @tracing.traced
     def delete(self) -> None:
         logging.info("Deleting %s from S3 bucket %s...", self.key, self.bucket)
-        boto3.resource("s3").Object(self.bucket, self.key).delete()
+        self.object.delete()
+
+
+def build(options: StorageOptions) -> S3Storage:
+    if not (options.s3_bucket and options.s3_key):
+        raise ValueError(
+            "Missing required 's3-bucket' and/or 's3-key' options "
+            "for 'storage=s3' option."
+        )
+    return S3Storage(bucket=options.s3_bucket, key=options.s3_key)
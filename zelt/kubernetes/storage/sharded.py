@@ -0,0 +1,335 @@
+import base64
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+from kubernetes.client import ApiClient, CoreV1Api, V1ConfigMap
+from kubernetes.client.rest import ApiException
+
+import zelt.kubernetes.client as client
+from zelt import tracing
+from zelt.kubernetes import bundle, digest
+from zelt.kubernetes.manifest import Manifest
+from zelt.kubernetes.session import DEFAULT_POOL_SIZE
+from zelt.kubernetes.storage.configmap import (
+    CONFIGMAP_NAME,
+    PARTIAL_METADATA,
+    gzip_bytes,
+)
+from zelt.kubernetes.storage.protocol import LocustfileStorage, StorageOptions
+
+# Label of all the ConfigMaps of a sharded locustfile, index included.
+SHARDED_LABEL = "zelt.zalando.org/locustfile-shards"
+CHUNK_DIGEST_ANNOTATION = "zelt.zalando.org/chunk-digest"
+# Keys of the index ConfigMap: the chunk digests in the format of
+# ``sha256sum -c``, and the digest of the reassembled locustfile.
+CHUNKS_KEY = "chunks.sha256"
+LOCUSTFILE_DIGEST_KEY = "locustfile.sha256"
+CHUNK_KEY_PREFIX = "locustfile.py.gz.part-"
+PARTIAL_METADATA_LIST = PARTIAL_METADATA.replace(
+    "PartialObjectMetadata", "PartialObjectMetadataList"
+)
+# Size of the compressed chunks, which grows by a third once base64-encoded
+# by the API: ConfigMaps are limited to 1 MiB.
+DEFAULT_CHUNK_SIZE = 512 * 1024
+
+
+class ShardedConfigmapStorage(LocustfileStorage):
+    """
+    Stores the locustfile gzipped and split into chunks of *chunk_size*
+    bytes, one per ConfigMap named ``zelt-locustfile-<i>``, along with an
+    index ConfigMap named ``zelt-locustfile`` listing the digest of each
+    chunk.
+
+    Chunks are uploaded concurrently, and the index last, so that an index
+    always describes complete chunks. Pods project all these ConfigMaps into
+    one directory, check the chunks against the index and reassemble them:
+    uploading fails if one of *deployments* using the index doesn't project
+    all the chunks.
+    """
+
+    deleted_with_namespace = True
+
+    def __init__(
+        self,
+        namespace: str,
+        labels: dict,
+        session: Optional[ApiClient] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        deployments: Sequence[Manifest] = (),
+    ) -> None:
+        super().__init__()
+        if chunk_size < 1:
+            raise ValueError(f"Expected a positive chunk size, got {chunk_size}.")
+        self.namespace = namespace
+        self.labels = {**labels, SHARDED_LABEL: CONFIGMAP_NAME}
+        self.session = session
+        self.chunk_size = chunk_size
+        self.deployments = list(deployments)
+
+    @tracing.traced
+    def upload(self, locustfile: os.PathLike) -> None:
+        if bundle.is_bundle(locustfile):
+            raise ValueError(
+                f"Bundles are not supported by sharded ConfigMaps: {locustfile}."
+            )
+        content = gzip_bytes(Path(locustfile).read_bytes())
+        chunks = [
+            content[i : i + self.chunk_size]
+            for i in range(0, len(content), self.chunk_size)
+        ] or [b""]
+        self._check_projected(len(chunks))
+
+        locustfile_digest = digest.file_digest(locustfile)
+        if self.stored_digest() == locustfile_digest:
+            logging.info(
+                "ConfigMaps %r already hold this locustfile; skipped uploading "
+                "%s bytes.",
+                CONFIGMAP_NAME,
+                Path(locustfile).stat().st_size,
+            )
+            return
+
+        logging.info(
+            "Uploading locustfile as %s compressed chunk(s) of %s bytes in total...",
+            len(chunks),
+            len(content),
+        )
+        # No more concurrent uploads than connections kept open to the API.
+        pool_size = getattr(self.session, "pool_size", DEFAULT_POOL_SIZE)
+        with ThreadPoolExecutor(max_workers=min(len(chunks), pool_size)) as pool:
+            futures = [
+                pool.submit(self._put, self._chunk_config_map(i, chunk))
+                for i, chunk in enumerate(chunks)
+            ]
+        for f in futures:
+            f.result()
+
+        self._put(self._index_config_map(chunks, locustfile_digest))
+        self._delete_stale_chunks(len(chunks))
+
+    def stored_digest(self) -> Optional[str]:
+        """
+        Returns the digest of the locustfile described by the index
+        ConfigMap, "" if one of its chunks is missing or doesn't match its
+        digest, or None if there is no index.
+
+        Only the metadata of the chunks is read.
+        """
+        try:
+            index = CoreV1Api(self.session).read_namespaced_config_map(
+                name=CONFIGMAP_NAME, namespace=self.namespace
+            )
+            annotations = self._chunk_annotations()
+        except ApiException as err:
+            if err.status == client.STATUS_NOT_FOUND:
+                return None
+            logging.error(
+                "Failed to read ConfigMaps %r: %s", CONFIGMAP_NAME, err.reason
+            )
+            raise
+
+        data = index.data or {}
+        expected = parse_chunk_digests(data.get(CHUNKS_KEY, ""))
+        complete = bool(expected) and all(
+            annotations.get(chunk_name(i), {}).get(CHUNK_DIGEST_ANNOTATION) == sha
+            for i, sha in expected.items()
+        )
+        if not complete:
+            logging.warning(
+                "Chunks of ConfigMap %r don't match its index; the last upload "
+                "was partial.",
+                CONFIGMAP_NAME,
+            )
+            return ""
+        return data.get(LOCUSTFILE_DIGEST_KEY, "")
+
+    @tracing.traced
+    def delete(self) -> None:
+        logging.info("Deleting ConfigMaps %r...", CONFIGMAP_NAME)
+        api = CoreV1Api(self.session)
+        selector = f"{SHARDED_LABEL}={CONFIGMAP_NAME}"
+        try:
+            api.delete_collection_namespaced_config_map(
+                namespace=self.namespace, label_selector=selector
+            )
+            client.await_no_resources_found(
+                api.list_namespaced_config_map,
+                namespace=self.namespace,
+                label_selector=selector,
+            )
+        except ApiException as err:
+            if err.status == client.STATUS_NOT_FOUND:
+                logging.debug(
+                    "Skipping ConfigMaps %r deletion: %s", CONFIGMAP_NAME, err.reason
+                )
+                return
+            logging.error(
+                "Failed to delete ConfigMaps %r: %s", CONFIGMAP_NAME, err.reason
+            )
+            raise
+
+    def is_used_by(self, deployment: Manifest) -> bool:
+        return CONFIGMAP_NAME in projected_config_maps(deployment)
+
+    def _check_projected(self, count: int) -> None:
+        """
+        :raise ValueError: If a deployment using the index doesn't project
+            one of the first *count* chunks, which its pods would miss.
+        """
+        for deployment in self.deployments:
+            projected = projected_config_maps(deployment)
+            if CONFIGMAP_NAME not in projected:
+                continue
+            missing = [
+                chunk_name(i) for i in range(count) if chunk_name(i) not in projected
+            ]
+            if missing:
+                raise ValueError(
+                    f"The locustfile spans {count} ConfigMap(s), but Deployment "
+                    f"{deployment.name!r} doesn't project {', '.join(missing)}: "
+                    "add them to its projected volume."
+                )
+
+    def _chunk_config_map(self, i: int, chunk: bytes) -> V1ConfigMap:
+        return V1ConfigMap(
+            binary_data={chunk_key(i): base64.b64encode(chunk).decode("ascii")},
+            metadata={
+                "name": chunk_name(i),
+                "labels": self.labels,
+                "annotations": {
+                    CHUNK_DIGEST_ANNOTATION: hashlib.sha256(chunk).hexdigest()
+                },
+            },
+        )
+
+    def _index_config_map(
+        self, chunks: List[bytes], locustfile_digest: str
+    ) -> V1ConfigMap:
+        chunk_digests = "".join(
+            f"{hashlib.sha256(chunk).hexdigest()}  {chunk_key(i)}\n"
+            for i, chunk in enumerate(chunks)
+        )
+        return V1ConfigMap(
+            data={
+                CHUNKS_KEY: chunk_digests,
+                LOCUSTFILE_DIGEST_KEY: locustfile_digest,
+            },
+            metadata={
+                "name": CONFIGMAP_NAME,
+                "labels": self.labels,
+                "annotations": {digest.LOCUSTFILE_DIGEST_ANNOTATION: locustfile_digest},
+            },
+        )
+
+    @tracing.traced
+    def _put(self, config_map: V1ConfigMap) -> None:
+        name = config_map.metadata["name"]
+        api = CoreV1Api(self.session)
+        try:
+            logging.debug("Creating ConfigMap %r...", name)
+            api.create_namespaced_config_map(namespace=self.namespace, body=config_map)
+            return
+        except ApiException as err:
+            if err.status != client.STATUS_CONFLICT:
+                logging.error("Failed to create ConfigMap %r: %s", name, err.reason)
+                raise
+        try:
+            logging.debug("Replacing existing ConfigMap %r...", name)
+            api.replace_namespaced_config_map(
+                name=name, namespace=self.namespace, body=config_map
+            )
+        except ApiException as err:
+            logging.error("Failed to replace ConfigMap %r: %s", name, err.reason)
+            raise
+
+    def _chunk_annotations(self) -> Dict[str, dict]:
+        """
+        Returns the annotations of each ConfigMap of the locustfile, by name,
+        without reading their data.
+        """
+        found = CoreV1Api(self.session).api_client.call_api(
+            "/api/v1/namespaces/{namespace}/configmaps",
+            "GET",
+            path_params={"namespace": self.namespace},
+            query_params=[("labelSelector", f"{SHARDED_LABEL}={CONFIGMAP_NAME}")],
+            header_params={"Accept": PARTIAL_METADATA_LIST},
+            response_type="object",
+            auth_settings=["BearerToken"],
+            _return_http_data_only=True,
+        )
+        return {
+            item["metadata"]["name"]: item["metadata"].get("annotations") or {}
+            for item in found.get("items") or []
+        }
+
+    def _delete_stale_chunks(self, count: int) -> None:
+        """
+        Deletes the chunks left over by a previous, longer locustfile.
+        """
+        current = {chunk_name(i) for i in range(count)} | {CONFIGMAP_NAME}
+        for name in self._chunk_annotations():
+            if name in current:
+                continue
+            logging.debug("Deleting stale ConfigMap %r...", name)
+            try:
+                CoreV1Api(self.session).delete_namespaced_config_map(
+                    name=name, namespace=self.namespace
+                )
+            except ApiException as err:
+                if err.status != client.STATUS_NOT_FOUND:
+                    logging.error("Failed to delete ConfigMap %r: %s", name, err.reason)
+                    raise
+
+
+def projected_config_maps(deployment: Manifest) -> Set[str]:
+    """
+    Returns the names of the ConfigMaps projected into the volumes of the
+    pods of *deployment*.
+    """
+    volumes = (
+        deployment.body.get("spec", {})
+        .get("template", {})
+        .get("spec", {})
+        .get("volumes", [])
+    )
+    return {
+        (s.get("configMap") or {}).get("name")
+        for v in volumes
+        for s in ((v.get("projected") or {}).get("sources") or [])
+        if s.get("configMap")
+    }
+
+
+def chunk_name(i: int) -> str:
+    return f"{CONFIGMAP_NAME}-{i}"
+
+
+def chunk_key(i: int) -> str:
+    # Zero-padded so that chunks reassemble in order when sorted by name.
+    return f"{CHUNK_KEY_PREFIX}{i:04d}"
+
+
+def parse_chunk_digests(text: str) -> Dict[int, str]:
+    """
+    Returns the digest of each chunk listed in *text*, in the format of
+    ``sha256sum``, by chunk number.
+    """
+    digests = {}
+    for line in text.splitlines():
+        sha, _, key = line.strip().partition("  ")
+        if key.startswith(CHUNK_KEY_PREFIX):
+            digests[int(key[len(CHUNK_KEY_PREFIX) :])] = sha
+    return digests
+
+
+def build(options: StorageOptions) -> ShardedConfigmapStorage:
+    return ShardedConfigmapStorage(
+        namespace=options.manifests.namespace.name,
+        labels=options.manifests.namespace.labels_dict,
+        session=options.session,
+        deployments=[options.manifests.controller, *options.manifests.workers],
+    )
@@ -0,0 +1,122 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from zelt import tracing
+
+
+class TaskTiming(NamedTuple):
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class TaskGraph:
+    """
+    Named tasks with dependencies between them.
+
+    Running the graph executes every task in a thread pool as soon as all the
+    tasks it depends on are done, so independent tasks run concurrently.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, Callable[[], object]] = {}
+        self._dependencies: Dict[str, Tuple[str, ...]] = {}
+        self.timings: Dict[str, TaskTiming] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def add(
+        self, name: str, task: Callable[[], object], depends_on: Iterable[str] = ()
+    ) -> None:
+        """
+        Adds *task* to the graph under *name*.
+
+        Dependencies must be added before the tasks depending on them, which
+        makes cycles impossible.
+
+        :raise ValueError: If *name* is already taken or if one of the
+            dependencies is unknown.
+        """
+        if name in self._tasks:
+            raise ValueError(f"duplicate task {name!r}")
+        depends_on = tuple(depends_on)
+        for dependency in depends_on:
+            if dependency not in self._tasks:
+                raise ValueError(f"unknown dependency {dependency!r} of task {name!r}")
+        self._tasks[name] = task
+        self._dependencies[name] = depends_on
+
+    def run(self, max_workers: Optional[int] = None) -> None:
+        """
+        Executes all tasks, each one as soon as its dependencies are done.
+
+        :raise Exception: The first exception raised by a task. Tasks that were
+            not started yet when it was raised are never started.
+        """
+        self.timings = {}
+        done: Dict[str, bool] = {}
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(self) or 1) as pool:
+            while True:
+                if error is None:
+                    for name in self._ready_tasks(done, running.values()):
+                        logging.debug("Starting task %r...", name)
+                        running[pool.submit(self._timed, name)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        logging.debug("Task %r failed: %s", name, future.exception())
+                        error = error or future.exception()
+                    else:
+                        done[name] = True
+
+        if error is not None:
+            raise error
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        Returns the chain of dependent tasks that determined the total run
+        time of the last :meth:`run`, with that total run time in seconds.
+        """
+        if not self.timings:
+            return [], 0.0
+
+        path = [max(self.timings, key=lambda n: self.timings[n].end)]
+        while True:
+            finished_dependencies = [
+                d for d in self._dependencies[path[-1]] if d in self.timings
+            ]
+            if not finished_dependencies:
+                break
+            path.append(max(finished_dependencies, key=lambda n: self.timings[n].end))
+        path.reverse()
+
+        start = min(t.start for t in self.timings.values())
+        return path, self.timings[path[-1]].end - start
+
+    def _ready_tasks(self, done: Dict[str, bool], running: Iterable[str]) -> List[str]:
+        started = set(done) | set(running)
+        return [
+            name
+            for name, dependencies in self._dependencies.items()
+            if name not in started and all(d in done for d in dependencies)
+        ]
+
+    def _timed(self, name: str) -> object:
+        start = monotonic()
+        try:
+            with tracing.span(name, "task"):
+                return self._tasks[name]()
+        finally:
+            self.timings[name] = TaskTiming(start=start, end=monotonic())
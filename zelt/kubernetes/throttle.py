@@ -0,0 +1,183 @@
+import logging
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep, time
+from typing import Callable, Optional, TypeVar
+
+from kubernetes.client.rest import ApiException
+
+from zelt import tracing
+
+DEFAULT_QPS = 20.0
+DEFAULT_BURST = 40
+DEFAULT_RETRIES = 5
+# Bounds of the exponential backoff between retries, in seconds.
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+STATUS_TOO_MANY_REQUESTS = 429
+# Statuses of transient failures. Only STATUS_TOO_MANY_REQUESTS guarantees
+# that the request wasn't processed, so the others aren't retried for POST
+# requests, which aren't idempotent.
+RETRYABLE_STATUSES = frozenset({STATUS_TOO_MANY_REQUESTS, 500, 502, 503, 504})
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Allows *qps* requests per second on average, and up to *burst* requests
+    at once after a pause.
+
+    Requests beyond that reserve a token ahead of time, so that waiting
+    requests are served in order instead of racing for each new token.
+    """
+
+    def __init__(self, qps: float, burst: int, clock: Callable = monotonic) -> None:
+        if not qps > 0:
+            raise ValueError(f"Expected a positive number of QPS, got {qps}.")
+        if burst < 1:
+            raise ValueError(f"Expected a positive burst, got {burst}.")
+        self.qps = qps
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns how many seconds to wait before using it.
+        """
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._updated
+            self._tokens = min(self._tokens + elapsed * self.qps, self.burst)
+            self._updated = now
+            self._tokens -= 1
+            return max(-self._tokens / self.qps, 0.0)
+
+    def acquire(self) -> None:
+        """
+        Waits until a token is available, and takes it.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            logging.debug("Throttling Kubernetes API call for %.2fs.", delay)
+            sleep(delay)
+
+
+class Throttle:
+    """
+    Rate-limits calls to the Kubernetes API with a token bucket, and retries
+    calls failing with a transient status up to *retries* times.
+
+    Retries wait for an exponential backoff with full jitter, or at least as
+    long as the Retry-After header of the response asks.
+    """
+
+    def __init__(
+        self,
+        qps: float = DEFAULT_QPS,
+        burst: int = DEFAULT_BURST,
+        retries: int = DEFAULT_RETRIES,
+    ) -> None:
+        if retries < 0:
+            raise ValueError(
+                f"Expected a non-negative number of retries, got {retries}."
+            )
+        self.bucket = TokenBucket(qps, burst)
+        self.retries = retries
+
+    def call(self, method: str, request: Callable[[], T]) -> T:
+        """
+        Returns the result of *request*, an API call with HTTP *method*.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                return request()
+            except ApiException as err:
+                if attempt >= self.retries or not is_retryable(method, err):
+                    raise
+                delay = backoff(attempt, retry_after(err))
+                logging.warning(
+                    "Kubernetes API call failed with %s %s; retrying in %.1fs...",
+                    err.status,
+                    err.reason,
+                    delay,
+                )
+                tracing.count_retry()
+                sleep(delay)
+                attempt += 1
+
+
+def is_retryable(method: str, err: ApiException) -> bool:
+    """
+    Returns whether the *method* request failing with *err* can be retried.
+    """
+    if method.upper() == "POST":
+        return err.status == STATUS_TOO_MANY_REQUESTS
+    return err.status in RETRYABLE_STATUSES
+
+
+def retry_after(err: ApiException) -> Optional[float]:
+    """
+    Returns the seconds to wait according to the Retry-After header of the
+    response of *err*, given either as seconds or as an HTTP date.
+    """
+    value = (getattr(err, "headers", None) or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time(), 0.0)
+    except (TypeError, ValueError):
+        logging.debug("Ignoring invalid Retry-After header %r.", value)
+        return None
+
+
+def backoff(
+    attempt: int, retry_after: Optional[float] = None, rand: Callable = random.uniform
+) -> float:
+    """
+    Returns the seconds to wait before retry number *attempt* (from 0): a
+    random duration up to an exponentially growing bound, but no less than
+    *retry_after*.
+    """
+    delay = rand(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+    return max(delay, retry_after or 0.0)
+
+
+# All sessions share one throttle, so that the limit applies to the whole run.
+_throttle = Throttle()
+
+
+def configure(
+    qps: float = DEFAULT_QPS, burst: int = DEFAULT_BURST, retries: int = DEFAULT_RETRIES
+) -> Throttle:
+    """
+    Replaces the throttle of all API calls with a new one, which is returned.
+    """
+    global _throttle
+    _throttle = Throttle(qps, burst, retries)
+    return _throttle
+
+
+def current() -> Throttle:
+    """
+    Returns the throttle of all API calls.
+    """
+    return _throttle
+
+
+def call(method: str, request: Callable[[], T]) -> T:
+    """
+    Returns the result of *request*, an API call with HTTP *method*, through
+    the current throttle.
+    """
+    return _throttle.call(method, request)
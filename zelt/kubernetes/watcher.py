@@ -0,0 +1,157 @@
+import logging
+from time import monotonic, sleep
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+STATUS_GONE = 410
+# Returned when watching is forbidden (e.g. RBAC without the "watch" verb) or
+# not supported by the server for this kind of resource.
+WATCH_UNAVAILABLE_STATUSES = (403, 405)
+
+
+class WatchUnavailableError(RuntimeError):
+    pass
+
+
+class WaitTimeoutError(RuntimeError):
+    pass
+
+
+def wait_for(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    timeout: float,
+    **kwargs,
+) -> List:
+    """
+    Waits until *condition* holds for the objects returned by *list_resources*
+    (called with *kwargs*) and returns these objects.
+
+    The objects are listed once, then kept up to date by following a watch
+    stream starting at the listed resourceVersion, so that changes are seen as
+    soon as they happen without polling the API. When the server reports that
+    resourceVersion as expired, the objects are listed again.
+
+    :raise WatchUnavailableError: If *list_resources* can't be watched.
+    :raise WaitTimeoutError: If *condition* still doesn't hold after *timeout*
+        seconds.
+    """
+    if not getattr(list_resources, "__name__", "").startswith("list_"):
+        raise WatchUnavailableError(f"{list_resources!r} is not a list function")
+
+    deadline = monotonic() + timeout
+    objects, version = _list(list_resources, **kwargs)
+    while not condition(list(objects.values())):
+        remaining = int(deadline - monotonic())
+        if remaining <= 0:
+            raise WaitTimeoutError(
+                f"Condition not met after {timeout}s for {list(objects)}."
+            )
+        try:
+            version = _follow(
+                list_resources, condition, objects, version, remaining, **kwargs
+            )
+        except ApiException as err:
+            if err.status in WATCH_UNAVAILABLE_STATUSES:
+                raise WatchUnavailableError(err.reason) from err
+            if err.status != STATUS_GONE:
+                raise
+            version = None
+        if version is None:
+            logging.debug("Watch expired; listing resources again...")
+            objects, version = _list(list_resources, **kwargs)
+    return list(objects.values())
+
+
+def poll_for(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    timeout: float,
+    interval: float,
+    **kwargs,
+) -> List:
+    """
+    Like :func:`wait_for`, but lists objects every *interval* seconds instead
+    of watching them, for when watching is unavailable.
+    """
+    deadline = monotonic() + timeout
+    while True:
+        objects = list(_list(list_resources, **kwargs)[0].values())
+        if condition(objects):
+            return objects
+        if monotonic() + interval > deadline:
+            raise WaitTimeoutError(f"Condition not met after {timeout}s.")
+        sleep(interval)
+
+
+def wait_or_poll_for(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    timeout: float,
+    interval: float,
+    **kwargs,
+) -> List:
+    """
+    Like :func:`wait_for`, but falls back to :func:`poll_for` every *interval*
+    seconds when *list_resources* can't be watched.
+    """
+    try:
+        return wait_for(list_resources, condition, timeout, **kwargs)
+    except WatchUnavailableError as err:
+        logging.debug("Polling instead of watching: %s", err)
+        return poll_for(list_resources, condition, timeout, interval, **kwargs)
+
+
+def _list(list_resources: Callable, **kwargs) -> Tuple[Dict[Tuple, object], str]:
+    found = list_resources(**kwargs)
+    objects = {object_key(o): o for o in found.items}
+    return objects, found.metadata.resource_version
+
+
+def _follow(
+    list_resources: Callable,
+    condition: Callable[[List], bool],
+    objects: Dict[Tuple, object],
+    version: str,
+    timeout: int,
+    **kwargs,
+) -> Optional[str]:
+    """
+    Applies watch events to *objects* in place until *condition* holds or
+    *timeout* seconds elapsed.
+
+    Returns the last resourceVersion seen, or None if it expired.
+    """
+    w = watch.Watch()
+    for event in w.stream(
+        list_resources, resource_version=version, timeout_seconds=timeout, **kwargs
+    ):
+        if event["type"] == "ERROR":
+            w.stop()
+            if event["raw_object"].get("code") == STATUS_GONE:
+                return None
+            raise ApiException(
+                status=event["raw_object"].get("code"),
+                reason=event["raw_object"].get("message"),
+            )
+
+        obj = event["object"]
+        version = obj.metadata.resource_version
+        if event["type"] == "DELETED":
+            objects.pop(object_key(obj), None)
+        else:
+            objects[object_key(obj)] = obj
+
+        if condition(list(objects.values())):
+            w.stop()
+            break
+    return version
+
+
+def object_key(obj) -> Tuple:
+    """
+    Returns what identifies *obj*, a Kubernetes object, in a list or watch.
+    """
+    return obj.metadata.namespace, obj.metadata.name
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    name: str
+    category: str
+    # Seconds since the tracer was enabled.
+    start: float
+    end: float
+    thread_id: int
+    api_calls: int
+    retries: int
+    # Bytes uploaded or downloaded during the span.
+    transferred: int = 0
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class _OpenSpan:
+    def __init__(self, name: str, category: str, start: float) -> None:
+        self.name = name
+        self.category = category
+        self.start = start
+        self.api_calls = 0
+        self.retries = 0
+        self.transferred = 0
+
+
+class Tracer:
+    """
+    Records spans, i.e. named steps with a start and an end, along with the
+    number of Kubernetes API calls and retries that happened during each of
+    them.
+
+    Calls and retries are attributed to the innermost span open in the thread
+    where they happen.
+    """
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self._origin = perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, category: str = "zelt") -> Iterator[None]:
+        stack = self._stack()
+        stack.append(_OpenSpan(name, category, perf_counter() - self._origin))
+        try:
+            yield
+        finally:
+            s = stack.pop()
+            span = Span(
+                name=s.name,
+                category=s.category,
+                start=s.start,
+                end=perf_counter() - self._origin,
+                thread_id=threading.get_ident(),
+                api_calls=s.api_calls,
+                retries=s.retries,
+                transferred=s.transferred,
+            )
+            with self._lock:
+                self.spans.append(span)
+
+    def count_api_call(self) -> None:
+        stack = self._stack()
+        if stack:
+            stack[-1].api_calls += 1
+
+    def count_retry(self) -> None:
+        stack = self._stack()
+        if stack:
+            stack[-1].retries += 1
+
+    def count_transferred(self, nb_bytes: int) -> None:
+        stack = self._stack()
+        if stack:
+            stack[-1].transferred += nb_bytes
+
+    def summary(self) -> str:
+        """
+        Returns a table of the total duration, API calls and retries of spans,
+        grouped by name in order of first start, followed by the throughput of
+        the spans during which bytes were transferred.
+        """
+        rows: Dict[str, List[float]] = {}
+        for s in sorted(self.spans, key=lambda s: s.start):
+            row = rows.setdefault(s.name, [0, 0.0, 0, 0])
+            row[0] += 1
+            row[1] += s.duration
+            row[2] += s.api_calls
+            row[3] += s.retries
+
+        width = max([len("Span")] + [len(n) for n in rows])
+        lines = [
+            f"{'Span':<{width}}  {'Count':>5}  {'Total (s)':>9}  "
+            f"{'API calls':>9}  {'Retries':>7}"
+        ]
+        for name, (count, total, calls, retries) in rows.items():
+            lines.append(
+                f"{name:<{width}}  {count:>5}  {total:>9.3f}  "
+                f"{calls:>9}  {retries:>7}"
+            )
+        for s in self.spans:
+            if s.transferred:
+                lines.append(
+                    f"{s.name}: {s.transferred / 2**20:.1f} MiB transferred at "
+                    f"{s.transferred / 2**20 / max(s.duration, 1e-6):.1f} MiB/s"
+                )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """
+        Returns the spans in Chrome's trace event format, which can be loaded
+        in chrome://tracing or https://ui.perfetto.dev.
+        """
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": s.name,
+                    "cat": s.category,
+                    "ph": "X",
+                    "ts": round(s.start * 1e6),
+                    "dur": round(s.duration * 1e6),
+                    "pid": pid,
+                    "tid": s.thread_id,
+                    "args": {
+                        "api_calls": s.api_calls,
+                        "retries": s.retries,
+                        "transferred": s.transferred,
+                    },
+                }
+                for s in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_chrome_trace(self, path: os.PathLike) -> None:
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def _stack(self) -> List[_OpenSpan]:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+
+# Tracing is disabled (and costs nothing) unless a tracer is enabled.
+_tracer: Optional[Tracer] = None
+
+
+def enable() -> Tracer:
+    """
+    Starts recording spans with a new tracer, which is returned.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+@contextmanager
+def span(name: str, category: str = "zelt") -> Iterator[None]:
+    """
+    Records the enclosed block as a span named *name*, if tracing is enabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, category):
+        yield
+
+
+def traced(f: Callable) -> Callable:
+    """
+    Decorator recording each call of *f* as a span named after its module and
+    name, e.g. "client.create_namespace".
+    """
+    name = f"{f.__module__.rsplit('.', 1)[-1]}.{f.__qualname__}"
+    category = f.__module__
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return f(*args, **kwargs)
+        with tracer.span(name, category):
+            return f(*args, **kwargs)
+
+    return wrapper
+
+
+def count_api_call() -> None:
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count_api_call()
+
+
+def count_retry(*_) -> None:
+    """
+    Counts a retry; usable as the ``before_sleep`` callback of tenacity.
+    """
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count_retry()
+
+
+def count_transferred(nb_bytes: int) -> None:
+    """
+    Counts *nb_bytes* uploaded or downloaded, to report the throughput of the
+    current span.
+    """
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count_transferred(nb_bytes)
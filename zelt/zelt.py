@@ -1,17 +1,29 @@
-import enum
 import logging
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from time import time
-from typing import Optional, Sequence
+from typing import Callable, Dict, List, Optional, Sequence
 from zlib import adler32
 
-from zelt.kubernetes import deployer, manifest_set
+import zelt.kubernetes.client as kube
+from zelt import tracing
+from zelt.kubernetes import (
+    bundle,
+    clusters,
+    deployer,
+    fleet,
+    manifest_set,
+    ramp,
+    startup,
+)
+from zelt.kubernetes.autoscaler import DEFAULT_INTERVAL, Autoscaler, AutoscalePolicy
+from zelt.kubernetes.clusters import WorkerCluster
 from zelt.kubernetes.manifest_set import ManifestSet
-from zelt.kubernetes.storage.configmap import ConfigmapStorage
-from zelt.kubernetes.storage.protocol import LocustfileStorage
-from zelt.kubernetes.storage.s3 import S3Storage
+from zelt.kubernetes.session import DEFAULT_POOL_SIZE, Session
+from zelt.kubernetes.storage import registry
+from zelt.kubernetes.storage.protocol import LocustfileStorage, StorageOptions
 
 try:
     import transformer
@@ -25,44 +37,57 @@ class HARFilesNotFoundException(Exception):
     pass
 
 
-class StorageMethod(enum.Enum):
-    CONFIGMAP = enum.auto()
-    S3 = enum.auto()
+class StorageMethod:
+    """
+    Storage backend of the locustfile, selected by name among the built-in
+    backends and those registered by other packages under the "zelt.storage"
+    entry point group (see :mod:`zelt.kubernetes.storage.registry`).
+
+    The module of a backend is only imported when storage is built with it.
+    """
+
+    _instances: Dict[str, "StorageMethod"] = {}
+
+    def __new__(cls, name: str) -> "StorageMethod":
+        # One instance per backend, so that methods can be compared with "is".
+        if name not in cls._instances:
+            instance = super().__new__(cls)
+            instance.name = name
+            cls._instances[name] = instance
+        return cls._instances[name]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__qualname__}({self.name!r})"
 
     @classmethod
     def from_storage_arg(cls, arg: str) -> "StorageMethod":
-        if arg.lower() == "s3":
-            return cls.S3
-        if arg.lower() in ("cm", "configmap"):
-            return cls.CONFIGMAP
-        raise ValueError(f"unknown {cls.__qualname__} {arg!r}")
+        return cls(registry.canonical_name(arg))
 
     def build_storage(
         self,
         manifests: ManifestSet,
         s3_bucket: Optional[str] = None,
         s3_key: Optional[str] = None,
+        session: Optional[Session] = None,
     ) -> LocustfileStorage:
-        if self is StorageMethod.S3 and (not (s3_bucket and s3_key)):
-            raise ValueError(
-                "Missing required 's3-bucket' and/or 's3-key' options "
-                "for 'storage=s3' option."
-            )
-
         if self is not StorageMethod.S3 and (s3_bucket or s3_key):
             raise ValueError(
                 "Unexpected 's3-bucket' or 's3-key' options "
                 "without 'storage=s3' option."
             )
 
-        if self is StorageMethod.S3:
-            return S3Storage(bucket=s3_bucket, key=s3_key)
+        build = registry.load(self.name)
+        return build(StorageOptions(manifests, session, s3_bucket, s3_key))
 
-        return ConfigmapStorage(
-            namespace=manifests.namespace.name, labels=manifests.namespace.labels_dict
-        )
+
+StorageMethod.CONFIGMAP = StorageMethod("configmap")
+StorageMethod.COMPRESSED_CONFIGMAP = StorageMethod("configmap-gzip")
+StorageMethod.SHARDED_CONFIGMAP = StorageMethod("configmap-sharded")
+StorageMethod.PVC = StorageMethod("pvc")
+StorageMethod.S3 = StorageMethod("s3")
 
 
+@tracing.traced
 def deploy(
     locustfile: os.PathLike,
     worker_pods: int,
@@ -72,7 +97,17 @@ def deploy(
     local: bool,
     s3_bucket: Optional[str] = None,
     s3_key: Optional[str] = None,
+    api_pool_size: int = DEFAULT_POOL_SIZE,
+    apply: bool = False,
+    wait_ready: Optional[float] = None,
+    worker_contexts: Sequence[str] = (),
+    prepull: bool = False,
+    startup_report: bool = False,
+    startup_json: Optional[os.PathLike] = None,
 ) -> None:
+    if bundle.is_bundle(locustfile):
+        bundle.check(locustfile)
+
     if local:
         if manifests_path:
             logging.warning(
@@ -83,6 +118,17 @@ def deploy(
     if not manifests_path:
         raise ValueError("Missing required 'manifests' option.")
 
+    if clean and apply:
+        raise ValueError("Mutually incompatible options 'clean' and 'apply'.")
+
+    if worker_contexts and apply:
+        raise ValueError("Mutually incompatible options 'worker-context' and 'apply'.")
+
+    if prepull and apply:
+        raise ValueError("Mutually incompatible options 'prepull' and 'apply'.")
+
+    _check_wait_ready(wait_ready)
+
     _deploy_in_kubernetes(
         locustfile,
         worker_pods,
@@ -91,37 +137,171 @@ def deploy(
         storage_method=storage_method,
         s3_bucket=s3_bucket,
         s3_key=s3_key,
+        api_pool_size=api_pool_size,
+        apply=apply,
+        wait_ready=wait_ready,
+        worker_contexts=worker_contexts,
+        prepull=prepull,
+        startup_report=startup_report or bool(startup_json),
+        startup_json=startup_json,
     )
 
 
-def rescale(manifests_path, worker_pods: int) -> None:
+@tracing.traced
+def rescale(
+    manifests_path,
+    worker_pods: int,
+    api_pool_size: int = DEFAULT_POOL_SIZE,
+    wait_ready: Optional[float] = None,
+    worker_contexts: Sequence[str] = (),
+    ramp_rate: Optional[str] = None,
+    ramp_schedule: Optional[os.PathLike] = None,
+    startup_report: bool = False,
+    startup_json: Optional[os.PathLike] = None,
+) -> None:
     if not manifests_path:
         raise ValueError("Missing required 'manifests' option.")
 
     if worker_pods < 0:
         raise ValueError(f"Expected a positive number of pods, got {worker_pods}.")
 
+    if ramp_rate and ramp_schedule:
+        raise ValueError("Mutually incompatible options 'ramp' and 'ramp-schedule'.")
+
+    _check_wait_ready(wait_ready)
+    if ramp_rate:
+        ramp.parse_rate(ramp_rate)
+
     manifests = manifest_set.from_directory(manifests_path)
-    deployer.update_worker_pods(manifests, worker_pods)
-    deployer.rescale_worker_deployment(manifests, worker_pods)
+    if worker_contexts:
+        workers = clusters.worker_clusters(manifests, worker_contexts, api_pool_size)
+    else:
+        workers = [clusters.current_cluster(manifests, api_pool_size)]
+
+    if ramp_rate or ramp_schedule:
+        plans = _ramp_plans(workers, worker_pods, ramp_rate, ramp_schedule)
+        clusters.run_in_each(
+            workers,
+            lambda c: deployer.ramp_worker_deployment(
+                c.manifests, plans[c.context], c.session, wait_ready
+            ),
+        )
+    else:
+        shares = {c.context: n for c, n in clusters.distribute(worker_pods, workers)}
+        clusters.run_in_each(
+            workers,
+            lambda c: deployer.rescale_worker_deployment(
+                c.manifests, shares[c.context], c.session, wait_ready
+            ),
+        )
+    if startup_report or startup_json:
+        _report_startup(workers, startup_json)
     logging.info("Rescaling complete.")
 
 
+def autoscale(
+    manifests_path: os.PathLike,
+    policy: AutoscalePolicy,
+    interval: float = DEFAULT_INTERVAL,
+    api_pool_size: int = DEFAULT_POOL_SIZE,
+    wait_ready: Optional[float] = None,
+) -> None:
+    if not manifests_path:
+        raise ValueError("Missing required 'manifests' option.")
+
+    if not interval > 0:
+        raise ValueError(f"Expected a positive sampling interval, got {interval}.")
+
+    _check_wait_ready(wait_ready)
+
+    manifests = manifest_set.from_directory(manifests_path)
+    if not manifests.workers:
+        raise ValueError("Missing worker manifest. Only workers can be autoscaled.")
+
+    scaler = Autoscaler(manifests, policy, kube.read_config(api_pool_size), wait_ready)
+    logging.info(
+        "Autoscaling up to %s workers above %.0f%% median CPU utilisation...",
+        policy.max_workers,
+        policy.cpu_threshold * 100,
+    )
+    try:
+        scaler.run(interval)
+    except KeyboardInterrupt:
+        logging.info("Autoscaling stopped.")
+
+
+@tracing.traced
+def update_locustfile(
+    locustfile: os.PathLike,
+    manifests_path: os.PathLike,
+    storage_method: StorageMethod,
+    s3_bucket: Optional[str] = None,
+    s3_key: Optional[str] = None,
+    api_pool_size: int = DEFAULT_POOL_SIZE,
+    wait: bool = False,
+    worker_contexts: Sequence[str] = (),
+) -> None:
+    if not manifests_path:
+        raise ValueError("Missing required 'manifests' option.")
+
+    if bundle.is_bundle(locustfile):
+        bundle.check(locustfile)
+
+    logging.info("Updating the locustfile of Locust to %s...", locustfile)
+    manifests = manifest_set.from_directory(manifests_path)
+    session = kube.read_config(api_pool_size)
+    storage = storage_method.build_storage(manifests, s3_bucket, s3_key, session)
+
+    workers = clusters.worker_clusters(manifests, worker_contexts, api_pool_size)
+    if workers:
+        manifests = manifests._replace(workers=[])
+
+    # Workers of other clusters are only restarted once the controller is,
+    # so that they all connect to the new controller.
+    if not deployer.update_locustfile(manifests, storage, locustfile, session, wait):
+        return
+    clusters.run_in_each(
+        workers,
+        lambda c: deployer.update_worker_locustfile(
+            c.manifests,
+            storage_method.build_storage(c.manifests, s3_bucket, s3_key, c.session),
+            locustfile,
+            c.session,
+            wait,
+        ),
+    )
+    logging.info("Locustfile update complete.")
+
+
+@tracing.traced
 def delete(
     manifests_path: os.PathLike,
     storage_method: StorageMethod,
     s3_bucket: Optional[str] = None,
     s3_key: Optional[str] = None,
+    api_pool_size: int = DEFAULT_POOL_SIZE,
+    fast: bool = False,
+    wait: bool = True,
+    worker_contexts: Sequence[str] = (),
 ) -> None:
     if not manifests_path:
         raise ValueError("Missing required 'manifests' option.")
 
     manifests = manifest_set.from_directory(manifests_path)
-    storage = storage_method.build_storage(manifests, s3_bucket, s3_key)
-    deployer.delete_resources(manifests, storage)
+    session = kube.read_config(api_pool_size)
+    workers = clusters.worker_clusters(manifests, worker_contexts, api_pool_size)
+    storage = storage_method.build_storage(manifests, s3_bucket, s3_key, session)
+    _in_all_clusters(
+        lambda: deployer.delete_resources(
+            manifests, storage, session, fast=fast, wait=wait
+        ),
+        workers,
+        lambda c: deployer.delete_worker_resources(c.manifests, c.session, wait),
+    )
     logging.info("Deletion complete.")
 
 
+@tracing.traced
 def invoke_transformer(
     paths: Sequence[os.PathLike], plugin_names: Sequence[str]
 ) -> Path:
@@ -145,12 +325,100 @@ def invoke_transformer(
     return locustfile
 
 
+def _check_wait_ready(wait_ready: Optional[float]) -> None:
+    if wait_ready is not None and not 0 < wait_ready <= 1:
+        raise ValueError(
+            f"Expected a fraction of ready pods in ]0, 1], got {wait_ready}."
+        )
+
+
+def _ramp_plans(
+    workers: Sequence[WorkerCluster],
+    target: int,
+    rate: Optional[str],
+    schedule: Optional[os.PathLike],
+) -> Dict[Optional[str], List[ramp.RampStep]]:
+    """
+    Returns the ramp steps of each cluster of *workers*, by context, going to
+    *target* worker pods in total either at *rate* or following *schedule*.
+    """
+    if schedule:
+        steps = ramp.steps_from_file(schedule, target)
+    else:
+        start = sum(
+            fleet.read_status(c.manifests.workers, c.session).total for c in workers
+        )
+        steps = ramp.steps_at_rate(start, target, rate)
+    logging.info(
+        "Ramping to %s worker pod(s) in %s step(s): %s.",
+        target,
+        len(steps),
+        ", ".join(str(s.replicas) for s in steps),
+    )
+
+    plans = {c.context: [] for c in workers}
+    for step in steps:
+        for cluster, replicas in clusters.distribute(step.replicas, workers):
+            plans[cluster.context].append(step._replace(replicas=replicas))
+    return plans
+
+
+def _report_startup(
+    workers: Sequence[WorkerCluster], json_path: Optional[os.PathLike]
+) -> None:
+    """
+    Logs how long the startup phases of the worker pods of *workers* took,
+    and writes them to *json_path* in JSON.
+    """
+    try:
+        startups = [
+            s for c in workers for s in startup.collect(c.manifests.workers, c.session)
+        ]
+    except kube.ApiException as err:
+        logging.error("Can't report on the startup of worker pods: %s", err.reason)
+        return
+    logging.info("Startup of worker pods:\n%s", startup.format_report(startups))
+    if json_path:
+        startup.write_json(startups, json_path)
+        logging.info("Startup report written to %s.", json_path)
+
+
+def _in_all_clusters(
+    in_controller_cluster: Callable[[], None],
+    workers: Sequence[WorkerCluster],
+    in_worker_cluster: Callable[[WorkerCluster], None],
+) -> None:
+    """
+    Runs *in_controller_cluster* concurrently with *in_worker_cluster* on
+    each of the *workers* clusters.
+    """
+    if not workers:
+        in_controller_cluster()
+        return
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        controller = pool.submit(in_controller_cluster)
+        clusters.run_in_each(workers, in_worker_cluster)
+    controller.result()
+
+
 def _deploy_locally(locustfile: os.PathLike) -> None:
     logging.info("Deploying Locust locally with locustfile %s...", locustfile)
     logging.info("\n\nOpen http://localhost:8089/ to access the Locust dashboard.\n\n")
 
+    # Bundles are run from their directory, as in pods, so that the
+    # locustfile finds the files next to it.
+    cwd = locustfile if bundle.is_bundle(locustfile) else None
     # The host value is unused when full URLs are used in the locustfile.
-    subprocess.run(["locust", "-f", os.fspath(locustfile), "--host=unused"], check=True)
+    subprocess.run(
+        [
+            "locust",
+            "-f",
+            os.fspath(bundle.locustfile_of(locustfile).resolve()),
+            "--host=unused",
+        ],
+        check=True,
+        cwd=cwd,
+    )
 
 
 def _deploy_in_kubernetes(
@@ -161,6 +429,13 @@ def _deploy_in_kubernetes(
     storage_method: StorageMethod,
     s3_bucket: Optional[str],
     s3_key: Optional[str],
+    api_pool_size: int,
+    apply: bool = False,
+    wait_ready: Optional[float] = None,
+    worker_contexts: Sequence[str] = (),
+    prepull: bool = False,
+    startup_report: bool = False,
+    startup_json: Optional[os.PathLike] = None,
 ) -> None:
     if worker_pods < 0:
         raise ValueError(f"Expected a positive number of pods, got {worker_pods}.")
@@ -173,13 +448,48 @@ def _deploy_in_kubernetes(
 
     manifests = manifest_set.from_directory(manifests_path)
 
-    storage = storage_method.build_storage(manifests, s3_bucket, s3_key)
+    # A single session is shared by the whole deployment so that connections
+    # to the Kubernetes API are reused between calls.
+    session = kube.read_config(api_pool_size)
+    storage = storage_method.build_storage(manifests, s3_bucket, s3_key, session)
+
+    # With worker contexts, the controller's cluster runs no worker at all.
+    workers = clusters.worker_clusters(manifests, worker_contexts, api_pool_size)
+    if workers:
+        manifests = manifests._replace(workers=[])
 
     if clean_deployment:
-        deployer.delete_resources(manifests, storage)
+        _in_all_clusters(
+            lambda: deployer.delete_resources(manifests, storage, session, fast=True),
+            workers,
+            lambda c: deployer.delete_worker_resources(c.manifests, c.session),
+        )
 
     deployer.update_worker_pods(manifests, worker_pods)
-    deployer.create_resources(manifests, storage, locustfile)
+    for cluster, replicas in clusters.distribute(worker_pods, workers):
+        deployer.update_worker_pods(cluster.manifests, replicas)
+
+    if apply:
+        deployer.apply_resources(manifests, storage, locustfile, session, wait_ready)
+    else:
+        _in_all_clusters(
+            lambda: deployer.create_resources(
+                manifests, storage, locustfile, session, wait_ready, prepull
+            ),
+            workers,
+            lambda c: deployer.create_worker_resources(
+                c.manifests,
+                storage_method.build_storage(c.manifests, s3_bucket, s3_key, c.session),
+                locustfile,
+                c.session,
+                wait_ready,
+                prepull,
+            ),
+        )
+
+    if startup_report:
+        targets = workers or [WorkerCluster(None, session, manifests)]
+        _report_startup(targets, startup_json)
 
     logging.info(
         "\n\nOpen %s to access the Locust dashboard.\n\n", manifests.ingress.host